@@ -0,0 +1,95 @@
+# backtest.py
+# Entry point backtest offline strategi RANGE dari file kline lokal (tanpa Telegram / Binance).
+# Contoh:
+#   python backtest.py data/
+#   python backtest.py data/ --symbols BTCUSDT,ETHUSDT --set range_lookback=50 --set max_range_height_pct=1.0
+# Format file & model eksekusi: lihat range/range_backtest.py
+
+import argparse
+import csv
+import os
+import time
+
+from config import SIGNAL_COOLDOWN_SECONDS
+from range.range_backtest import (
+    TIER_ORDER,
+    format_report,
+    list_symbols,
+    run_backtest,
+    summarize,
+)
+
+
+def _parse_overrides(items) -> dict:
+    overrides = {}
+    for item in items or []:
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Format --set harus KEY=VALUE: {item}")
+        overrides[name.strip()] = value.strip()
+    return overrides
+
+
+def _write_trades(path: str, trades: dict) -> None:
+    cols = ("symbol", "close_ms", "side", "tier", "score", "entry", "sl", "sl_pct", "filled", "tp_hits", "sl_hit", "r")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(cols)
+        writer.writerows(zip(*(trades[c].tolist() for c in cols)))
+    print(f"Detail trade disimpan ke {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest offline strategi RANGE dari kline lokal (CSV/NPY).")
+    parser.add_argument("data_dir", help="folder file kline (<SYMBOL>_5m.npy / <SYMBOL>-5m-*.csv, + 1h & 15m)")
+    parser.add_argument("--symbols", help="daftar symbol dipisah koma (default: semua yang punya data 5m)")
+    parser.add_argument("--horizon", type=int, default=288, help="maksimal bar 5m per trade sebelum timeout (default 288 = 1 hari)")
+    parser.add_argument("--min-tier", default="B", choices=list(TIER_ORDER), help="tier minimal yang dihitung terkirim (default B)")
+    parser.add_argument("--cooldown", type=int, default=SIGNAL_COOLDOWN_SECONDS, help="cooldown sinyal per symbol (detik)")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="override field RangeSettings (boleh berulang)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="jumlah proses paralel (per symbol)")
+    parser.add_argument("--trades", metavar="CSV", help="simpan detail tiap trade ke file CSV")
+    args = parser.parse_args()
+
+    if args.horizon < 1:
+        parser.error("--horizon minimal 1")
+    try:
+        overrides = _parse_overrides(args.set)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    else:
+        symbols = list_symbols(args.data_dir)
+    if not symbols:
+        parser.error(f"Tidak ada data 5m di {args.data_dir}")
+
+    t0 = time.time()
+    try:
+        trades = run_backtest(
+            args.data_dir,
+            symbols,
+            args.horizon,
+            args.min_tier,
+            args.cooldown,
+            overrides,
+            workers=args.workers,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if not trades:
+        print("Tidak ada symbol yang bisa di-backtest.")
+        return
+
+    rows = summarize(trades, args.min_tier)
+    print()
+    print(format_report(rows, trades["days"].size, float(trades["span_days"][0])))
+    print(f"\nSelesai dalam {time.time() - t0:.1f}s")
+
+    if args.trades:
+        _write_trades(args.trades, trades)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# binance/binance_preload.py
+# Preload history klines dari REST secara concurrent (async) dengan:
+# - batas concurrency (semaphore)
+# - budget request-weight Binance (header X-MBX-USED-WEIGHT-1M, lewat core.http_transport)
+# - progress report & hasil langsung masuk ke buffer begitu datang
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import BINANCE_REST_URL, PRELOAD_CONCURRENCY
+from core.http_transport import WeightTracker, http
+
+# Berapa kali retry kalau kena 429/418 atau error jaringan
+MAX_RETRIES = 3
+# Max row per request klines (paging startTime)
+MAX_KLINES_PER_PAGE = 1000
+
+
+def klines_weight(limit: int) -> int:
+    """Weight endpoint /fapi/v1/klines sesuai dokumentasi Binance Futures."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+# Tracker bersama untuk semua fetch klines (preload, HTF backfill, heal gap)
+weight_tracker = http.tracker
+
+
+def fetch_klines(
+    symbol: str,
+    interval: str,
+    limit: int,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+) -> Tuple[int, dict, Optional[List[list]]]:
+    """
+    Fetch klines REST Binance Futures (blocking).
+    Return (status_code, headers, data) supaya caller bisa baca header weight.
+    """
+    url = f"{BINANCE_REST_URL}/fapi/v1/klines"
+    params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    if end_time is not None:
+        params["endTime"] = end_time
+    r = http.get(url, params=params, timeout=10)
+    data = r.json() if r.ok else None
+    return r.status_code, r.headers, data
+
+
+async def _fetch_with_budget(
+    tracker: WeightTracker,
+    sem: asyncio.Semaphore,
+    symbol: str,
+    interval: str,
+    limit: int,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+) -> Tuple[str, Optional[List[list]], Optional[str]]:
+    cost = klines_weight(limit)
+    error: Optional[str] = None
+    async with sem:
+        for attempt in range(MAX_RETRIES):
+            await tracker.acquire(cost)
+            try:
+                status, headers, data = await asyncio.to_thread(
+                    fetch_klines, symbol, interval, limit, start_time, end_time
+                )
+            except Exception as e:
+                error = str(e)
+                await asyncio.sleep(1 + attempt)
+                continue
+
+            # header weight & pause Retry-After sudah dicatat transport ke tracker global
+            if tracker is not http.tracker:
+                tracker.update_from_headers(headers)
+            if status in (429, 418):
+                print(f"[{symbol}] Kena rate limit ({status}) → retry setelah pause")
+                error = f"HTTP {status}"
+                continue
+            if data is None:
+                return symbol, None, f"HTTP {status}"
+            return symbol, data, None
+    return symbol, None, error
+
+
+async def preload_klines(
+    symbols: List[str],
+    interval: str,
+    limit: int,
+    on_klines: Callable[[str, List[list]], None],
+    concurrency: int = PRELOAD_CONCURRENCY,
+    tracker: Optional[WeightTracker] = None,
+    progress_every: int = 25,
+) -> Dict[str, object]:
+    """
+    Preload klines untuk banyak symbol sekaligus.
+    - maksimal `concurrency` request jalan bareng
+    - `on_klines(SYMBOL, klines)` dipanggil begitu hasil symbol itu datang
+    - progress dicetak tiap `progress_every` symbol
+
+    Return ringkasan: {"ok", "failed", "failed_symbols", "elapsed", "weight_used"}.
+    """
+    tracker = tracker or weight_tracker
+    sem = asyncio.Semaphore(max(1, concurrency))
+    total = len(symbols)
+    t0 = time.time()
+    ok = 0
+    failed: List[str] = []
+
+    tasks = [
+        asyncio.create_task(_fetch_with_budget(tracker, sem, sym.upper(), interval, limit))
+        for sym in symbols
+    ]
+    done = 0
+    for fut in asyncio.as_completed(tasks):
+        sym, data, error = await fut
+        done += 1
+        if data is not None:
+            try:
+                on_klines(sym, data)
+                ok += 1
+            except Exception as e:
+                print(f"[{sym}] Gagal simpan preload {interval}:", e)
+                failed.append(sym)
+        else:
+            print(f"[{sym}] Gagal preload {interval}:", error)
+            failed.append(sym)
+
+        if done % progress_every == 0 or done == total:
+            print(
+                f"Preload {interval}: {done}/{total} "
+                f"({len(failed)} gagal) — {time.time() - t0:.1f}s, "
+                f"weight {tracker.used}/{tracker.limit_1m}"
+            )
+
+    return {
+        "ok": ok,
+        "failed": len(failed),
+        "failed_symbols": failed,
+        "elapsed": time.time() - t0,
+        "weight_used": tracker.used,
+    }
+
+
+async def fetch_klines_range(
+    symbol: str,
+    interval: str,
+    interval_ms: int,
+    start_time: int,
+    end_time: int,
+    sem: asyncio.Semaphore,
+    tracker: Optional[WeightTracker] = None,
+) -> Tuple[str, Optional[List[list]], Optional[str]]:
+    """
+    Fetch semua klines dengan open_time di [start_time, end_time],
+    paging pakai startTime (maks MAX_KLINES_PER_PAGE per request).
+    """
+    tracker = tracker or weight_tracker
+    rows: List[list] = []
+    cursor = start_time
+    while cursor <= end_time:
+        remaining = (end_time - cursor) // interval_ms + 1
+        limit = int(min(MAX_KLINES_PER_PAGE, remaining))
+        sym, data, error = await _fetch_with_budget(
+            tracker, sem, symbol.upper(), interval, limit, cursor, end_time + interval_ms - 1
+        )
+        if data is None:
+            return sym, None, error
+        if not data:
+            break
+        rows.extend(data)
+        cursor = int(data[-1][0]) + interval_ms
+        if len(data) < limit:
+            break
+    return symbol.upper(), rows, None
@@ -2,70 +2,434 @@
 # WebSocket scanner Binance Futures 5m + Range analyzer.
 
 import asyncio
-import json
 import time
-from typing import Dict, List
-
-import requests
-import websockets
-
-from config import BINANCE_STREAM_URL, BINANCE_REST_URL, REFRESH_PAIR_INTERVAL_HOURS
+from functools import partial
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import (
+    CANDLE_STORE_DEPTH,
+    CANDLE_STORE_DIR,
+    REFRESH_PAIR_INTERVAL_HOURS,
+    ROLLING_STATS_VERIFY,
+)
 from binance.binance_pairs import get_usdt_pairs
+from binance.binance_preload import preload_klines
+from binance.candle_store import CandleStore
+from binance.binance_ws_shards import ShardedKlineStream
+from binance.gap_backfill import GapHealer
+from binance.kline_decoder import KlineFrameDecoder
+from binance.htf_buffer import HTF_CANDLES, HTF_INTERVALS, htf_buffers
 from binance.ohlc_buffer import OHLCBufferManager
+from binance.pair_universe import RERANK_INTERVAL, pair_universe
+from core.analysis_pipeline import AnalysisPipeline
+from core.bar_barrier import BarCloseBarrier
+from core.bar_signals import BarSignalBatch
+from core.engine_commands import engine_commands
 from core.bot_state import (
     state,
     load_subscribers,
     load_vip_users,
     cleanup_expired_vip,
     load_bot_state,
+    load_daily_counts,
+    rebuild_eligibility,
+    load_filters,
+    load_free_rank_history,
 )
-from range.range_detector import analyze_symbol_range
-from telegram.telegram_broadcast import broadcast_signal
+from core.eligibility import eligibility
+from core.engine_stats import register_stats, unregister_stats
+from core.http_transport import http
+from core.range_settings import range_settings
+from core.signal_filters import signal_filters
+from range.range_batch import (
+    compare_candidates,
+    find_range_candidates,
+    find_range_candidates_from_stats,
+)
+from range.htf_context import htf_table, snapshot_htf
+from range.range_detector import build_range_signal
+from range.rolling_stats import RollingRangeState
+from telegram.telegram_broadcast import broadcast_bar_signals, broadcast_late_signals, free_gate
+from telegram.telegram_channels import VIP_CHANNEL_ID, remove_from_vip_channel
+from telegram.telegram_core import dispatch_update
+from telegram.telegram_sender import telegram_sender
 
 # Max candle 5m yang disimpan per symbol
 MAX_5M_CANDLES = 120
 # Preload awal dari REST (biar history cukup untuk deteksi range)
 PRELOAD_LIMIT_5M = 60
+# Panjang bar 5m (ms)
+BAR_5M_MS = 5 * 60 * 1000
+# Jeda maksimal antar cek expiry VIP (detik); normalnya tidur sampai deadline VIP terdekat
+VIP_EXPIRY_MAX_SLEEP = 600
+# Jumlah bar terakhir yang batch sinyalnya diingat (gabung flush straggler)
+BAR_BATCH_HISTORY = 16
+
+
+def _in_cooldown(symbol: str, now_ts: float) -> bool:
+    if state.cooldown_seconds <= 0:
+        return False
+    last_ts = state.last_signal_time.get(symbol)
+    if last_ts and now_ts - last_ts < state.cooldown_seconds:
+        if state.debug:
+            print(
+                f"[{symbol}] Skip cooldown "
+                f"({int(now_ts - last_ts)}s/{state.cooldown_seconds}s)"
+            )
+        return True
+    return False
 
 
-def _fetch_klines(symbol: str, interval: str, limit: int) -> List[list]:
+def _score_signal(job: Tuple[str, Dict, BarSignalBatch]) -> None:
     """
-    Fetch klines dari REST Binance Futures.
-    Dipakai hanya saat preload awal / refresh pair.
+    Job worker analisa (jalan di thread pool) untuk kandidat hasil deteksi batch:
+    level + konteks HTF + skoring. Hasil masuk batch bar-nya; job terakhir
+    memicu ranking & pengiriman semua sinyal bar itu sekaligus.
     """
-    url = f"{BINANCE_REST_URL}/fapi/v1/klines"
-    params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    return r.json()
+    symbol, setup, batch = job
+    result = None
+    try:
+        # cek ulang cooldown: bisa saja sudah ada sinyal selama job antri
+        if not _in_cooldown(symbol, time.time()):
+            result = build_range_signal(symbol, setup)
+    finally:
+        batch.add(result)
+
+
+def _send_bar_signals(open_time: int, results: List[Dict], late: bool = False) -> None:
+    """
+    Dipanggil sekali per bar setelah semua kandidat dinilai. Jalan di event loop
+    (diserahkan dari thread worker) → kuota, cooldown & rollover hari hanya diubah di loop.
+    late=True → batch straggler bar yang sudah terkirim (digest susulan saja).
+    """
+    if not results:
+        return
+    if late:
+        broadcast_late_signals(open_time, results, BAR_5M_MS)
+    else:
+        broadcast_bar_signals(open_time, results, BAR_5M_MS)
+    now_ts = time.time()
+    for r in results:
+        state.last_signal_time[r["symbol"]] = now_ts
+        print(
+            f"[{r['symbol']}] RANGE sinyal dikirim: "
+            f"Tier {r['tier']} (Score {r['score']}) "
+            f"Entry {r['entry']:.6f} SL {r['sl']:.6f}"
+        )
+
+
+async def _vip_expiry_loop() -> None:
+    """Tidur sampai deadline VIP terdekat (heap index), lalu hapus VIP yang expired (+ keluarkan dari channel VIP)."""
+    while state.running:
+        nxt = eligibility.next_expiry()
+        delay = VIP_EXPIRY_MAX_SLEEP if nxt is None else nxt - time.time()
+        await asyncio.sleep(min(VIP_EXPIRY_MAX_SLEEP, max(1.0, delay)))
+        expired = cleanup_expired_vip()
+        if expired and VIP_CHANNEL_ID is not None:
+            # mode channel: VIP expired dikeluarkan dari channel VIP (Bot API, di thread)
+            for uid in expired:
+                await asyncio.to_thread(remove_from_vip_channel, uid)
 
 
 async def run_range_bot():
     """
     Main loop Range Engine bot:
-    - Load subscribers/VIP/state.
-    - Ambil daftar pair USDT perpetual berdasarkan volume.
-    - Preload 5m history dari REST (sekali di awal / saat refresh pairs).
-    - Hubungkan WebSocket multi-stream kline_5m.
+    - Load subscribers/VIP/kuota harian/state (SQLite, migrasi sekali dari JSON lama).
+    - Ambil daftar pair USDT perpetual berdasarkan volume (exchangeInfo di-cache,
+      volume 24h live dari !ticker@arr, ranking ulang berkala dengan hysteresis).
+    - Preload 5m history dari REST secara concurrent (sekali di awal / saat refresh pairs).
+      Kalau CANDLE_STORE_DIR diisi: candle dibaca dari file memmap di disk dan
+      hanya gap sejak shutdown yang di-backfill REST (warm restart).
+    - Hubungkan WebSocket kline_5m, dipecah ke beberapa koneksi (shard).
+    - Refresh pair (interval / /minvol / /maxpairs) tanpa putus WebSocket:
+      SUBSCRIBE/UNSUBSCRIBE diff live, preload hanya pair baru, pair yang keluar di-evict.
     - Build candle 5m per symbol via OHLCBufferManager.
-    - Setiap candle close → jalankan Range analyzer → kirim sinyal kalau valid.
+    - Candle close dikumpulkan per bar (barrier + deadline straggler), lalu deteksi
+      range/breakout jalan sekali untuk semua symbol dari statistik incremental
+      (rolling high/low/stdev O(1) per candle).
+    - Gap candle (habis reconnect) dideteksi per symbol → symbol not-ready sampai
+      di-backfill REST (concurrent), tanpa re-preload semua pair.
+    - Buffer HTF 15m/1h: backfill REST sekali, lalu resample dari candle 5m close;
+      tabel konteks HTF dihitung ulang sekaligus tiap bar 15m/1h close.
+    - Kandidat → queue analisa → worker pool jalankan HTF + skoring (receive loop tidak
+      ikut nunggu); sinyal satu bar diranking lalu dikirim top-K satuan + satu digest.
+    - Command Telegram masuk lewat antrian engine_commands dan diproses di event loop
+      ini (satu penulis state); /softrestart & /stopbot membangunkan receive loop langsung.
     """
 
     # Load state persistent
     state.subscribers = load_subscribers()
     state.vip_users = load_vip_users()
-    state.daily_date = time.strftime("%Y-%m-%d")
+    load_daily_counts(time.strftime("%Y-%m-%d"))
     cleanup_expired_vip()
     load_bot_state()
+    rebuild_eligibility()
+    load_filters()
+    free_gate.load(load_free_rank_history(free_gate.window))
 
     print(f"Loaded {len(state.subscribers)} subscribers, {len(state.vip_users)} VIP users.")
+    vip_expiry_task = asyncio.create_task(_vip_expiry_loop(), name="vip-expiry")
+    register_stats("eligibility", eligibility.format_stats)
+    register_stats("filters", signal_filters.format_stats)
+
+    # Consumer command Telegram: handler jalan di loop ini, berurutan dengan receive loop
+    command_task = asyncio.create_task(engine_commands.serve(dispatch_update), name="engine-commands")
+    register_stats("commands", engine_commands.format_stats)
 
     symbols: List[str] = []
     last_pairs_refresh: float = 0.0
     refresh_interval = REFRESH_PAIR_INTERVAL_HOURS * 3600
 
+    # Candle store di disk (opsional) untuk warm restart
+    store = None
+    if CANDLE_STORE_DIR:
+        store = CandleStore(CANDLE_STORE_DIR, interval="5m", depth=CANDLE_STORE_DEPTH)
+        print(f"Candle store aktif: {CANDLE_STORE_DIR} ({CANDLE_STORE_DEPTH} candle/symbol).")
+
     # Manager buffer candle 5m
-    ohlc_mgr = OHLCBufferManager(max_candles=MAX_5M_CANDLES)
+    # (+ statistik range incremental per symbol, + deteksi gap open_time)
+    ohlc_mgr = OHLCBufferManager(
+        max_candles=MAX_5M_CANDLES,
+        rolling_factory=lambda: RollingRangeState(range_settings.range_lookback),
+        interval_ms=BAR_5M_MS,
+        store=store,
+    )
+    print(f"Buffer 5m: {MAX_5M_CANDLES} candle/symbol, {ohlc_mgr.bytes_per_symbol / 1024:.1f} KB/symbol (tetap).")
+
+    # Pengirim Telegram async (rate limit + prioritas), broadcast tidak menahan worker analisa.
+    # Job sinyal yang belum terkirim dari run sebelumnya di-replay dari outbox.
+    await telegram_sender.start()
+    register_stats("telegram", telegram_sender.format_stats)
+
+    # Worker pool analisa + delivery
+    pipeline = AnalysisPipeline(_score_signal)
+    await pipeline.start()
+    register_stats("pipeline", pipeline.format_stats)
+
+    loop = asyncio.get_running_loop()
+
+    def on_batch_complete(open_time: int, results: List[Dict], late: bool = False) -> None:
+        # job terakhir selesai di thread worker → kirim & ubah state di event loop
+        try:
+            loop.call_soon_threadsafe(_send_bar_signals, open_time, results, late)
+        except RuntimeError:
+            print(f"Event loop sudah berhenti, {len(results)} sinyal bar {open_time} tidak dikirim.")
+
+    # open_time bar → batch sinyal bar itu (None = sudah di-flush tanpa kandidat).
+    # Flush straggler (candle close telat) bar yang sama digabung ke batch ini.
+    bar_batches: Dict[int, Optional[BarSignalBatch]] = {}
+
+    async def on_bar_flush(open_time: int, closed_symbols: List[str]) -> None:
+        first_flush = open_time not in bar_batches
+        if first_flush:
+            bar_batches[open_time] = None
+            oldest = open_time - BAR_BATCH_HISTORY * BAR_5M_MS
+            for ot in [ot for ot in bar_batches if ot < oldest]:
+                del bar_batches[ot]
+
+        # Bar 5m ini menutup bar 15m (dan mungkin 1h) → hitung ulang tabel HTF
+        # semua symbol sekali (di thread), sebelum kandidat bar ini dinilai.
+        # Flush straggler bar yang sama tidak menghitung ulang.
+        bar_close = open_time + BAR_5M_MS
+        if first_flush and range_settings.use_htf_filter and bar_close % HTF_INTERVALS["15m"] == 0:
+            # snapshot diambil di loop: thread refresh tidak membaca ring yang sedang ditulis
+            snapshot = snapshot_htf(symbols)
+            await asyncio.get_running_loop().run_in_executor(None, htf_table.refresh, snapshot)
+
+        # Deteksi range + breakout untuk semua symbol bar ini sekaligus
+        if not state.scanning:
+            return
+        now_ts = time.time()
+        eligible = [
+            sym for sym in closed_symbols
+            if ohlc_mgr.count(sym) >= 40
+            and ohlc_mgr.is_ready(sym)  # symbol dengan gap belum di-heal → skip
+            and not _in_cooldown(sym, now_ts)
+        ]
+        if not eligible:
+            return
+
+        # Jalur utama: statistik incremental O(1) per symbol.
+        # Symbol yang state-nya tidak berakhir di bar ini → jalur matrix NumPy.
+        snapshots = {}
+        arrays = {}
+        for sym in eligible:
+            rolling = ohlc_mgr.get_rolling(sym)
+            if rolling is not None and rolling.last is not None and rolling.last[0] == open_time:
+                snapshots[sym] = rolling.snapshot()
+            else:
+                # view berakhir di candle bar ini (abaikan candle berjalan bar berikutnya)
+                arrays[sym] = ohlc_mgr.get_arrays(sym, upto_open_time=open_time)
+
+        candidates = find_range_candidates_from_stats(snapshots)
+        if arrays:
+            candidates.update(find_range_candidates(arrays))
+
+        if ROLLING_STATS_VERIFY and snapshots:
+            ref = find_range_candidates({
+                sym: ohlc_mgr.get_arrays(sym, upto_open_time=open_time) for sym in snapshots
+            })
+            rolling_cands = {sym: c for sym, c in candidates.items() if sym in snapshots}
+            mismatched = compare_candidates(rolling_cands, ref)
+            verify_stats["checked"] += len(snapshots)
+            verify_stats["mismatch"] += len(mismatched)
+            if mismatched:
+                print(f"[VERIFY] Rolling stats beda dengan NumPy untuk: {', '.join(mismatched)}")
+
+        if state.debug:
+            print(
+                f"[{time.strftime('%H:%M:%S')}] Bar close: {len(closed_symbols)} symbol, "
+                f"{len(eligible)} dianalisa ({len(snapshots)} incremental), "
+                f"{len(candidates)} kandidat breakout."
+            )
+        if not candidates:
+            return
+        # Semua kandidat bar ini dinilai dulu, lalu diranking & dikirim sekaligus.
+        # Straggler: gabung ke batch bar ini selama belum terkirim; kalau sudah →
+        # batch terpisah yang hanya jadi digest susulan VIP.
+        batch = bar_batches.get(open_time)
+        if batch is None:
+            batch = BarSignalBatch(open_time, len(candidates), on_batch_complete)
+            bar_batches[open_time] = batch
+        elif not batch.extend(len(candidates)):
+            batch = BarSignalBatch(open_time, len(candidates), partial(on_batch_complete, late=True))
+        for sym, setup in candidates.items():
+            if not await pipeline.submit((sym, setup, batch)):
+                batch.add(None)  # job di-drop (queue penuh) tetap dihitung selesai
+
+    verify_stats = {"checked": 0, "mismatch": 0}
+    if ROLLING_STATS_VERIFY:
+        register_stats(
+            "rolling_verify",
+            lambda: (
+                f"Verify     : {verify_stats['checked']} cek rolling vs NumPy, "
+                f"{verify_stats['mismatch']} beda"
+            ),
+        )
+
+    # Backfill gap candle setelah reconnect (concurrent, paging startTime)
+    healer = GapHealer(
+        ohlc_mgr,
+        interval="5m",
+        on_healed=htf_buffers.on_5m_backfill if range_settings.use_htf_filter else None,
+    )
+    register_stats("gaps", healer.format_stats)
+
+    # Decoder frame WebSocket (orjson kalau ada, update intrabar dilewati tanpa parse)
+    decoder = KlineFrameDecoder()
+    register_stats("decoder", decoder.format_stats)
+
+    barrier = BarCloseBarrier(on_bar_flush)
+    register_stats("barrier", barrier.format_stats)
+    register_stats("htf", htf_table.format_stats)
+
+    # Volume 24h live dari !ticker@arr → ranking pair tanpa polling REST
+    pair_universe.start()
+    register_stats("universe", pair_universe.format_stats)
+    register_stats("http", http.format_stats)
+
+    async def load_history(new_symbols: List[str]) -> None:
+        """Isi buffer 5m (+ HTF) untuk symbol yang baru masuk universe."""
+        # Warm restart: isi buffer dari disk, gap sejak shutdown di-heal di background
+        to_preload = new_symbols
+        if store is not None:
+            last_closed = (int(time.time() * 1000) // BAR_5M_MS - 1) * BAR_5M_MS
+            restored = [
+                s for s in new_symbols
+                if ohlc_mgr.restore_from_store(s.upper(), last_closed, PRELOAD_LIMIT_5M)
+            ]
+            if restored:
+                print(f"Restore {len(restored)} symbol dari candle store, backfill gap di background...")
+                healer.schedule()
+            restored_set = set(restored)
+            to_preload = [s for s in new_symbols if s not in restored_set]
+
+        # Preload history 5m (concurrent, hasil langsung masuk buffer)
+        if to_preload:
+            print(f"Mulai preload history 5m untuk {len(to_preload)} symbol (limit={PRELOAD_LIMIT_5M})...")
+            summary = await preload_klines(to_preload, "5m", PRELOAD_LIMIT_5M, ohlc_mgr.preload_candles)
+            print(
+                f"Preload selesai: {summary['ok']} ok, {summary['failed']} gagal "
+                f"dalam {summary['elapsed']:.1f}s."
+            )
+
+        # Backfill HTF sekali; selanjutnya di-resample dari candle 5m close
+        if range_settings.use_htf_filter:
+            for interval in HTF_INTERVALS:
+                await preload_klines(
+                    new_symbols,
+                    interval,
+                    HTF_CANDLES,
+                    partial(htf_buffers.preload, interval),
+                )
+            htf_table.refresh(snapshot_htf(symbols))
+            print(htf_table.format_stats())
+
+    def evict_symbols(removed: List[str]) -> None:
+        """Buang semua state symbol yang keluar dari universe."""
+        for s in removed:
+            sym = s.upper()
+            ohlc_mgr.forget(sym)
+            htf_buffers.forget(sym)
+            decoder.forget(sym)
+            state.last_signal_time.pop(sym, None)
+
+    def diff_universe(new_symbols: List[str]) -> Tuple[List[str], List[str]]:
+        old = {s.upper() for s in symbols}
+        new = {s.upper() for s in new_symbols}
+        added = [s for s in new_symbols if s.upper() not in old]
+        removed = [s for s in symbols if s.upper() not in new]
+        return added, removed
+
+    async def refresh_universe(stream: ShardedKlineStream, forced: bool) -> None:
+        """
+        Refresh daftar pair tanpa memutus WebSocket: subscribe/unsubscribe diff
+        di koneksi yang jalan, preload hanya pair baru, evict pair yang keluar.
+        Symbol lain tetap menerima candle selama proses ini.
+        forced=True (admin ubah /minvol /maxpairs) → ranking tanpa hysteresis.
+        """
+        nonlocal symbols
+        if forced:
+            print("Refresh daftar pair USDT perpetual berdasarkan volume (live)...")
+        try:
+            new_symbols = await asyncio.to_thread(
+                get_usdt_pairs,
+                state.max_pairs,
+                state.min_volume_usdt,
+                None if forced else symbols,
+            )
+        except Exception as e:
+            print("Gagal refresh daftar pair:", e)
+            return
+        if not new_symbols:
+            print("Daftar pair baru kosong → universe lama dipertahankan.")
+            return
+
+        added, removed = diff_universe(new_symbols)
+        symbols = new_symbols
+        pair_universe.current = symbols
+        if not added and not removed:
+            if forced:
+                print("Daftar pair tidak berubah.")
+            return
+        print(
+            f"Universe berubah: +{len(added)} pair ({', '.join(s.upper() for s in added) or '-'}), "
+            f"-{len(removed)} pair ({', '.join(s.upper() for s in removed) or '-'})."
+        )
+
+        active_symbols.clear()
+        active_symbols.update(s.upper() for s in symbols)
+        barrier.expected = len(symbols)
+
+        # Subscribe dulu supaya candle pair baru tidak terlewat selama preload REST
+        await stream.add_symbols(added)
+        await stream.remove_symbols(removed)
+        evict_symbols(removed)
+        if added:
+            await load_history(added)
+
+    # Symbol yang sedang discan (frame symbol lain yang masih nyangkut di queue diabaikan)
+    active_symbols: Set[str] = set()
 
     while state.running:
         try:
@@ -78,40 +442,48 @@ async def run_range_bot():
 
             if need_refresh_pairs:
                 print("Refresh daftar pair USDT perpetual berdasarkan volume...")
-                symbols = get_usdt_pairs(state.max_pairs, state.min_volume_usdt)
+                new_symbols = await asyncio.to_thread(
+                    get_usdt_pairs, state.max_pairs, state.min_volume_usdt
+                )
                 last_pairs_refresh = now
                 state.force_pairs_refresh = False
 
-                print(f"Scan {len(symbols)} pair:", ", ".join(s.upper() for s in symbols))
+                _, removed = diff_universe(new_symbols)
+                evict_symbols(removed)
+                symbols = new_symbols
+                pair_universe.current = symbols
+                active_symbols.clear()
+                active_symbols.update(s.upper() for s in symbols)
 
-                # Preload history 5m untuk tiap symbol
-                print(f"Mulai preload history 5m untuk {len(symbols)} symbol (limit={PRELOAD_LIMIT_5M})...")
-                for sym in symbols:
-                    try:
-                        kl = _fetch_klines(sym.upper(), "5m", PRELOAD_LIMIT_5M)
-                        ohlc_mgr.preload_candles(sym.upper(), kl)
-                    except Exception as e:
-                        print(f"[{sym}] Gagal preload 5m:", e)
-                        continue
-                print("Preload selesai.")
+                print(f"Scan {len(symbols)} pair:", ", ".join(s.upper() for s in symbols))
+                await load_history(symbols)
 
             if not symbols:
                 print("Tidak ada symbol untuk discan. Tidur sebentar...")
                 await asyncio.sleep(5)
                 continue
 
-            # Build multi-stream URL
-            streams = "/".join(f"{s}@kline_5m" for s in symbols)
-            ws_url = f"{BINANCE_STREAM_URL}?streams={streams}"
-
-            print(f"Menghubungkan ke WebSocket: {ws_url}")
-            async with websockets.connect(ws_url, ping_interval=20, ping_timeout=20) as ws:
-                print("WebSocket terhubung.")
-                if state.scanning:
-                    print("Scan sebelumnya AKTIF → melanjutkan scan otomatis.")
-                else:
-                    print("Bot dalam mode STANDBY. Gunakan /startscan untuk mulai scan.\n")
-
+            # Ingest multi-koneksi: symbol dipecah ke beberapa shard WebSocket
+            stream = ShardedKlineStream(symbols, interval="5m")
+            barrier.expected = len(symbols)
+            await stream.start()
+            register_stats("ws", stream.format_stats)
+            if state.scanning:
+                print("Scan sebelumnya AKTIF → melanjutkan scan otomatis.")
+            else:
+                print("Bot dalam mode STANDBY. Gunakan /startscan untuk mulai scan.\n")
+
+            def wake_receive(q: asyncio.Queue = stream.queue) -> None:
+                # sentinel None: receive loop bangun & cek flag restart/stop sekarang
+                try:
+                    q.put_nowait(None)
+                except asyncio.QueueFull:
+                    pass  # queue penuh = receive loop sedang sibuk, flag dicek sebentar lagi
+
+            engine_commands.add_waker(wake_receive)
+            universe_task: Optional[asyncio.Task] = None
+            last_rerank = time.time()
+            try:
                 while state.running:
                     # Soft restart diminta dari Telegram
                     if state.request_soft_restart:
@@ -119,87 +491,102 @@ async def run_range_bot():
                         state.request_soft_restart = False
                         break
 
-                    # Perlu refresh daftar pair?
-                    if time.time() - last_pairs_refresh > refresh_interval:
-                        print("Interval refresh pair tercapai → refresh daftar pair & reconnect WebSocket...")
-                        break
+                    # Perlu refresh daftar pair? (/minvol, /maxpairs, interval, atau
+                    # ranking ulang berkala dari volume live) → diff universe di background,
+                    # WebSocket tetap jalan
+                    now = time.time()
+                    forced = state.force_pairs_refresh
+                    if (
+                        forced
+                        or now - last_pairs_refresh > refresh_interval
+                        or (now - last_rerank > RERANK_INTERVAL and pair_universe.ticker_live())
+                    ) and (universe_task is None or universe_task.done()):
+                        if forced or now - last_pairs_refresh > refresh_interval:
+                            last_pairs_refresh = now
+                        last_rerank = now
+                        state.force_pairs_refresh = False
+                        universe_task = asyncio.create_task(
+                            refresh_universe(stream, forced), name="universe-refresh"
+                        )
 
                     try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=60)
+                        msg = await asyncio.wait_for(stream.queue.get(), timeout=60)
                     except asyncio.TimeoutError:
                         if state.debug:
                             print("Timeout menunggu data WebSocket, lanjut...")
                         continue
+                    if msg is None:
+                        continue  # dibangunkan command engine
 
-                    try:
-                        data = json.loads(msg)
-                    except json.JSONDecodeError:
-                        if state.debug:
-                            print("Gagal decode JSON dari WebSocket.")
+                    # Fast path: update intrabar dilewati tanpa parse JSON,
+                    # kline hanya di-materialize penuh saat candle close
+                    kline = decoder.feed(msg)
+                    if kline is None:
                         continue
 
-                    kline = data.get("data", {}).get("k")
-                    if not kline:
-                        continue
-
-                    symbol = kline.get("s", "").upper()
-                    if not symbol:
-                        continue
+                    symbol = kline["s"].upper()
+                    if symbol not in active_symbols:
+                        continue  # sudah di-unsubscribe, frame sisa di queue
 
-                    # Update buffer OHLC untuk symbol ini
+                    # Update buffer OHLC untuk symbol ini (candle close)
                     ohlc_mgr.update_from_kline(symbol, kline)
-                    candle_closed = bool(kline.get("x", False))
+
+                    # Ada candle yang bolong (mis. habis reconnect) → backfill di background
+                    if ohlc_mgr.has_new_gaps():
+                        healer.schedule()
 
                     # Log optional ketika candle 5m close
-                    if state.debug and candle_closed:
-                        buf_len = len(ohlc_mgr.get_candles(symbol))
+                    if state.debug:
+                        buf_len = ohlc_mgr.count(symbol)
                         print(f"[{time.strftime('%H:%M:%S')}] 5m close: {symbol} — total candle: {buf_len}")
 
-                    # Hanya analisa saat candle 5m sudah close
-                    if not candle_closed:
-                        continue
-
-                    # Kalau scan belum diaktifkan, skip analisa
-                    if not state.scanning:
-                        continue
-
-                    candles = ohlc_mgr.get_candles(symbol)
-                    if len(candles) < 40:
-                        continue
-
-                    # Cooldown per symbol
-                    now_ts = time.time()
-                    if state.cooldown_seconds > 0:
-                        last_ts = state.last_signal_time.get(symbol)
-                        if last_ts and now_ts - last_ts < state.cooldown_seconds:
-                            if state.debug:
-                                print(
-                                    f"[{symbol}] Skip cooldown "
-                                    f"({int(now_ts - last_ts)}s/{state.cooldown_seconds}s)"
-                                )
-                            continue
-
-                    # ANALISA RANGE ENGINE
-                    result = analyze_symbol_range(symbol, candles)
-                    if not result:
-                        continue
-
-                    text = result["message"]
-                    broadcast_signal(text)
-
-                    state.last_signal_time[symbol] = now_ts
-                    print(
-                        f"[{symbol}] RANGE sinyal dikirim: "
-                        f"Tier {result['tier']} (Score {result['score']}) "
-                        f"Entry {result['entry']:.6f} SL {result['sl']:.6f}"
-                    )
+                    # Resample candle 5m close ke buffer HTF lokal (15m & 1h)
+                    last = ohlc_mgr.last_candle(symbol)
+                    if last is not None:
+                        htf_buffers.on_5m_close(symbol, last)
+
+                    # Kumpulkan per bar → refresh HTF + analisa batch saat bar lengkap / deadline
+                    # (flush melewati analisa kalau scan belum diaktifkan)
+                    barrier.on_close(symbol, int(kline.get("t", 0)))
+            finally:
+                engine_commands.remove_waker(wake_receive)
+                if universe_task is not None and not universe_task.done():
+                    universe_task.cancel()
+                    try:
+                        await universe_task
+                    except (asyncio.CancelledError, Exception):
+                        pass
+                unregister_stats("ws")
+                await stream.stop()
 
-        except websockets.ConnectionClosed:
-            print("WebSocket terputus. Reconnect dalam 5 detik...")
-            await asyncio.sleep(5)
         except Exception as e:
             print("Error di run_range_bot (luar):", e)
             print("Coba reconnect dalam 5 detik...")
             await asyncio.sleep(5)
 
+    barrier.cancel()
+    await healer.stop()
+    await pair_universe.stop()
+    if store is not None:
+        store.flush()
+    unregister_stats("gaps")
+    unregister_stats("rolling_verify")
+    unregister_stats("decoder")
+    unregister_stats("htf")
+    unregister_stats("universe")
+    unregister_stats("http")
+    unregister_stats("barrier")
+    unregister_stats("pipeline")
+    await pipeline.stop()
+    unregister_stats("telegram")
+    await telegram_sender.stop()  # drain antrian kirim (sisanya tetap di outbox)
+    for task in (command_task, vip_expiry_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    unregister_stats("commands")
+    unregister_stats("eligibility")
+    unregister_stats("filters")
     print("run_range_bot selesai karena state.running = False")
@@ -0,0 +1,316 @@
+# binance/binance_ws_shards.py
+# Ingest WebSocket kline multi-koneksi:
+# - daftar symbol dipecah ke beberapa koneksi (shard) supaya tidak kena
+#   limit stream per koneksi / panjang URL
+# - semua shard menulis ke satu asyncio.Queue
+# - tiap shard reconnect sendiri-sendiri (satu socket putus tidak membutakan semua)
+# - statistik message-rate per shard
+# - symbol bisa ditambah / dibuang live via frame SUBSCRIBE/UNSUBSCRIBE
+#   (tanpa memutus koneksi yang sedang jalan)
+# - rotasi terjadwal make-before-break (< batas 24 jam Binance): koneksi pengganti
+#   dibuka dulu, baru koneksi lama ditutup → tidak ada candle close yang hilang
+#   (candle close dobel selama overlap dibuang KlineFrameDecoder setelah parse)
+# - reconnect pakai exponential backoff + jitter
+
+import asyncio
+import json
+import random
+import time
+from typing import List, Optional
+
+import websockets
+
+from config import BINANCE_STREAM_URL, WS_ROTATE_HOURS, WS_STREAMS_PER_CONN
+from core.bot_state import state
+
+# Queue message mentah dari semua shard (backpressure ke shard kalau penuh)
+INGEST_QUEUE_MAXSIZE = 10000
+# Backoff reconnect per shard (detik): base * 2^(gagal-1), maks RECONNECT_MAX_DELAY, + jitter
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+# Koneksi yang bertahan selama ini dianggap sehat → hitungan backoff di-reset
+HEALTHY_CONN_SECONDS = 60
+# Lama dua koneksi jalan bersamaan saat rotasi (detik)
+ROTATE_OVERLAP = 5.0
+# Kalau buka koneksi pengganti gagal, coba rotasi lagi setelah (detik)
+ROTATE_RETRY = 60.0
+# Max stream per frame SUBSCRIBE/UNSUBSCRIBE & jeda antar frame
+# (Binance membatasi jumlah message masuk per detik per koneksi)
+SUBSCRIBE_BATCH = 200
+SUBSCRIBE_DELAY = 0.25
+
+
+def _backoff_delay(failures: int) -> float:
+    """Exponential backoff dengan jitter (setengah delay acak) supaya shard tidak reconnect serentak."""
+    delay = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** max(0, failures - 1))
+    return random.uniform(delay / 2, delay)
+
+
+class KlineShard:
+    """Satu koneksi WebSocket combined-stream untuk sebagian symbol."""
+
+    def __init__(self, shard_id: int, symbols: List[str], queue: asyncio.Queue, interval: str = "5m") -> None:
+        self.shard_id = shard_id
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.queue = queue
+        self._task: Optional[asyncio.Task] = None
+        self._ws = None
+        self._request_id = 0
+        self.rotate_after = WS_ROTATE_HOURS * 3600
+
+        # statistik
+        self.connected = False
+        self.connects = 0
+        self.rotations = 0
+        self.messages = 0
+        self.last_msg_ts = 0.0
+        self.rate = 0.0  # msg/detik (EWMA)
+        self._rate_count = 0
+        self._rate_t0 = time.time()
+
+    @property
+    def streams(self) -> List[str]:
+        return [f"{s.lower()}@kline_{self.interval}" for s in self.symbols]
+
+    @property
+    def url(self) -> str:
+        return f"{BINANCE_STREAM_URL}?streams={'/'.join(self.streams)}"
+
+    async def _send_method(self, method: str, symbols: List[str]) -> None:
+        streams = [f"{s.lower()}@kline_{self.interval}" for s in symbols]
+        for i in range(0, len(streams), SUBSCRIBE_BATCH):
+            ws = self._ws
+            if ws is None:
+                return  # belum terhubung → URL reconnect sudah memakai daftar symbol baru
+            self._request_id += 1
+            frame = {"method": method, "params": streams[i:i + SUBSCRIBE_BATCH], "id": self._request_id}
+            try:
+                await ws.send(json.dumps(frame))
+            except Exception as e:
+                print(f"[WS shard {self.shard_id}] gagal kirim {method}:", e)
+                return
+            await asyncio.sleep(SUBSCRIBE_DELAY)
+
+    async def subscribe(self, symbols: List[str]) -> None:
+        """Tambah symbol ke koneksi yang sedang jalan."""
+        have = {s.upper() for s in self.symbols}
+        new = [s for s in symbols if s.upper() not in have]
+        if not new:
+            return
+        self.symbols.extend(new)
+        await self._send_method("SUBSCRIBE", new)
+
+    async def unsubscribe(self, symbols: List[str]) -> None:
+        """Buang symbol dari koneksi yang sedang jalan."""
+        drop = {s.upper() for s in symbols}
+        gone = [s for s in self.symbols if s.upper() in drop]
+        if not gone:
+            return
+        self.symbols = [s for s in self.symbols if s.upper() not in drop]
+        await self._send_method("UNSUBSCRIBE", gone)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"ws-shard-{self.shard_id}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self.connected = False
+
+    def _count_message(self) -> None:
+        now = time.time()
+        self.messages += 1
+        self.last_msg_ts = now
+        self._rate_count += 1
+        elapsed = now - self._rate_t0
+        if elapsed >= 1.0:
+            inst = self._rate_count / elapsed
+            self.rate = inst if self.rate == 0 else 0.7 * self.rate + 0.3 * inst
+            self._rate_count = 0
+            self._rate_t0 = now
+
+    async def _open(self):
+        ws = await websockets.connect(self.url, ping_interval=20, ping_timeout=20)
+        self.connects += 1
+        return ws
+
+    async def _pump(self, ws) -> None:
+        """Baca satu koneksi ke queue (frame mentah, tanpa scan isi)."""
+        async for msg in ws:
+            self._count_message()
+            await self.queue.put(msg)
+
+    async def _close(self, ws, reader: asyncio.Task) -> None:
+        reader.cancel()
+        try:
+            await reader
+        except (asyncio.CancelledError, Exception):
+            pass
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _serve(self, ws) -> None:
+        """
+        Jalankan koneksi sampai putus. Saat umurnya lewat rotate_after:
+        buka koneksi pengganti, jalankan keduanya ROTATE_OVERLAP detik, tutup yang lama.
+        """
+        reader = asyncio.create_task(self._pump(ws))
+        rotate_at = time.time() + self.rotate_after
+        try:
+            while True:
+                done, _ = await asyncio.wait({reader}, timeout=max(1.0, rotate_at - time.time()))
+                if reader in done:
+                    reader.result()  # lempar error koneksi (kalau ada)
+                    return
+
+                try:
+                    new_ws = await self._open()
+                except Exception as e:
+                    print(f"[WS shard {self.shard_id}] gagal buka koneksi rotasi: {e}. Coba lagi nanti.")
+                    rotate_at = time.time() + ROTATE_RETRY
+                    continue
+
+                new_reader = asyncio.create_task(self._pump(new_ws))
+                self._ws = new_ws
+                await asyncio.sleep(ROTATE_OVERLAP)
+                await self._close(ws, reader)
+                ws, reader = new_ws, new_reader
+                rotate_at = time.time() + self.rotate_after
+                self.rotations += 1
+                print(f"[WS shard {self.shard_id}] rotasi koneksi selesai (make-before-break).")
+        finally:
+            await self._close(ws, reader)
+
+    async def _run(self) -> None:
+        failures = 0
+        while state.running:
+            t0 = time.time()
+            try:
+                ws = await self._open()
+                self._ws = ws
+                self.connected = True
+                print(f"[WS shard {self.shard_id}] terhubung ({len(self.symbols)} stream).")
+                await self._serve(ws)
+                print(f"[WS shard {self.shard_id}] koneksi ditutup server.")
+            except asyncio.CancelledError:
+                raise
+            except websockets.ConnectionClosed:
+                print(f"[WS shard {self.shard_id}] terputus.")
+            except Exception as e:
+                print(f"[WS shard {self.shard_id}] error:", e)
+            finally:
+                self._ws = None
+                self.connected = False
+
+            if time.time() - t0 > HEALTHY_CONN_SECONDS:
+                failures = 0
+            failures += 1
+            delay = _backoff_delay(failures)
+            print(f"[WS shard {self.shard_id}] reconnect dalam {delay:.1f} detik...")
+            await asyncio.sleep(delay)
+
+
+class ShardedKlineStream:
+    """
+    Pecah symbol ke N koneksi WebSocket dan gabungkan ke satu queue.
+
+    Pemakaian:
+        stream = ShardedKlineStream(symbols)
+        await stream.start()
+        msg = await stream.queue.get()
+        ...
+        await stream.stop()
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        streams_per_conn: int = WS_STREAMS_PER_CONN,
+        interval: str = "5m",
+        queue_maxsize: int = INGEST_QUEUE_MAXSIZE,
+    ) -> None:
+        self.streams_per_conn = max(1, streams_per_conn)
+        self.interval = interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_maxsize)
+        self.shards: List[KlineShard] = []
+        for i in range(0, len(symbols), self.streams_per_conn):
+            chunk = symbols[i:i + self.streams_per_conn]
+            self.shards.append(KlineShard(len(self.shards), chunk, self.queue, interval))
+
+    async def start(self) -> None:
+        print(
+            f"Start {len(self.shards)} koneksi WebSocket "
+            f"(max {self.streams_per_conn} stream/koneksi)."
+        )
+        for shard in self.shards:
+            shard.start()
+
+    async def stop(self) -> None:
+        for shard in self.shards:
+            await shard.stop()
+
+    @property
+    def symbols(self) -> List[str]:
+        return [s for shard in self.shards for s in shard.symbols]
+
+    async def add_symbols(self, symbols: List[str]) -> None:
+        """
+        Subscribe symbol baru di koneksi yang masih punya slot;
+        sisanya dibuka di shard baru. Koneksi lama tidak diputus.
+        """
+        have = {s.upper() for s in self.symbols}
+        pending = [s for s in symbols if s.upper() not in have]
+        for shard in self.shards:
+            if not pending:
+                break
+            free = self.streams_per_conn - len(shard.symbols)
+            if free <= 0:
+                continue
+            chunk, pending = pending[:free], pending[free:]
+            await shard.subscribe(chunk)
+
+        next_id = max((s.shard_id for s in self.shards), default=-1) + 1
+        for i in range(0, len(pending), self.streams_per_conn):
+            shard = KlineShard(next_id, pending[i:i + self.streams_per_conn], self.queue, self.interval)
+            next_id += 1
+            self.shards.append(shard)
+            shard.start()
+
+    async def remove_symbols(self, symbols: List[str]) -> None:
+        """Unsubscribe symbol; shard yang jadi kosong ditutup."""
+        for shard in self.shards:
+            await shard.unsubscribe(symbols)
+        empty = [s for s in self.shards if not s.symbols]
+        for shard in empty:
+            await shard.stop()
+        self.shards = [s for s in self.shards if s.symbols]
+
+    def total_rate(self) -> float:
+        return sum(s.rate for s in self.shards)
+
+    def format_stats(self) -> str:
+        connected = sum(1 for s in self.shards if s.connected)
+        rotations = sum(s.rotations for s in self.shards)
+        reconnects = sum(max(0, s.connects - 1) for s in self.shards) - rotations
+        lines = [
+            f"WS Shards  : {connected}/{len(self.shards)} terhubung, "
+            f"{self.total_rate():.0f} msg/s, reconnect {reconnects}x, "
+            f"rotasi {rotations}x, "
+            f"queue {self.queue.qsize()}"
+        ]
+        if state.debug:
+            for s in self.shards:
+                lines.append(
+                    f"  #{s.shard_id}: {len(s.symbols)} stream, {s.rate:.1f} msg/s, "
+                    f"{s.messages} msg, {'ON' if s.connected else 'OFF'}"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,173 @@
+# binance/candle_store.py
+# Penyimpanan candle di disk (opsional) untuk warm restart:
+# - satu file per symbol, record ukuran tetap, diakses via np.memmap
+# - ring buffer di file (depth bisa jauh > MAX_5M_CANDLES tanpa menambah RAM resident)
+# - ditulis tiap candle close; saat start, buffer diisi dari file dalam hitungan ms
+#   lalu hanya gap sejak shutdown yang di-backfill dari REST.
+#
+# Layout file: record 0 = header (magic, count, head), record 1..depth = data candle.
+# Halaman memmap ada di page cache kernel (MAP_SHARED), jadi tetap tersimpan
+# walaupun proses di-exec ulang (hard restart) tanpa flush eksplisit.
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ("open_time", "<i8"),
+    ("close_time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+# penanda file valid (disimpan di field "open" header): ASCII "SMC"
+_MAGIC = float(0x534D43)
+
+
+class SymbolStore:
+    """File memmap untuk satu symbol."""
+
+    def __init__(self, path: str, depth: int) -> None:
+        self.path = path
+        exists = os.path.exists(path)
+        if exists:
+            records = os.path.getsize(path) // RECORD_DTYPE.itemsize
+            if records >= 2:
+                mm = np.memmap(path, dtype=RECORD_DTYPE, mode="r+", shape=(records,))
+                if mm[0]["open"] == _MAGIC:
+                    self.mm = mm
+                    self.depth = records - 1
+                    return
+                del mm
+            print(f"File candle store tidak valid, dibuat ulang: {path}")
+        self.depth = depth
+        self.mm = np.memmap(path, dtype=RECORD_DTYPE, mode="w+", shape=(depth + 1,))
+        self.mm[0]["open"] = _MAGIC
+        self.mm[0]["open_time"] = 0   # count
+        self.mm[0]["close_time"] = -1  # head (slot data terakhir)
+
+    @property
+    def count(self) -> int:
+        return int(self.mm[0]["open_time"])
+
+    @property
+    def head(self) -> int:
+        return int(self.mm[0]["close_time"])
+
+    def last_open_time(self) -> Optional[int]:
+        if self.count == 0:
+            return None
+        return int(self.mm[1 + self.head]["open_time"])
+
+    def _append(self, rec) -> None:
+        head = (self.head + 1) % self.depth
+        self.mm[0]["close_time"] = head
+        self.mm[0]["open_time"] = min(self.count + 1, self.depth)
+        self.mm[1 + head] = rec
+
+    def write(self, open_time: int, close_time: int,
+              o: float, h: float, l: float, c: float, v: float) -> None:
+        rec = (open_time, close_time, o, h, l, c, v)
+        last_ot = self.last_open_time()
+        if last_ot is None or open_time > last_ot:
+            self._append(rec)
+        elif open_time == last_ot:
+            self.mm[1 + self.head] = rec
+        else:
+            # candle susulan (lebih tua dari record terakhir) → sisipkan sesuai open_time
+            self.merge(np.array([rec], dtype=RECORD_DTYPE))
+
+    def merge(self, recs: np.ndarray) -> None:
+        """
+        Tulis record (boleh lebih tua dari record terakhir, mis. hasil heal gap) sesuai
+        urutan open_time: record di disk mulai open_time terkecil yang masuk ditulis ulang
+        bersama record baru (record baru menang kalau open_time sama).
+        """
+        if recs.size == 0:
+            return
+        first = int(recs["open_time"].min())
+        tail = self.read_last(self.count)
+        tail = tail[tail["open_time"] >= first]
+        if tail.size:
+            # mundurkan head sebanyak record yang ditulis ulang
+            self.mm[0]["close_time"] = (self.head - tail.size) % self.depth
+            self.mm[0]["open_time"] = self.count - tail.size
+        merged = np.concatenate([recs, tail])
+        _, idx = np.unique(merged["open_time"], return_index=True)  # urut, record baru menang
+        for rec in merged[idx]:
+            self._append(rec)
+
+    def read_last(self, n: int) -> np.ndarray:
+        """n record terakhir (lama → baru). Copy kecil, bukan view."""
+        n = max(0, min(n, self.count))
+        if n == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        data = self.mm[1:]
+        end = self.head + 1
+        start = end - n
+        if start >= 0:
+            return np.array(data[start:end])
+        return np.concatenate([data[start:], data[:end]])
+
+    def flush(self) -> None:
+        self.mm.flush()
+
+
+class CandleStore:
+    def __init__(self, directory: str, interval: str = "5m", depth: int = 8640) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.depth = depth
+        self._files: Dict[str, SymbolStore] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _get(self, symbol: str) -> SymbolStore:
+        store = self._files.get(symbol)
+        if store is None:
+            path = os.path.join(self.directory, f"{symbol.upper()}_{self.interval}.bin")
+            store = SymbolStore(path, self.depth)
+            self._files[symbol] = store
+        return store
+
+    def write(self, symbol: str, open_time: int, close_time: int,
+              o: float, h: float, l: float, c: float, v: float) -> None:
+        self._get(symbol).write(open_time, close_time, o, h, l, c, v)
+
+    def write_rows(self, symbol: str, klines: List[list]) -> None:
+        """Simpan klines REST (raw Binance array), disisipkan sesuai open_time."""
+        recs = []
+        for row in klines:
+            try:
+                recs.append((int(row[0]), int(row[6]), float(row[1]), float(row[2]),
+                             float(row[3]), float(row[4]), float(row[5])))
+            except (ValueError, IndexError):
+                continue
+        self._get(symbol).merge(np.array(recs, dtype=RECORD_DTYPE))
+
+    def has(self, symbol: str) -> bool:
+        path = os.path.join(self.directory, f"{symbol.upper()}_{self.interval}.bin")
+        return symbol in self._files or os.path.exists(path)
+
+    def last_open_time(self, symbol: str) -> Optional[int]:
+        return self._get(symbol).last_open_time()
+
+    def load_rows(self, symbol: str, n: int) -> List[list]:
+        """n candle terakhir dalam format raw Binance (untuk preload_candles)."""
+        recs = self._get(symbol).read_last(n)
+        return [
+            [int(r["open_time"]), r["open"], r["high"], r["low"], r["close"], r["volume"], int(r["close_time"])]
+            for r in recs
+        ]
+
+    def forget(self, symbol: str) -> None:
+        """Tutup file symbol (data di disk tetap ada)."""
+        store = self._files.pop(symbol, None)
+        if store is not None:
+            store.flush()
+
+    def flush(self) -> None:
+        for store in self._files.values():
+            store.flush()
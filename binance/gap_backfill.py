@@ -0,0 +1,91 @@
+# binance/gap_backfill.py
+# Heal gap candle setelah reconnect WebSocket:
+# OHLCBufferManager mendeteksi loncatan open_time → symbol ditandai not-ready,
+# GapHealer backfill semua symbol yang bolong secara concurrent (paging startTime),
+# lalu symbol kembali ready tanpa perlu re-preload semua pair.
+
+import asyncio
+from typing import Callable, List, Optional, Set
+
+from config import PRELOAD_CONCURRENCY
+from binance.binance_preload import fetch_klines_range
+from binance.ohlc_buffer import OHLCBufferManager
+
+# Tunggu sebentar sebelum backfill, supaya gap dari satu reconnect terkumpul jadi satu batch
+BATCH_DELAY = 1.0
+# Jeda retry kalau ada backfill yang gagal
+RETRY_DELAY = 10.0
+
+
+class GapHealer:
+    def __init__(
+        self,
+        ohlc_mgr: OHLCBufferManager,
+        interval: str = "5m",
+        concurrency: int = PRELOAD_CONCURRENCY,
+        on_healed: Optional[Callable[[str, List[list]], None]] = None,
+    ) -> None:
+        if not ohlc_mgr.interval_ms:
+            raise ValueError("OHLCBufferManager harus dibuat dengan interval_ms untuk deteksi gap")
+        self.ohlc_mgr = ohlc_mgr
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.on_healed = on_healed
+        self._task: Optional[asyncio.Task] = None
+        self.failed = 0
+
+    def schedule(self) -> None:
+        """Dipanggil dari receive loop kalau ada gap baru. Satu task heal aktif sekaligus."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="gap-healer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        await asyncio.sleep(BATCH_DELAY)
+        while True:
+            gaps = self.ohlc_mgr.take_gaps()
+            if not gaps:
+                return
+            print(f"Heal gap candle untuk {len(gaps)} symbol...")
+
+            interval_ms = self.ohlc_mgr.interval_ms
+            sem = asyncio.Semaphore(self.concurrency)
+            tasks = []
+            for sym, (first, last) in gaps.items():
+                # cukup isi sebanyak kapasitas buffer
+                first = max(first, last - (self.ohlc_mgr.max_candles - 1) * interval_ms)
+                tasks.append(
+                    asyncio.create_task(
+                        fetch_klines_range(sym, self.interval, interval_ms, first, last, sem)
+                    )
+                )
+
+            failed: Set[str] = set()
+            for fut in asyncio.as_completed(tasks):
+                sym, rows, error = await fut
+                if rows is None:
+                    print(f"[{sym}] Gagal heal gap:", error)
+                    self.ohlc_mgr.heal_failed(sym, gaps[sym])
+                    failed.add(sym)
+                    continue
+                self.ohlc_mgr.heal_gap(sym, rows)
+                if self.on_healed is not None:
+                    self.on_healed(sym, rows)
+
+            if failed:
+                self.failed += len(failed)
+                await asyncio.sleep(RETRY_DELAY)
+
+    def format_stats(self) -> str:
+        return (
+            f"Gap Heal   : {self.ohlc_mgr.healed_gaps} gap di-heal, "
+            f"{self.ohlc_mgr.pending_gap_count()} symbol menunggu, {self.failed} gagal"
+        )
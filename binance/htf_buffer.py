@@ -0,0 +1,95 @@
+# binance/htf_buffer.py
+# Buffer HTF (15m & 1h) per symbol di memory:
+# - backfill sekali dari REST saat preload
+# - setelah itu di-resample dari candle 5m yang close (tanpa REST per sinyal)
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from binance.ohlc_buffer import OHLCBufferManager
+
+# Interval HTF yang dijaga + panjang bar (ms)
+HTF_INTERVALS: Dict[str, int] = {
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+}
+# Jumlah candle HTF per symbol (sama dengan limit fetch HTF sebelumnya)
+HTF_CANDLES = 150
+
+
+class HTFBufferManager:
+    """
+    Catatan: volume HTF hanya perkiraan (candle 5m yang masih berjalan saat
+    backfill bisa terhitung dua kali). Konteks HTF hanya memakai high/low/close.
+    """
+
+    def __init__(self, max_candles: int = HTF_CANDLES) -> None:
+        self.max_candles = max_candles
+        self._buffers: Dict[str, OHLCBufferManager] = {
+            interval: OHLCBufferManager(max_candles=max_candles) for interval in HTF_INTERVALS
+        }
+
+    def preload(self, interval: str, symbol: str, klines: List[list]) -> None:
+        """Backfill satu interval dari REST fapi/v1/klines."""
+        self._buffers[interval].preload_candles(symbol, klines)
+
+    def on_5m_close(self, symbol: str, candle: dict) -> None:
+        """Resample candle 5m yang baru close ke semua interval HTF."""
+        open_5m = candle["open_time"]
+        close_5m = candle["close_time"]
+        for interval, ms in HTF_INTERVALS.items():
+            bucket_open = open_5m - (open_5m % ms)
+            bucket_close = bucket_open + ms - 1
+            self._buffers[interval].merge_candle(
+                symbol,
+                bucket_open,
+                bucket_close,
+                candle["open"],
+                candle["high"],
+                candle["low"],
+                candle["close"],
+                candle["volume"],
+                close_5m >= bucket_close,
+            )
+
+    def on_5m_backfill(self, symbol: str, klines: List[list]) -> None:
+        """
+        Candle 5m susulan hasil heal gap: cukup perluas high/low bucket HTF yang
+        masih berjalan (close HTF sudah lebih baru dari candle susulan ini).
+        """
+        for row in klines:
+            try:
+                open_5m = int(row[0])
+                h = float(row[2])
+                l = float(row[3])
+            except (ValueError, IndexError):
+                continue
+            for interval, ms in HTF_INTERVALS.items():
+                bucket_open = open_5m - (open_5m % ms)
+                buf = self._buffers[interval]
+                last = buf.last_candle(symbol)
+                if last is None or last["open_time"] != bucket_open:
+                    continue
+                buf.merge_candle(
+                    symbol, bucket_open, bucket_open + ms - 1,
+                    last["open"], h, l, last["close"], 0.0, last["closed"],
+                    update_close=False,
+                )
+
+    def forget(self, symbol: str) -> None:
+        for buf in self._buffers.values():
+            buf.forget(symbol)
+
+    def has(self, symbol: str) -> bool:
+        return all(buf.count(symbol) > 0 for buf in self._buffers.values())
+
+    def count(self, symbol: str, interval: str) -> int:
+        return self._buffers[interval].count(symbol)
+
+    def get_arrays(self, symbol: str, interval: str, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return self._buffers[interval].get_arrays(symbol, n)
+
+
+# Instance global: diisi engine stream, dibaca htf_context
+htf_buffers = HTFBufferManager()
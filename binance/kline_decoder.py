@@ -0,0 +1,130 @@
+# binance/kline_decoder.py
+# Decoder frame kline WebSocket:
+# - pakai orjson kalau ter-install, fallback ke json bawaan
+# - fast path: update intrabar (x=false) dikenali dari nama stream lalu dilewati
+#   tanpa parse (engine hanya memakai candle close); kline di-materialize penuh
+#   hanya saat candle close.
+# - candle close dobel (dua koneksi aktif saat rotasi WebSocket) dibuang setelah
+#   parse, per (symbol, open_time) → scan dedupe hanya untuk frame close
+
+import json
+import time
+from typing import Dict, Optional, Union
+
+try:
+    import orjson
+
+    def loads(data: Union[str, bytes]):
+        return orjson.loads(data)
+
+    DECODER_NAME = "orjson"
+except ImportError:  # pragma: no cover - tergantung environment
+    def loads(data: Union[str, bytes]):
+        return json.loads(data)
+
+    DECODER_NAME = "json"
+
+# Prefix combined stream Binance: {"stream":"btcusdt@kline_5m","data":{...}}
+_STREAM_PREFIX = '{"stream":"'
+_STREAM_PREFIX_B = b'{"stream":"'
+_CLOSED_MARK = '"x":true'
+_CLOSED_MARK_B = b'"x":true'
+
+
+def _fast_symbol(msg: Union[str, bytes]) -> Optional[str]:
+    """Ambil SYMBOL dari nama stream tanpa parse JSON penuh."""
+    if isinstance(msg, bytes):
+        if not msg.startswith(_STREAM_PREFIX_B):
+            return None
+        at = msg.find(b"@", len(_STREAM_PREFIX_B))
+        if at < 0:
+            return None
+        return msg[len(_STREAM_PREFIX_B):at].decode().upper()
+    if not msg.startswith(_STREAM_PREFIX):
+        return None
+    at = msg.find("@", len(_STREAM_PREFIX))
+    if at < 0:
+        return None
+    return msg[len(_STREAM_PREFIX):at].upper()
+
+
+def _is_closed(msg: Union[str, bytes]) -> bool:
+    if isinstance(msg, bytes):
+        return _CLOSED_MARK_B in msg
+    return _CLOSED_MARK in msg
+
+
+class KlineFrameDecoder:
+    """
+    feed(msg) → dict kline ("k") kalau candle close, selain itu None.
+    Update intrabar dilewati tanpa parse.
+    """
+
+    def __init__(self) -> None:
+        # SYMBOL → open_time candle close terakhir yang diteruskan (dedupe rotasi)
+        self._last_closed: Dict[str, int] = {}
+
+        # statistik
+        self.frames = 0
+        self.skipped = 0
+        self.decoded = 0
+        self.errors = 0
+        self.duplicates = 0
+        self.cpu_time = 0.0
+
+    def feed(self, msg: Union[str, bytes]) -> Optional[dict]:
+        t0 = time.perf_counter()
+        self.frames += 1
+        try:
+            if not _is_closed(msg):
+                symbol = _fast_symbol(msg)
+                if symbol:
+                    self.skipped += 1
+                    return None
+                # format tidak dikenal → jalur lambat (parse penuh)
+                kline = self._decode(msg)
+                if kline is None or not kline.get("x", False):
+                    return None
+                return self._accept_closed(kline)
+
+            kline = self._decode(msg)
+            if kline is None:
+                return None
+            return self._accept_closed(kline)
+        finally:
+            self.cpu_time += time.perf_counter() - t0
+
+    def _accept_closed(self, kline: dict) -> Optional[dict]:
+        """Candle close: buang kalau (symbol, open_time) sudah pernah diteruskan."""
+        symbol = str(kline.get("s", "")).upper()
+        open_time = int(kline.get("t", 0))
+        if self._last_closed.get(symbol, -1) >= open_time:
+            self.duplicates += 1
+            return None
+        self._last_closed[symbol] = open_time
+        return kline
+
+    def _decode(self, msg: Union[str, bytes]) -> Optional[dict]:
+        try:
+            data = loads(msg)
+        except ValueError:
+            self.errors += 1
+            return None
+        self.decoded += 1
+        kline = data.get("data", {}).get("k")
+        if not kline or not kline.get("s"):
+            return None
+        return kline
+
+    def forget(self, symbol: str) -> None:
+        self._last_closed.pop(symbol.upper(), None)
+
+    def format_stats(self) -> str:
+        if not self.frames:
+            return f"Decoder    : {DECODER_NAME}, belum ada frame"
+        return (
+            f"Decoder    : {DECODER_NAME}, {self.frames} frame, "
+            f"{self.skipped / self.frames * 100:.0f}% fast-path, "
+            f"{self.decoded} parse penuh, {self.duplicates} close dobel, {self.errors} error, "
+            f"{self.cpu_time / self.frames * 1e6:.1f} µs/frame"
+        )
@@ -1,8 +1,13 @@
 # binance/ohlc_buffer.py
 # Buffer OHLC 5m per symbol dari WebSocket futures.
+#
+# Storage: ring buffer kolom NumPy float64 yang sudah dialokasikan di awal.
+# Tiap slot ditulis dua kali (posisi i dan i+L), jadi N candle terakhir selalu
+# berupa slice kontigu → get_arrays() mengembalikan view tanpa copy.
 
-from collections import deque
-from typing import Deque, Dict, List, TypedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypedDict
+
+import numpy as np
 
 
 class Candle(TypedDict):
@@ -16,15 +21,124 @@ class Candle(TypedDict):
     closed: bool
 
 
+# Urutan baris di matrix harga
+FIELDS = ("open", "high", "low", "close", "volume")
+_O, _H, _L, _C, _V = range(5)
+
+# Slot ekstra di luar max_candles: view yang sudah dibagikan dijamin tidak
+# berubah minimal selama STABLE_MARGIN append berikutnya (aman untuk worker
+# analisa yang masih memegang view saat candle baru masuk).
+STABLE_MARGIN = 16
+
+
+class SymbolRing:
+    """Ring buffer kolom untuk satu symbol (kapasitas tetap)."""
+
+    __slots__ = ("capacity", "length", "prices", "open_time", "close_time", "closed", "head", "count")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.length = capacity + STABLE_MARGIN  # panjang logis ring
+        size = 2 * self.length
+        self.prices = np.zeros((5, size), dtype=np.float64)
+        self.open_time = np.zeros(size, dtype=np.int64)
+        self.close_time = np.zeros(size, dtype=np.int64)
+        self.closed = np.zeros(size, dtype=bool)
+        self.head = -1  # slot candle terakhir
+        self.count = 0
+
+    @staticmethod
+    def bytes_for(capacity: int) -> int:
+        size = 2 * (capacity + STABLE_MARGIN)
+        return size * (5 * 8 + 8 + 8 + 1)
+
+    def clear(self) -> None:
+        self.head = -1
+        self.count = 0
+
+    def _write(self, slot: int, open_time: int, close_time: int,
+               o: float, h: float, l: float, c: float, v: float, closed: bool) -> None:
+        for pos in (slot, slot + self.length):
+            self.prices[:, pos] = (o, h, l, c, v)
+            self.open_time[pos] = open_time
+            self.close_time[pos] = close_time
+            self.closed[pos] = closed
+
+    def append(self, open_time: int, close_time: int,
+               o: float, h: float, l: float, c: float, v: float, closed: bool) -> None:
+        self.head = (self.head + 1) % self.length
+        self._write(self.head, open_time, close_time, o, h, l, c, v, closed)
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_last(self, open_time: int, close_time: int,
+                     o: float, h: float, l: float, c: float, v: float, closed: bool) -> None:
+        self._write(self.head, open_time, close_time, o, h, l, c, v, closed)
+
+    def last_open_time(self) -> Optional[int]:
+        if self.count == 0:
+            return None
+        return int(self.open_time[self.head])
+
+    def window(self, n: Optional[int] = None, upto_open_time: Optional[int] = None) -> slice:
+        """
+        Slice kontigu untuk n candle terakhir (lama → baru).
+        upto_open_time → abaikan candle yang lebih baru (mis. candle berjalan bar berikutnya).
+        """
+        end = self.head + 1 + self.length
+        avail = self.count
+        if upto_open_time is not None:
+            while avail > 0 and self.open_time[end - 1] > upto_open_time:
+                end -= 1
+                avail -= 1
+        n = avail if n is None else max(0, min(n, avail))
+        return slice(end - n, end)
+
+
 class OHLCBufferManager:
-    def __init__(self, max_candles: int = 300) -> None:
+    def __init__(
+        self,
+        max_candles: int = 300,
+        rolling_factory: Optional[Callable[[], Any]] = None,
+        interval_ms: Optional[int] = None,
+        store: Optional[Any] = None,
+    ) -> None:
+        """
+        rolling_factory → (opsional) buat state statistik incremental per symbol
+        (mis. RollingRangeState) yang ikut di-update setiap candle masuk / di-replace
+        / di-preload. State wajib punya push(open_time, high, low, close) & reset().
+        interval_ms → (opsional) aktifkan deteksi gap open_time di update_from_kline.
+        store → (opsional) CandleStore di disk; candle close / preload / heal ikut ditulis.
+        """
         self.max_candles = max_candles
-        self._buffers: Dict[str, Deque[Candle]] = {}
+        self._buffers: Dict[str, SymbolRing] = {}
+        self._rolling_factory = rolling_factory
+        self._rolling: Dict[str, Any] = {}
 
-    def _get_buffer(self, symbol: str) -> Deque[Candle]:
-        if symbol not in self._buffers:
-            self._buffers[symbol] = deque(maxlen=self.max_candles)
-        return self._buffers[symbol]
+        # gap: symbol → (open_time pertama yang hilang, open_time terakhir yang hilang)
+        self.interval_ms = interval_ms
+        self._gaps: Dict[str, Tuple[int, int]] = {}
+        self._healing: Set[str] = set()
+        self.healed_gaps = 0
+
+        self.store = store
+
+    @property
+    def bytes_per_symbol(self) -> int:
+        """Memori tetap per symbol (bytes)."""
+        return SymbolRing.bytes_for(self.max_candles)
+
+    def _get_buffer(self, symbol: str) -> SymbolRing:
+        ring = self._buffers.get(symbol)
+        if ring is None:
+            ring = SymbolRing(self.max_candles)
+            self._buffers[symbol] = ring
+            if self._rolling_factory is not None:
+                self._rolling[symbol] = self._rolling_factory()
+        return ring
+
+    def get_rolling(self, symbol: str) -> Optional[Any]:
+        """State statistik incremental symbol (None kalau tidak dipakai)."""
+        return self._rolling.get(symbol)
 
     def update_from_kline(self, symbol: str, kline: dict) -> None:
         buf = self._get_buffer(symbol)
@@ -42,37 +156,233 @@ class OHLCBufferManager:
 
         closed = bool(kline.get("x", False))
 
-        candle: Candle = {
-            "open_time": open_time,
-            "close_time": close_time,
-            "open": o,
-            "high": h,
-            "low": l,
-            "close": c,
-            "volume": v,
-            "closed": closed,
-        }
+        last_ot = buf.last_open_time()
+        if self.interval_ms and last_ot is not None and open_time - last_ot > self.interval_ms:
+            self._record_gap(symbol, last_ot + self.interval_ms, open_time - self.interval_ms)
+
+        if last_ot == open_time:
+            buf.replace_last(open_time, close_time, o, h, l, c, v, closed)
+        else:
+            buf.append(open_time, close_time, o, h, l, c, v, closed)
+
+        rolling = self._rolling.get(symbol)
+        if rolling is not None:
+            rolling.push(open_time, h, l, c)
+
+        if closed and self.store is not None:
+            self.store.write(symbol, open_time, close_time, o, h, l, c, v)
 
-        if not buf:
-            buf.append(candle)
+    def merge_candle(
+        self,
+        symbol: str,
+        open_time: int,
+        close_time: int,
+        o: float,
+        h: float,
+        l: float,
+        c: float,
+        v: float,
+        closed: bool,
+        update_close: bool = True,
+    ) -> None:
+        """
+        Gabungkan candle TF kecil ke candle TF besar (resample).
+        open_time/close_time = batas bucket TF besar. Candle lebih lama dari bucket terakhir diabaikan.
+        update_close=False → hanya perluas high/low (candle susulan yang lebih tua dari close sekarang).
+        """
+        buf = self._get_buffer(symbol)
+        last_ot = buf.last_open_time()
+        if last_ot is None or open_time > last_ot:
+            buf.append(open_time, close_time, o, h, l, c, v, closed)
+            return
+        if open_time < last_ot:
             return
+        pos = buf.head
+        p = buf.prices
+        buf.replace_last(
+            open_time,
+            close_time,
+            p[_O, pos],
+            max(p[_H, pos], h),
+            min(p[_L, pos], l),
+            c if update_close else p[_C, pos],
+            p[_V, pos] + v,
+            closed if update_close else bool(buf.closed[pos]),
+        )
 
-        last = buf[-1]
-        if last["open_time"] == open_time:
-            buf[-1] = candle
-        else:
-            buf.append(candle)
+    def last_candle(self, symbol: str) -> Optional[Candle]:
+        ring = self._buffers.get(symbol)
+        if not ring or ring.count == 0:
+            return None
+        pos = ring.head
+        p = ring.prices
+        return {
+            "open_time": int(ring.open_time[pos]),
+            "close_time": int(ring.close_time[pos]),
+            "open": float(p[_O, pos]),
+            "high": float(p[_H, pos]),
+            "low": float(p[_L, pos]),
+            "close": float(p[_C, pos]),
+            "volume": float(p[_V, pos]),
+            "closed": bool(ring.closed[pos]),
+        }
+
+    # ---------- gap detection & heal ----------
+
+    def _record_gap(self, symbol: str, first_missing: int, last_missing: int) -> None:
+        prev = self._gaps.get(symbol)
+        if prev:
+            first_missing = min(prev[0], first_missing)
+            last_missing = max(prev[1], last_missing)
+        self._gaps[symbol] = (first_missing, last_missing)
+        print(
+            f"[{symbol}] Gap candle terdeteksi: "
+            f"{(last_missing - first_missing) // self.interval_ms + 1} candle hilang."
+        )
+
+    def is_ready(self, symbol: str) -> bool:
+        """False kalau symbol masih punya gap yang belum di-heal (jangan dianalisa)."""
+        return symbol not in self._gaps and symbol not in self._healing
+
+    def has_new_gaps(self) -> bool:
+        return bool(self._gaps)
+
+    def pending_gap_count(self) -> int:
+        return len(self._gaps) + len(self._healing)
+
+    def take_gaps(self) -> Dict[str, Tuple[int, int]]:
+        """Ambil semua gap yang menunggu backfill (symbol pindah ke status healing)."""
+        gaps = self._gaps
+        self._gaps = {}
+        self._healing.update(gaps)
+        return gaps
+
+    def heal_gap(self, symbol: str, klines: list[list]) -> None:
+        """
+        Gabungkan klines hasil backfill ke buffer.
+        Klines REST (candle sudah close) menang kalau open_time sama dengan candle di buffer.
+        """
+        if symbol not in self._buffers:
+            return  # symbol sudah dibuang dari universe selama backfill
+        fetched = {int(row[0]) for row in klines}
+        rows = [
+            [c["open_time"], c["open"], c["high"], c["low"], c["close"], c["volume"], c["close_time"]]
+            for c in self.get_candles(symbol)
+            if c["open_time"] not in fetched
+        ]
+        rows.extend(klines)
+        rows.sort(key=lambda row: int(row[0]))
+        self._load_rows(symbol, rows)
+        if self.store is not None:
+            self.store.write_rows(symbol, klines)
+        self._healing.discard(symbol)
+        self.healed_gaps += 1
+
+    def heal_failed(self, symbol: str, gap: Tuple[int, int]) -> None:
+        """Backfill gagal → kembalikan ke antrian gap (retry berikutnya)."""
+        self._healing.discard(symbol)
+        if symbol in self._buffers:
+            self._record_gap(symbol, gap[0], gap[1])
+
+    def count(self, symbol: str) -> int:
+        ring = self._buffers.get(symbol)
+        return ring.count if ring else 0
+
+    def get_arrays(
+        self,
+        symbol: str,
+        n: Optional[int] = None,
+        upto_open_time: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        View kontigu (tanpa copy, read-only) untuk n candle terakhir:
+        {"open", "high", "low", "close", "volume", "open_time"}.
+        upto_open_time → view berakhir di candle dengan open_time tsb (atau sebelumnya).
+        """
+        ring = self._get_buffer(symbol)
+        sl = ring.window(n, upto_open_time)
+        arr: Dict[str, np.ndarray] = {}
+        for i, name in enumerate(FIELDS):
+            view = ring.prices[i, sl]
+            view.flags.writeable = False
+            arr[name] = view
+        ot = ring.open_time[sl]
+        ot.flags.writeable = False
+        arr["open_time"] = ot
+        return arr
 
     def get_candles(self, symbol: str) -> List[Candle]:
-        return list(self._get_buffer(symbol))
+        """List Candle dict (lama → baru). Untuk debug / kompatibilitas, bukan hot path."""
+        ring = self._get_buffer(symbol)
+        sl = ring.window()
+        p = ring.prices[:, sl]
+        return [
+            {
+                "open_time": int(ot),
+                "close_time": int(ct),
+                "open": float(p[_O, i]),
+                "high": float(p[_H, i]),
+                "low": float(p[_L, i]),
+                "close": float(p[_C, i]),
+                "volume": float(p[_V, i]),
+                "closed": bool(cl),
+            }
+            for i, (ot, ct, cl) in enumerate(
+                zip(ring.open_time[sl], ring.close_time[sl], ring.closed[sl])
+            )
+        ]
 
     def preload_candles(self, symbol: str, klines: list[list]) -> None:
         """
         Preload dari REST fapi/v1/klines (list raw Binance array).
         """
+        self._gaps.pop(symbol, None)
+        self._healing.discard(symbol)
+        self._load_rows(symbol, klines)
+        if self.store is not None:
+            self.store.write_rows(symbol, klines)
+
+    def forget(self, symbol: str) -> None:
+        """Buang buffer, state rolling & gap symbol yang keluar dari universe."""
+        self._buffers.pop(symbol, None)
+        self._rolling.pop(symbol, None)
+        self._gaps.pop(symbol, None)
+        self._healing.discard(symbol)
+        if self.store is not None:
+            self.store.forget(symbol)
+
+    def restore_from_store(self, symbol: str, last_closed_open_time: int, min_rows: int = 1) -> bool:
+        """
+        Isi buffer dari CandleStore (warm restart) lalu tandai gap sejak candle
+        terakhir di disk sampai last_closed_open_time supaya di-backfill GapHealer.
+        Return False kalau data di disk tidak cukup / tidak kontigu (pakai preload REST biasa).
+        """
+        if self.store is None or not self.store.has(symbol):
+            return False
+        rows = self.store.load_rows(symbol, self.max_candles)
+        if len(rows) < max(1, min_rows):
+            return False
+        if self.interval_ms:
+            ots = np.array([int(row[0]) for row in rows], dtype=np.int64)
+            holes = int(np.count_nonzero(np.diff(ots) != self.interval_ms))
+            if holes:
+                print(f"[{symbol}] Data candle di disk bolong ({holes} loncatan), pakai preload REST.")
+                return False
+        self._load_rows(symbol, rows)
+        self._gaps.pop(symbol, None)
+        last_ot = int(rows[-1][0])
+        if self.interval_ms and last_ot <= last_closed_open_time:
+            # candle terakhir di disk bisa saja belum final → ikut di-fetch ulang
+            self._record_gap(symbol, last_ot, last_closed_open_time)
+        return True
+
+    def _load_rows(self, symbol: str, klines: list[list]) -> None:
         buf = self._get_buffer(symbol)
         buf.clear()
-        for row in klines:
+        rolling = self._rolling.get(symbol)
+        if rolling is not None:
+            rolling.reset()
+        for row in klines[-self.max_candles:]:
             try:
                 o = float(row[1])
                 h = float(row[2])
@@ -81,14 +391,6 @@ class OHLCBufferManager:
                 v = float(row[5])
             except (ValueError, IndexError):
                 continue
-            candle: Candle = {
-                "open_time": int(row[0]),
-                "close_time": int(row[6]),
-                "open": o,
-                "high": h,
-                "low": l,
-                "close": c,
-                "volume": v,
-                "closed": True,
-            }
-            buf.append(candle)
+            buf.append(int(row[0]), int(row[6]), o, h, l, c, v, True)
+            if rolling is not None:
+                rolling.push(int(row[0]), h, l, c)
@@ -0,0 +1,209 @@
+# binance/pair_universe.py
+# Universe pair USDT perpetual:
+# - exchangeInfo di-cache (TTL), tidak di-download ulang tiap refresh pair
+# - 24h quote volume di-update live dari stream !ticker@arr (tanpa polling REST)
+# - ranking ulang kapan saja dari memory, dengan hysteresis supaya pair di sekitar
+#   batas min_volume / max_pairs tidak keluar-masuk tiap refresh
+
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional, Set
+
+import websockets
+
+from config import BINANCE_REST_URL, BINANCE_STREAM_URL
+from binance.kline_decoder import loads
+from core.bot_state import state
+from core.http_transport import http
+
+# Umur cache exchangeInfo (detik)
+EXCHANGE_INFO_TTL = 6 * 3600
+# Data ticker dianggap basi kalau tidak ada update selama ini (detik) → fallback REST sekali
+TICKER_STALE_SECONDS = 120
+# Pair yang sudah di universe baru dibuang kalau volume < min_volume * (1 - VOLUME_HYSTERESIS)
+VOLUME_HYSTERESIS = 0.10
+# Pair baru harus punya volume > pair terlemah di universe * (1 + RANK_HYSTERESIS) untuk menggeser
+RANK_HYSTERESIS = 0.10
+# Seberapa sering engine cek ranking baru (detik)
+RERANK_INTERVAL = 60
+# Backoff reconnect stream ticker (detik)
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+
+class PairUniverse:
+    def __init__(self) -> None:
+        self._eligible: Set[str] = set()  # TRADING + USDT + PERPETUAL
+        self._info_ts = 0.0
+        self._volume: Dict[str, float] = {}
+        self._ticker_ts = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.current: List[str] = []  # universe terakhir yang dipakai engine (lower-case)
+
+        # statistik
+        self.ticker_frames = 0
+        self.rest_fallbacks = 0
+
+    # ---------- exchangeInfo ----------
+
+    def refresh_exchange_info(self, force: bool = False) -> None:
+        """Download exchangeInfo kalau cache sudah lewat TTL (blocking)."""
+        if not force and self._eligible and time.time() - self._info_ts < EXCHANGE_INFO_TTL:
+            return
+        r = http.get(f"{BINANCE_REST_URL}/fapi/v1/exchangeInfo", timeout=10)
+        r.raise_for_status()
+        info = r.json()
+        self._eligible = {
+            s["symbol"]
+            for s in info["symbols"]
+            if s.get("status") == "TRADING"
+            and s.get("quoteAsset") == "USDT"
+            and s.get("contractType") == "PERPETUAL"
+        }
+        self._info_ts = time.time()
+        print(f"exchangeInfo di-refresh: {len(self._eligible)} pair USDT perpetual TRADING.")
+
+    # ---------- volume 24h ----------
+
+    def _seed_volumes(self) -> None:
+        """Ambil ticker/24hr sekali via REST (saat start / stream ticker basi)."""
+        r = http.get(f"{BINANCE_REST_URL}/fapi/v1/ticker/24hr", timeout=10)
+        r.raise_for_status()
+        self._apply_tickers(r.json(), "symbol", "quoteVolume")
+        self.rest_fallbacks += 1
+
+    def _apply_tickers(self, tickers: List[dict], sym_key: str = "s", vol_key: str = "q") -> None:
+        for t in tickers:
+            sym = t.get(sym_key)
+            if not sym:
+                continue
+            try:
+                self._volume[sym] = float(t.get(vol_key, "0"))
+            except (TypeError, ValueError):
+                continue
+        self._ticker_ts = time.time()
+
+    def ticker_live(self) -> bool:
+        return bool(self._volume) and time.time() - self._ticker_ts < TICKER_STALE_SECONDS
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ticker-arr")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Stream !ticker@arr (tiap ~1 detik, hanya ticker yang berubah)."""
+        url = f"{BINANCE_STREAM_URL}?streams=!ticker@arr"
+        failures = 0
+        while state.running:
+            t0 = time.time()
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
+                    print("[Ticker] stream !ticker@arr terhubung.")
+                    async for msg in ws:
+                        try:
+                            data = loads(msg).get("data")
+                        except ValueError:
+                            continue
+                        if isinstance(data, list):
+                            self.ticker_frames += 1
+                            self._apply_tickers(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("[Ticker] stream error:", e)
+
+            if time.time() - t0 > 60:
+                failures = 0
+            failures += 1
+            delay = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** (failures - 1))
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    # ---------- ranking ----------
+
+    def select(
+        self,
+        max_pairs: int,
+        min_volume_usdt: float,
+        current: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Ranking pair berdasarkan 24h quote volume (dari memory).
+        current = universe yang sedang jalan → hysteresis diterapkan; None = ranking murni
+        (dipakai kalau admin baru mengubah /minvol atau /maxpairs).
+        Return: list symbol lower-case, urut volume terbesar.
+        """
+        self.refresh_exchange_info()
+        if not self.ticker_live():
+            self._seed_volumes()
+
+        vols = self._volume.copy()
+        eligible = self._eligible
+        min_vol = float(min_volume_usdt)
+
+        incumbents: List[str] = []
+        if current:
+            relaxed = min_vol * (1 - VOLUME_HYSTERESIS)
+            incumbents = [
+                s.upper() for s in current
+                if s.upper() in eligible and vols.get(s.upper(), 0.0) >= relaxed
+            ]
+        incumbents.sort(key=lambda s: vols.get(s, 0.0), reverse=True)
+        if max_pairs > 0:
+            incumbents = incumbents[:max_pairs]
+
+        selected = set(incumbents)
+        challengers = sorted(
+            (s for s in eligible if s not in selected and vols.get(s, 0.0) >= min_vol),
+            key=lambda s: vols.get(s, 0.0),
+            reverse=True,
+        )
+        chosen = list(incumbents)
+        for sym in challengers:
+            if max_pairs <= 0 or len(chosen) < max_pairs:
+                chosen.append(sym)
+                continue
+            weakest = min(chosen, key=lambda s: vols.get(s, 0.0))
+            if vols.get(sym, 0.0) <= vols.get(weakest, 0.0) * (1 + RANK_HYSTERESIS):
+                break  # challenger berikutnya volumenya lebih kecil lagi
+            chosen.remove(weakest)
+            chosen.append(sym)
+
+        chosen.sort(key=lambda s: vols.get(s, 0.0), reverse=True)
+        return [s.lower() for s in chosen]
+
+    # ---------- status ----------
+
+    def format_stats(self, top: int = 10) -> str:
+        if not self._volume:
+            return "Universe   : belum ada data ticker"
+        age = time.time() - self._ticker_ts
+        info_age = (time.time() - self._info_ts) / 60 if self._info_ts else 0.0
+        in_universe = {s.upper() for s in self.current}
+        ranked = sorted(
+            (s for s in self._eligible if s in self._volume),
+            key=lambda s: self._volume[s],
+            reverse=True,
+        )[:top]
+        lines = [
+            f"Universe   : {len(self.current)} pair aktif dari {len(self._eligible)} eligible, "
+            f"ticker {'LIVE' if self.ticker_live() else 'BASI'} ({age:.0f}s lalu), "
+            f"exchangeInfo {info_age:.0f} menit"
+        ]
+        for i, sym in enumerate(ranked, start=1):
+            mark = "✓" if sym in in_universe else "·"
+            lines.append(f"  {i:>2}. {mark} {sym} {self._volume[sym] / 1e6:,.0f}M")
+        return "\n".join(lines)
+
+
+# Instance global: stream ticker dijalankan engine, dibaca /status
+pair_universe = PairUniverse()
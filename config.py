@@ -9,6 +9,29 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_ADMIN_ID = os.getenv("TELEGRAM_ADMIN_ID", "")
 TELEGRAM_ADMIN_USERNAME = os.getenv("TELEGRAM_ADMIN_USERNAME", "")
 
+# Batas kirim pesan global (pesan/detik, limit Telegram ~30/s)
+TELEGRAM_RATE_PER_SEC = float(os.getenv("TELEGRAM_RATE_PER_SEC", "30"))
+
+# Jumlah worker kirim pesan paralel
+TELEGRAM_SENDER_WORKERS = int(os.getenv("TELEGRAM_SENDER_WORKERS", "8"))
+
+# Mode terima update: "polling" (long polling getUpdates) atau "webhook"
+TELEGRAM_MODE = os.getenv("TELEGRAM_MODE", "polling").lower()
+
+# Webhook: URL publik (https) yang diteruskan (reverse proxy) ke server lokal HOST:PORT.
+# Default hanya listen di localhost; 0.0.0.0 hanya kalau port memang harus terbuka langsung.
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+TELEGRAM_WEBHOOK_HOST = os.getenv("TELEGRAM_WEBHOOK_HOST", "127.0.0.1")
+TELEGRAM_WEBHOOK_PORT = int(os.getenv("TELEGRAM_WEBHOOK_PORT", "8080"))
+# Secret token (header X-Telegram-Bot-Api-Secret-Token) untuk validasi request webhook.
+# WAJIB untuk mode webhook (tanpa secret → fallback long polling); karakter A-Z a-z 0-9 _ -
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+
+# Mode channel/grup (opsional): sinyal diposting sekali ke channel per tier, bukan DM per user.
+# Kosong = kirim DM per subscriber. Bot harus admin di channel (invite & ban member).
+TELEGRAM_VIP_CHANNEL_ID = os.getenv("TELEGRAM_VIP_CHANNEL_ID", "")
+TELEGRAM_FREE_CHANNEL_ID = os.getenv("TELEGRAM_FREE_CHANNEL_ID", "")
+
 # === BINANCE FUTURES (USDT PERP) ===
 BINANCE_REST_URL = "https://fapi.binance.com"
 BINANCE_STREAM_URL = "wss://fstream.binance.com/stream"
@@ -23,6 +46,25 @@ MAX_USDT_PAIRS = int(os.getenv("MAX_USDT_PAIRS", "200"))
 # Interval refresh pair (jam)
 REFRESH_PAIR_INTERVAL_HOURS = int(os.getenv("REFRESH_PAIR_INTERVAL_HOURS", "24"))
 
+# Max stream kline per koneksi WebSocket (symbol dipecah ke beberapa koneksi)
+WS_STREAMS_PER_CONN = int(os.getenv("WS_STREAMS_PER_CONN", "100"))
+
+# Rotasi koneksi WebSocket terjadwal (jam) sebelum Binance memutus di 24 jam
+WS_ROTATE_HOURS = float(os.getenv("WS_ROTATE_HOURS", "23"))
+
+# ==== PRELOAD / REST LIMIT ====
+# Jumlah request REST preload yang boleh jalan bersamaan
+PRELOAD_CONCURRENCY = int(os.getenv("PRELOAD_CONCURRENCY", "10"))
+
+# Limit request-weight Binance Futures per menit (IP)
+BINANCE_WEIGHT_LIMIT_1M = int(os.getenv("BINANCE_WEIGHT_LIMIT_1M", "2400"))
+
+# Folder candle store di disk (memmap) untuk warm restart. Kosong = nonaktif
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", "")
+
+# Jumlah candle 5m yang disimpan per symbol di disk (8640 = 30 hari)
+CANDLE_STORE_DEPTH = int(os.getenv("CANDLE_STORE_DEPTH", "8640"))
+
 # ==== SIGNAL FILTER ====
 # Tier minimum sinyal yg dikirim
 # A+, A, B
@@ -31,6 +73,26 @@ MIN_TIER_TO_SEND = os.getenv("MIN_TIER_TO_SEND", "A+")
 # Cooldown antar sinyal per pair (detik)
 SIGNAL_COOLDOWN_SECONDS = int(os.getenv("SIGNAL_COOLDOWN_SECONDS", "600"))
 
+# Sinyal satu bar diranking (score, tinggi range, SL%): top-K dikirim satuan per tier,
+# sisanya digabung jadi satu pesan digest (VIP). Free: top-K per bar, kuota harian tetap berlaku.
+SIGNAL_TOP_K_VIP = int(os.getenv("SIGNAL_TOP_K_VIP", "3"))
+SIGNAL_TOP_K_FREE = int(os.getenv("SIGNAL_TOP_K_FREE", "1"))
+
+# ==== ANALISA PIPELINE ====
+# Jumlah worker thread untuk analisa range + kirim sinyal
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "8"))
+
+# Kapasitas queue job analisa (candle close yang menunggu dianalisa)
+ANALYSIS_QUEUE_MAXSIZE = int(os.getenv("ANALYSIS_QUEUE_MAXSIZE", "1000"))
+
+# Batas tunggu symbol yang telat close di bar yang sama sebelum analisa batch (detik)
+BAR_CLOSE_DEADLINE_SECONDS = float(os.getenv("BAR_CLOSE_DEADLINE_SECONDS", "1.5"))
+
+# Mode verifikasi: bandingkan statistik range incremental dengan perhitungan NumPy penuh
+ROLLING_STATS_VERIFY = os.getenv("ROLLING_STATS_VERIFY", "false").lower() == "true"
+# Mode verifikasi: bandingkan tabel konteks HTF vectorized dengan perhitungan per symbol
+HTF_CONTEXT_VERIFY = os.getenv("HTF_CONTEXT_VERIFY", "false").lower() == "true"
+
 # ==== RANGE STRATEGY SETTINGS (BOT 3) ====
 # Timeframe entry
 RANGE_ENTRY_TF = "5m"
@@ -0,0 +1,117 @@
+# core/analysis_pipeline.py
+# Pipeline analisa di luar receive loop WebSocket:
+#   receive stage → queue analisa (bounded) → worker pool (thread)
+# Analisa (HTF REST, skoring) & delivery Telegram jalan di worker,
+# jadi ingest kline tidak pernah nunggu analisa / kirim sinyal.
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import ANALYSIS_WORKERS, ANALYSIS_QUEUE_MAXSIZE
+
+# Berapa lama receive stage boleh ditahan (backpressure) kalau queue penuh
+ENQUEUE_TIMEOUT = 2.0
+
+
+class AnalysisPipeline:
+    """
+    Worker pool untuk job analisa.
+
+    handler(job) dipanggil di thread worker (boleh blocking: REST, Telegram).
+    submit(job) dipanggil dari receive stage:
+    - kalau queue ada ruang → langsung masuk
+    - kalau penuh → tunggu maksimal ENQUEUE_TIMEOUT (backpressure),
+      lewat dari itu job di-drop & dihitung di metrics
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        workers: int = ANALYSIS_WORKERS,
+        queue_maxsize: int = ANALYSIS_QUEUE_MAXSIZE,
+        name: str = "analysis",
+    ) -> None:
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_maxsize))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: list = []
+
+        # metrics
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.busy = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"{self.name}-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, drain: bool = False) -> None:
+        """Hentikan worker. drain=True → tunggu queue kosong dulu."""
+        if drain:
+            await self.queue.join()
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def submit(self, job: Any) -> bool:
+        item = (time.time(), job)
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self.queue.put(item), timeout=ENQUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                print(f"[{self.name}] Queue penuh ({self.queue.qsize()}) → job di-drop.")
+                return False
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    async def _worker(self, idx: int) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            enq_ts, job = await self.queue.get()
+            self.busy += 1
+            try:
+                await loop.run_in_executor(self._executor, self.handler, job)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[{self.name}] Error worker {idx}:", e)
+            finally:
+                self.busy -= 1
+                latency = time.time() - enq_ts
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.queue.task_done()
+
+    def format_stats(self) -> str:
+        return (
+            f"Analisa    : queue {self.queue.qsize()}/{self.queue.maxsize} "
+            f"(max {self.max_depth}), worker {self.busy}/{self.workers} sibuk, "
+            f"{self.processed} selesai, {self.dropped} drop, {self.failed} error, "
+            f"latency {self.last_latency:.2f}s (max {self.max_latency:.2f}s)"
+        )
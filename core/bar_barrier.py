@@ -0,0 +1,87 @@
+# core/bar_barrier.py
+# Barrier bar-close: kumpulkan symbol yang candle-nya close di bar yang sama,
+# lalu flush sekali (batch) saat semua symbol masuk atau deadline straggler habis.
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Set
+
+from config import BAR_CLOSE_DEADLINE_SECONDS
+
+
+class BarCloseBarrier:
+    """
+    on_close(symbol, open_time) dipanggil dari receive stage tiap candle close.
+    on_flush(open_time, symbols) (coroutine) dipanggil sekali per bar:
+    - begitu jumlah symbol == expected, atau
+    - `deadline` detik setelah close pertama bar itu masuk.
+    Close yang telat (bar sudah di-flush) dikumpulkan jadi batch kecil berikutnya.
+    """
+
+    def __init__(
+        self,
+        on_flush: Callable[[int, List[str]], Awaitable[None]],
+        deadline: float = BAR_CLOSE_DEADLINE_SECONDS,
+    ) -> None:
+        self.on_flush = on_flush
+        self.deadline = deadline
+        self.expected = 0
+        self._pending: Dict[int, Set[str]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._first_ts: Dict[int, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        # metrics
+        self.flushes = 0
+        self.last_batch_size = 0
+        self.last_wait = 0.0
+        self.stragglers = 0
+        self._flushed_bars: Dict[int, bool] = {}
+
+    def on_close(self, symbol: str, open_time: int) -> None:
+        bucket = self._pending.get(open_time)
+        if bucket is None:
+            bucket = set()
+            self._pending[open_time] = bucket
+            self._first_ts[open_time] = time.time()
+            loop = asyncio.get_running_loop()
+            self._timers[open_time] = loop.call_later(self.deadline, self._fire, open_time)
+            if open_time in self._flushed_bars:
+                self.stragglers += 1
+        bucket.add(symbol)
+        if self.expected and len(bucket) >= self.expected:
+            self._fire(open_time)
+
+    def _fire(self, open_time: int) -> None:
+        symbols = self._pending.pop(open_time, None)
+        timer = self._timers.pop(open_time, None)
+        if timer is not None:
+            timer.cancel()
+        first_ts = self._first_ts.pop(open_time, time.time())
+        if not symbols:
+            return
+
+        self.flushes += 1
+        self.last_batch_size = len(symbols)
+        self.last_wait = time.time() - first_ts
+        self._flushed_bars[open_time] = True
+        # simpan jejak beberapa bar terakhir saja
+        if len(self._flushed_bars) > 16:
+            self._flushed_bars.pop(next(iter(self._flushed_bars)))
+
+        task = asyncio.create_task(self.on_flush(open_time, sorted(symbols)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def cancel(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+        self._first_ts.clear()
+
+    def format_stats(self) -> str:
+        return (
+            f"Bar Close  : batch terakhir {self.last_batch_size}/{self.expected} symbol, "
+            f"tunggu {self.last_wait:.2f}s, {self.flushes} flush, {self.stragglers} batch telat"
+        )
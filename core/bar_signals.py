@@ -0,0 +1,135 @@
+# core/bar_signals.py
+# Agregasi sinyal per bar 5m: semua kandidat satu bar dinilai dulu oleh worker analisa,
+# baru setelah job terakhir selesai hasilnya diranking & dikirim sekaligus
+# (top-K satuan + digest), bukan satu pesan per symbol sesuai urutan selesai worker.
+
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+RankKey = Tuple[float, float, float]
+
+
+def rank_key(result: Dict) -> RankKey:
+    """Urutan sinyal: score tertinggi, lalu range paling sempit, lalu SL% terkecil."""
+    return (
+        -float(result.get("score", 0)),
+        float(result.get("range_height_pct", 0.0)),
+        float(result.get("sl_pct", 0.0)),
+    )
+
+
+def rank_signals(results: List[Dict]) -> List[Dict]:
+    return sorted(results, key=rank_key)
+
+
+class BarSignalBatch:
+    """
+    Kumpulan job analisa satu bar. add() dipanggil tiap job selesai (thread worker);
+    saat job terakhir masuk → on_complete(open_time, results) dipanggil sekali.
+    extend(n) → kandidat susulan bar yang sama (straggler) digabung selama batch belum selesai.
+    """
+
+    def __init__(
+        self,
+        open_time: int,
+        expected: int,
+        on_complete: Callable[[int, List[Dict]], None],
+    ) -> None:
+        self.open_time = open_time
+        self.on_complete = on_complete
+        self._pending = expected
+        self._results: List[Dict] = []
+        self._done = False
+        self._lock = threading.Lock()
+        self.created = time.time()
+
+    def add(self, result: Optional[Dict]) -> None:
+        """result=None untuk job yang tidak menghasilkan sinyal / di-drop."""
+        with self._lock:
+            if result is not None:
+                self._results.append(result)
+            self._pending -= 1
+            done = self._pending == 0
+            self._done = done
+        if done:
+            self.on_complete(self.open_time, self._results)
+
+    def extend(self, jobs: int) -> bool:
+        """Tambah job ke batch yang masih berjalan. False kalau batch sudah selesai (sudah dikirim)."""
+        with self._lock:
+            if self._done:
+                return False
+            self._pending += jobs
+            return True
+
+
+class FreeSignalGate:
+    """
+    Kuota free (N sinyal/hari) untuk sinyal terbaik: sinyal lolos kalau rank_key-nya
+    minimal sebagus sinyal ke-N terbaik dalam 24 jam terakhir (ambang rolling dari
+    histori, bukan first-come) → sinyal biasa di awal hari tidak menghabiskan kuota
+    sebelum sinyal bagus muncul. Histori ikut disimpan (tabel free_rank_history) → ambang sama
+    setelah restart. Histori masih < N sinyal (pertama kali jalan) → semua lolos.
+    Histori di memory hanya sinyal yang masih bisa jadi N terbaik: sinyal yang sudah
+    dikalahkan N sinyal lebih baru tidak akan pernah jadi ambang lagi → dibuang.
+    """
+
+    def __init__(self, limit: int, window: float = 86400.0, max_history: int = 5000) -> None:
+        self.limit = max(1, limit)
+        self.window = window
+        self.max_history = max_history
+        self._history: List[Tuple[float, RankKey]] = []  # (waktu, key), urut waktu
+        self._lock = threading.Lock()
+
+    def load(self, history: List) -> None:
+        with self._lock:
+            self._history = [(float(row[0]), tuple(row[1])) for row in history or []]
+
+    def snapshot(self) -> List:
+        with self._lock:
+            return [[ts, list(key)] for ts, key in self._history]
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window
+        start = 0
+        while start < len(self._history) and self._history[start][0] < cutoff:
+            start += 1
+        history = self._history[max(start, len(self._history) - self.max_history):]
+        # dari yang terbaru: simpan entry hanya kalau < N entry lebih baru yang >= sebagus dia
+        kept: List[Tuple[float, RankKey]] = []
+        newer: List[Tuple[float, ...]] = []  # max-heap (negasi) N key terbaik yang lebih baru
+        for ts, key in reversed(history):
+            neg = tuple(-x for x in key)
+            if len(newer) < self.limit:
+                kept.append((ts, key))
+                heapq.heappush(newer, neg)
+            elif neg > newer[0]:  # key < key ke-N terbaik yang lebih baru
+                kept.append((ts, key))
+                heapq.heapreplace(newer, neg)
+        kept.reverse()
+        self._history = kept
+
+    def threshold(self, now: Optional[float] = None) -> Optional[RankKey]:
+        """Key sinyal ke-N terbaik 24 jam terakhir (None kalau histori belum cukup)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+            if len(self._history) < self.limit:
+                return None
+            return heapq.nsmallest(self.limit, (key for _, key in self._history))[-1]
+
+    def observe(self, keys: List[RankKey], candidates: int, now: Optional[float] = None) -> List[bool]:
+        """
+        keys = semua sinyal satu bar (terurut terbaik dulu), masuk histori.
+        Return per key (hanya `candidates` teratas) apakah lolos ambang free.
+        """
+        now = time.time() if now is None else now
+        limit = self.threshold(now)
+        admitted = [limit is None or key <= limit for key in keys[:candidates]]
+        with self._lock:
+            # histori diisi setelah keputusan: ambang bar ini hanya dari bar sebelumnya
+            self._history.extend((now, key) for key in keys)
+            self._prune(now)
+        return admitted
@@ -1,11 +1,10 @@
 # core/bot_state.py
 # Menangani state global, VIP, subscribers, dan load/save konfigurasi bot.
+# Persistensi lewat BotStore (SQLite WAL): tiap perubahan ditulis per row.
 
-import json
-import os
 import time
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Set
+from typing import Optional, Dict, Iterable, List, Set
 
 from config import (
     TELEGRAM_ADMIN_ID,
@@ -14,10 +13,9 @@ from config import (
     MIN_TIER_TO_SEND,
     SIGNAL_COOLDOWN_SECONDS,
 )
-
-SUBSCRIBERS_FILE = "subscribers.json"
-VIP_FILE = "vip_users.json"
-STATE_FILE = "bot_state.json"
+from core.bot_store import BotStore
+from core.eligibility import eligibility
+from core.signal_filters import FilterPrefs, signal_filters
 
 
 @dataclass
@@ -41,6 +39,7 @@ class BotState:
 
     # restart & pairs filter
     request_soft_restart: bool = False
+    request_hard_restart: bool = False  # exec ulang proses setelah shutdown normal (main.py)
     force_pairs_refresh: bool = False
 
     # parameter scan market
@@ -50,51 +49,118 @@ class BotState:
 
 state = BotState()
 
+# Dibuka saat pertama dipakai (import modul tidak membuat file database)
+_store: Optional[BotStore] = None
+
+
+def get_store() -> BotStore:
+    global _store
+    if _store is None:
+        _store = BotStore()
+    return _store
+
 
 def is_admin(chat_id: int) -> bool:
     return TELEGRAM_ADMIN_ID and str(chat_id) == str(TELEGRAM_ADMIN_ID)
 
 
 def load_subscribers() -> Set[int]:
-    if not os.path.exists(SUBSCRIBERS_FILE):
-        return set()
     try:
-        with open(SUBSCRIBERS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return set(int(x) for x in data)
+        return get_store().load_subscribers()
     except Exception as e:
         print("Gagal load subscribers:", e)
         return set()
 
 
-def save_subscribers() -> None:
+def add_subscriber(chat_id: int) -> bool:
+    """Return False kalau sudah terdaftar."""
+    if chat_id in state.subscribers:
+        return False
+    state.subscribers.add(chat_id)
+    eligibility.subscribe(chat_id)
+    try:
+        get_store().add_subscriber(chat_id)
+    except Exception as e:
+        print("Gagal simpan subscriber:", e)
+    return True
+
+
+def remove_subscriber(chat_id: int) -> bool:
+    """Return False kalau memang tidak terdaftar."""
+    if chat_id not in state.subscribers:
+        return False
+    state.subscribers.discard(chat_id)
+    eligibility.unsubscribe(chat_id)
     try:
-        with open(SUBSCRIBERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(list(state.subscribers), f)
+        get_store().remove_subscriber(chat_id)
     except Exception as e:
-        print("Gagal simpan subscribers:", e)
+        print("Gagal hapus subscriber:", e)
+    _clear_filters([chat_id])
+    return True
+
+
+def load_filters() -> None:
+    """Load filter sinyal semua subscriber ke inverted index (filter non-subscriber dibuang)."""
+    try:
+        store = get_store()
+        prefs = store.load_filters()
+        stale = [cid for cid in prefs if cid not in state.subscribers]
+        if stale:
+            store.delete_filters(stale)
+        signal_filters.load({cid: p for cid, p in prefs.items() if cid in state.subscribers})
+    except Exception as e:
+        print("Gagal load filter sinyal:", e)
+
+
+def _clear_filters(chat_ids: List[int]) -> None:
+    """Filter user yang berhenti langganan ikut dihapus (status VIP tidak mempengaruhi filter)."""
+    if not chat_ids:
+        return
+    signal_filters.discard(chat_ids)
+    try:
+        get_store().delete_filters(chat_ids)
+    except Exception as e:
+        print("Gagal hapus filter sinyal:", e)
+
+
+def set_filter(chat_id: int, prefs: FilterPrefs) -> None:
+    """Ganti filter user (prefs kosong = hapus filter, terima semua sinyal)."""
+    signal_filters.set(chat_id, prefs)
+    try:
+        get_store().set_filter(chat_id, prefs)
+    except Exception as e:
+        print("Gagal simpan filter sinyal:", e)
 
 
 def load_vip_users() -> Dict[int, float]:
-    if not os.path.exists(VIP_FILE):
-        return {}
     try:
-        with open(VIP_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return {int(k): float(v) for k, v in data.items()}
+        return get_store().load_vip_users()
     except Exception as e:
         print("Gagal load VIP:", e)
         return {}
 
 
-def save_vip_users() -> None:
+def set_vip(user_id: int, expires: float) -> None:
+    state.vip_users[user_id] = expires
+    eligibility.set_vip(user_id, expires)
     try:
-        with open(VIP_FILE, "w", encoding="utf-8") as f:
-            json.dump({str(k): v for k, v in state.vip_users.items()}, f)
+        get_store().set_vip(user_id, expires)
     except Exception as e:
         print("Gagal simpan VIP:", e)
 
 
+def remove_vip(user_id: int) -> bool:
+    """Return False kalau user bukan VIP."""
+    if state.vip_users.pop(user_id, None) is None:
+        return False
+    eligibility.remove_vip(user_id)
+    try:
+        get_store().remove_vip(user_id)
+    except Exception as e:
+        print("Gagal hapus VIP:", e)
+    return True
+
+
 def is_vip(user_id: int) -> bool:
     now = time.time()
     if TELEGRAM_ADMIN_ID and str(user_id) == str(TELEGRAM_ADMIN_ID):
@@ -103,23 +169,82 @@ def is_vip(user_id: int) -> bool:
     return bool(exp and exp > now)
 
 
-def cleanup_expired_vip() -> None:
+def cleanup_expired_vip() -> List[int]:
+    """VIP yang deadline-nya lewat (pop dari heap index) → hapus dari memory & database."""
     now = time.time()
-    expired_ids = [uid for uid, exp in state.vip_users.items() if exp <= now]
+    expired_ids = eligibility.expire_due(now)
+    try:
+        # range delete via index expires (juga menangkap VIP yang sudah diturunkan recipients())
+        expired_ids = sorted(set(expired_ids) | set(get_store().delete_expired_vip(now)))
+    except Exception as e:
+        print("Gagal cleanup VIP:", e)
     if not expired_ids:
-        return
+        return []
     for uid in expired_ids:
-        del state.vip_users[uid]
-    save_vip_users()
+        state.vip_users.pop(uid, None)
     print("VIP expired dihapus otomatis:", expired_ids)
+    return expired_ids
+
+
+def rebuild_eligibility() -> None:
+    """Bangun index penerima dari state yang baru di-load (sekali saat start)."""
+    admin_id = int(TELEGRAM_ADMIN_ID) if TELEGRAM_ADMIN_ID else None
+    eligibility.rebuild(state.subscribers, state.vip_users, state.daily_counts, admin_id)
+
+
+def load_daily_counts(day: str) -> None:
+    """Isi kuota harian dari database (kuota tidak reset saat restart di hari yang sama)."""
+    state.daily_date = day
+    try:
+        store = get_store()
+        state.daily_counts = store.load_daily_counts(day)
+        store.purge_daily_counts(day)
+    except Exception as e:
+        print("Gagal load kuota harian:", e)
+        state.daily_counts = {}
+    eligibility.reset_quota(state.daily_counts)
+
+
+def record_daily_deliveries(chat_ids: Iterable[int]) -> None:
+    """Catat satu sinyal terpakai untuk tiap chat (memory + satu transaksi database)."""
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return
+    for cid in chat_ids:
+        state.daily_counts[cid] = state.daily_counts.get(cid, 0) + 1
+    eligibility.record_delivered(chat_ids)
+    try:
+        get_store().incr_daily_counts(state.daily_date, chat_ids)
+    except Exception as e:
+        print("Gagal simpan kuota harian:", e)
+
+
+def load_free_rank_history(window: float) -> List:
+    """Histori ambang sinyal free (FreeSignalGate) dalam `window` detik terakhir."""
+    try:
+        return get_store().load_free_rank(time.time() - window)
+    except Exception as e:
+        print("Gagal load histori ranking free:", e)
+        return []
+
+
+def save_free_rank_rows(rows: List, window: float) -> None:
+    """Append row histori baru saja (blocking → panggil di luar event loop)."""
+    try:
+        get_store().add_free_rank(rows, time.time() - window)
+    except Exception as e:
+        print("Gagal simpan histori ranking free:", e)
 
 
 def load_bot_state() -> None:
-    if not os.path.exists(STATE_FILE):
+    try:
+        data = get_store().load_state()
+    except Exception as e:
+        print("Gagal load bot_state:", e)
+        return
+    if not data:
         return
     try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
         state.scanning = bool(data.get("scanning", False))
         state.min_tier = data.get("min_tier", state.min_tier)
         state.cooldown_seconds = int(data.get("cooldown_seconds", state.cooldown_seconds))
@@ -135,16 +260,10 @@ def load_bot_state() -> None:
         print("Gagal load bot_state:", e)
 
 
-def save_bot_state() -> None:
+def save_bot_state(*keys: str) -> None:
+    """Upsert field state bot. Tanpa argumen → semua field; save_bot_state("cooldown_seconds") → satu row."""
+    fields = keys or ("scanning", "min_tier", "cooldown_seconds", "min_volume_usdt", "max_pairs")
     try:
-        data = {
-            "scanning": state.scanning,
-            "min_tier": state.min_tier,
-            "cooldown_seconds": state.cooldown_seconds,
-            "min_volume_usdt": state.min_volume_usdt,
-            "max_pairs": state.max_pairs,
-        }
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        get_store().save_state({k: getattr(state, k) for k in fields})
     except Exception as e:
         print("Gagal simpan bot_state:", e)
@@ -0,0 +1,286 @@
+# core/bot_store.py
+# Penyimpanan persistent subscribers (+ filter sinyal), VIP, kuota harian, histori ambang
+# sinyal free & state bot (SQLite mode WAL):
+# - perubahan ditulis per row (upsert/delete), tidak menulis ulang seluruh file
+# - expiry VIP di-index → cleanup VIP expired cukup range scan
+# - kuota harian free user ikut tersimpan → tidak reset saat bot restart
+# - migrasi sekali dari file JSON lama (subscribers.json, vip_users.json, bot_state.json)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Set
+
+BOT_DB_FILE = "bot.db"
+
+# File JSON format lama (dibaca sekali saat database masih kosong)
+LEGACY_SUBSCRIBERS_FILE = "subscribers.json"
+LEGACY_VIP_FILE = "vip_users.json"
+LEGACY_STATE_FILE = "bot_state.json"
+
+
+class BotStore:
+    def __init__(self, path: str = BOT_DB_FILE) -> None:
+        self.path = path
+        # dipakai dari event loop (command) & thread analisa (kuota) → satu koneksi + lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS subscribers (
+                    chat_id INTEGER PRIMARY KEY,
+                    created REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS subscriber_filters (
+                    chat_id INTEGER PRIMARY KEY,
+                    prefs TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS vip_users (
+                    user_id INTEGER PRIMARY KEY,
+                    expires REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_vip_expires ON vip_users(expires);
+                CREATE TABLE IF NOT EXISTS daily_counts (
+                    day TEXT NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, chat_id)
+                );
+                CREATE TABLE IF NOT EXISTS bot_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS free_rank_history (
+                    ts REAL NOT NULL,
+                    rank_key TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_free_rank_ts ON free_rank_history(ts);
+                """
+            )
+        self._migrate_legacy()
+
+    # ---------- migrasi JSON lama ----------
+
+    def _is_empty(self) -> bool:
+        with self._lock:
+            for table in ("subscribers", "vip_users", "bot_state"):
+                if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+        return True
+
+    @staticmethod
+    def _read_json(path: str):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Gagal baca {path} untuk migrasi:", e)
+            return None
+
+    def _migrate_legacy(self) -> None:
+        if not self._is_empty():
+            return
+        subs = self._read_json(LEGACY_SUBSCRIBERS_FILE)
+        vips = self._read_json(LEGACY_VIP_FILE)
+        bot_state = self._read_json(LEGACY_STATE_FILE)
+        if subs is None and vips is None and bot_state is None:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if subs:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO subscribers (chat_id, created) VALUES (?, ?)",
+                        ((int(x), now) for x in subs),
+                    )
+                if vips:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO vip_users (user_id, expires) VALUES (?, ?)",
+                        ((int(k), float(v)) for k, v in vips.items()),
+                    )
+                if bot_state:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)",
+                        ((k, json.dumps(v)) for k, v in bot_state.items()),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        print(
+            f"Migrasi JSON → {self.path}: {len(subs or [])} subscribers, "
+            f"{len(vips or {})} VIP, state {'ada' if bot_state else 'tidak ada'}."
+        )
+
+    # ---------- subscribers ----------
+
+    def load_subscribers(self) -> Set[int]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT chat_id FROM subscribers")}
+
+    def add_subscriber(self, chat_id: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO subscribers (chat_id, created) VALUES (?, ?)",
+                (chat_id, time.time()),
+            )
+
+    def remove_subscriber(self, chat_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM subscribers WHERE chat_id = ?", (chat_id,))
+
+    # ---------- filter sinyal per subscriber ----------
+
+    def load_filters(self) -> Dict[int, dict]:
+        with self._lock:
+            return {
+                cid: json.loads(prefs)
+                for cid, prefs in self._conn.execute("SELECT chat_id, prefs FROM subscriber_filters")
+            }
+
+    def set_filter(self, chat_id: int, prefs: dict) -> None:
+        with self._lock:
+            if prefs:
+                self._conn.execute(
+                    "INSERT INTO subscriber_filters (chat_id, prefs) VALUES (?, ?) "
+                    "ON CONFLICT(chat_id) DO UPDATE SET prefs = excluded.prefs",
+                    (chat_id, json.dumps(prefs)),
+                )
+            else:
+                self._conn.execute("DELETE FROM subscriber_filters WHERE chat_id = ?", (chat_id,))
+
+    def delete_filters(self, chat_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM subscriber_filters WHERE chat_id = ?", ((cid,) for cid in chat_ids)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---------- VIP ----------
+
+    def load_vip_users(self) -> Dict[int, float]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT user_id, expires FROM vip_users"))
+
+    def set_vip(self, user_id: int, expires: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO vip_users (user_id, expires) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET expires = excluded.expires",
+                (user_id, expires),
+            )
+
+    def remove_vip(self, user_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM vip_users WHERE user_id = ?", (user_id,))
+
+    def delete_expired_vip(self, now: float) -> List[int]:
+        """Hapus VIP yang expired (range scan index expires). Return user_id yang dihapus."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                expired = [
+                    row[0] for row in self._conn.execute(
+                        "SELECT user_id FROM vip_users WHERE expires <= ?", (now,)
+                    )
+                ]
+                if expired:
+                    self._conn.execute("DELETE FROM vip_users WHERE expires <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return expired
+
+    # ---------- kuota harian ----------
+
+    def load_daily_counts(self, day: str) -> Dict[int, int]:
+        with self._lock:
+            return dict(
+                self._conn.execute("SELECT chat_id, count FROM daily_counts WHERE day = ?", (day,))
+            )
+
+    def incr_daily_counts(self, day: str, chat_ids: Iterable[int]) -> None:
+        """Tambah kuota terpakai +1 untuk banyak chat sekaligus (satu transaksi per sinyal)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO daily_counts (day, chat_id, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT(day, chat_id) DO UPDATE SET count = count + 1",
+                    ((day, cid) for cid in chat_ids),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def purge_daily_counts(self, keep_day: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM daily_counts WHERE day != ?", (keep_day,)
+            ).rowcount
+
+    # ---------- histori ambang sinyal free (append-only, dihapus per umur) ----------
+
+    def load_free_rank(self, since: float) -> List[list]:
+        with self._lock:
+            return [
+                [ts, json.loads(key)]
+                for ts, key in self._conn.execute(
+                    "SELECT ts, rank_key FROM free_rank_history WHERE ts >= ? ORDER BY ts", (since,)
+                )
+            ]
+
+    def add_free_rank(self, rows: Iterable[list], older_than: float) -> None:
+        """Tambah row baru + hapus row yang sudah keluar window (satu transaksi)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO free_rank_history (ts, rank_key) VALUES (?, ?)",
+                    ((ts, json.dumps(list(key))) for ts, key in rows),
+                )
+                self._conn.execute("DELETE FROM free_rank_history WHERE ts < ?", (older_than,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---------- state bot (key/value) ----------
+
+    def load_state(self) -> Dict[str, object]:
+        with self._lock:
+            return {k: json.loads(v) for k, v in self._conn.execute("SELECT key, value FROM bot_state")}
+
+    def save_state(self, values: Dict[str, object]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO bot_state (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    ((k, json.dumps(v)) for k, v in values.items()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,167 @@
+# core/eligibility.py
+# Index kelayakan penerima sinyal, di-update per event (bukan dihitung ulang tiap sinyal):
+# - 3 partisi subscriber: VIP, free dengan kuota tersisa, free yang kuotanya habis
+# - expiry VIP di min-heap → VIP turun ke free tepat saat deadline, tanpa scan semua VIP
+# - daftar penerima satu broadcast = O(jumlah penerima), tanpa is_vip() per subscriber
+
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Jatah sinyal per hari untuk user FREE
+FREE_DAILY_LIMIT = 2
+
+
+class EligibilityIndex:
+    def __init__(self, free_limit: int = FREE_DAILY_LIMIT) -> None:
+        self.free_limit = free_limit
+        # dipakai dari event loop (command) & thread analisa (broadcast) → lock
+        self._lock = threading.Lock()
+        self._admin_id: Optional[int] = None
+
+        self._subscribers: Set[int] = set()
+        self._vip_until: Dict[int, float] = {}  # semua VIP aktif (subscriber atau bukan)
+        self._counts: Dict[int, int] = {}  # kuota terpakai hari ini (free)
+        self._heap: List[Tuple[float, int]] = []  # (expires, user_id), entry basi di-skip
+
+        # partisi subscriber (tanpa admin)
+        self.vip: Set[int] = set()
+        self.free_open: Set[int] = set()
+        self.free_exhausted: Set[int] = set()
+
+    # ---------- build ----------
+
+    def rebuild(
+        self,
+        subscribers: Iterable[int],
+        vip_users: Dict[int, float],
+        daily_counts: Dict[int, int],
+        admin_id: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._admin_id = admin_id
+            self._subscribers = set(subscribers)
+            self._vip_until = {uid: exp for uid, exp in vip_users.items() if exp > now}
+            self._counts = dict(daily_counts)
+            self._heap = [(exp, uid) for uid, exp in self._vip_until.items()]
+            heapq.heapify(self._heap)
+            self.vip.clear()
+            self.free_open.clear()
+            self.free_exhausted.clear()
+            for cid in self._subscribers:
+                self._place(cid)
+
+    def _place(self, cid: int) -> None:
+        """Masukkan subscriber ke partisi yang sesuai (lock sudah dipegang)."""
+        self.vip.discard(cid)
+        self.free_open.discard(cid)
+        self.free_exhausted.discard(cid)
+        if cid == self._admin_id or cid not in self._subscribers:
+            return
+        if cid in self._vip_until:
+            self.vip.add(cid)
+        elif self._counts.get(cid, 0) >= self.free_limit:
+            self.free_exhausted.add(cid)
+        else:
+            self.free_open.add(cid)
+
+    # ---------- event ----------
+
+    def subscribe(self, cid: int) -> None:
+        with self._lock:
+            self._subscribers.add(cid)
+            self._place(cid)
+
+    def unsubscribe(self, cid: int) -> None:
+        with self._lock:
+            self._subscribers.discard(cid)
+            self._place(cid)
+
+    def set_vip(self, uid: int, expires: float) -> None:
+        with self._lock:
+            self._vip_until[uid] = expires
+            heapq.heappush(self._heap, (expires, uid))
+            self._place(uid)
+
+    def remove_vip(self, uid: int) -> None:
+        with self._lock:
+            self._vip_until.pop(uid, None)  # entry heap-nya jadi basi
+            self._place(uid)
+
+    def record_delivered(self, free_ids: Iterable[int]) -> None:
+        with self._lock:
+            for cid in free_ids:
+                count = self._counts.get(cid, 0) + 1
+                self._counts[cid] = count
+                if count >= self.free_limit and cid in self.free_open:
+                    self.free_open.discard(cid)
+                    self.free_exhausted.add(cid)
+
+    def reset_quota(self, daily_counts: Optional[Dict[int, int]] = None) -> None:
+        """
+        Hari baru: partisi exhausted kembali ke free. Set yang lebih kecil digabung ke
+        yang lebih besar (swap referensi), lalu hanya user di daily_counts yang kuotanya
+        sudah habis dipindah lagi → O(min(open, exhausted) + len(daily_counts)).
+        """
+        with self._lock:
+            self._counts = dict(daily_counts or {})
+            if len(self.free_exhausted) > len(self.free_open):
+                self.free_open, self.free_exhausted = self.free_exhausted, self.free_open
+            self.free_open |= self.free_exhausted
+            self.free_exhausted = set()
+            for cid, count in self._counts.items():
+                if count >= self.free_limit and cid in self.free_open:
+                    self.free_open.discard(cid)
+                    self.free_exhausted.add(cid)
+
+    def expire_due(self, now: Optional[float] = None) -> List[int]:
+        """Pop VIP yang deadline-nya lewat dari heap → pindah ke partisi free. Return user_id."""
+        now = time.time() if now is None else now
+        expired: List[int] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                exp, uid = heapq.heappop(self._heap)
+                if self._vip_until.get(uid) != exp:
+                    continue  # entry basi (VIP diperpanjang / dihapus)
+                del self._vip_until[uid]
+                self._place(uid)
+                expired.append(uid)
+        return expired
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            while self._heap and self._vip_until.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    # ---------- query ----------
+
+    def recipients(
+        self,
+        now: Optional[float] = None,
+        include_exhausted: bool = False,
+    ) -> Tuple[List[int], List[int]]:
+        """
+        (vip_ids, free_ids) untuk satu broadcast; VIP yang lewat deadline diturunkan dulu.
+        include_exhausted → free yang kuotanya habis ikut (pesan yang tidak memakai kuota).
+        """
+        self.expire_due(now)
+        with self._lock:
+            free_ids = list(self.free_open)
+            if include_exhausted:
+                free_ids.extend(self.free_exhausted)
+            return list(self.vip), free_ids
+
+    def format_stats(self) -> str:
+        with self._lock:
+            return (
+                f"Penerima   : {len(self.vip)} VIP, {len(self.free_open)} free, "
+                f"{len(self.free_exhausted)} free kuota habis"
+            )
+
+
+# Instance global: di-update fungsi mutasi di bot_state, dibaca broadcast_signal
+eligibility = EligibilityIndex()
@@ -0,0 +1,90 @@
+# core/engine_commands.py
+# Antrian command engine: update Telegram (polling / webhook) masuk sebagai pesan,
+# lalu diproses berurutan oleh satu consumer di event loop engine.
+# Semua perubahan state (scanning, cooldown, subscribers, VIP, restart) terjadi di
+# loop yang sama dengan receive loop WebSocket → tidak ada race antar thread.
+
+import asyncio
+import time
+from typing import Any, Callable, List, Optional
+
+# Batas antrian update (update berlebih di-drop, Telegram akan kirim ulang kalau perlu)
+COMMAND_QUEUE_MAXSIZE = 1000
+
+
+class EngineCommands:
+    def __init__(self, maxsize: int = COMMAND_QUEUE_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakers: List[Callable[[], None]] = []
+
+        # statistik
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_latency = 0.0
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        return self._queue
+
+    def post(self, message: Any) -> None:
+        """Antrikan satu pesan (dipanggil dari event loop engine)."""
+        queue = self._ensure_queue()
+        try:
+            queue.put_nowait((time.monotonic(), message))
+            self.received += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print("[Engine CMD] Antrian command penuh → update di-drop.")
+
+    async def serve(self, handler: Callable[[Any], None]) -> None:
+        """Consumer: handler(message) dipanggil di event loop, satu per satu (urutan terjaga)."""
+        queue = self._ensure_queue()
+        while True:
+            ts, message = await queue.get()
+            try:
+                handler(message)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print("[Engine CMD] Error proses command:", e)
+            finally:
+                self.last_latency = time.monotonic() - ts
+                queue.task_done()
+
+    # ---------- interupsi receive loop ----------
+
+    def add_waker(self, waker: Callable[[], None]) -> None:
+        self._wakers.append(waker)
+
+    def remove_waker(self, waker: Callable[[], None]) -> None:
+        if waker in self._wakers:
+            self._wakers.remove(waker)
+
+    def interrupt(self) -> None:
+        """
+        Bangunkan loop engine yang sedang menunggu (mis. receive loop WebSocket)
+        supaya /softrestart & /stopbot langsung diproses, tanpa nunggu frame berikutnya.
+        """
+        for waker in list(self._wakers):
+            try:
+                waker()
+            except Exception as e:
+                print("[Engine CMD] Error wake engine:", e)
+
+    def format_stats(self) -> str:
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return (
+            f"Command    : antre {queued}, {self.processed} diproses, "
+            f"{self.failed} error, {self.dropped} drop, "
+            f"latency {self.last_latency * 1000:.0f}ms"
+        )
+
+
+# Instance global: diisi loop update Telegram, dikonsumsi run_range_bot
+engine_commands = EngineCommands()
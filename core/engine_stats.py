@@ -0,0 +1,27 @@
+# core/engine_stats.py
+# Registry ringan untuk statistik engine (WS, pipeline, dll) yang ditampilkan di /status.
+
+from typing import Callable, Dict
+
+_providers: Dict[str, Callable[[], str]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], str]) -> None:
+    """Daftarkan fungsi yang mengembalikan teks statistik singkat."""
+    _providers[name] = provider
+
+
+def unregister_stats(name: str) -> None:
+    _providers.pop(name, None)
+
+
+def format_engine_stats() -> str:
+    lines = []
+    for name, provider in list(_providers.items()):
+        try:
+            text = provider()
+        except Exception as e:
+            text = f"error: {e}"
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
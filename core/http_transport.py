@@ -0,0 +1,261 @@
+# core/http_transport.py
+# Transport HTTP bersama untuk semua REST call (Binance & Telegram):
+# - satu requests.Session per host → koneksi keep-alive di-pool (tanpa handshake TCP/TLS tiap call)
+# - retry + backoff untuk error koneksi / 5xx (urllib3 Retry; POST tidak di-retry saat read error)
+# - hitung request-weight Binance dari header, pause otomatis saat 429/418 (Retry-After)
+# - circuit breaker per host: gagal beruntun → host diblok sebentar, request langsung error
+# - histogram latency per endpoint (ditampilkan di /status)
+
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import BINANCE_WEIGHT_LIMIT_1M
+
+# Sisakan ruang weight untuk request lain (HTF, exchangeInfo, dll)
+WEIGHT_SAFETY_RATIO = 0.8
+# Koneksi keep-alive maksimal per host
+POOL_MAXSIZE = 20
+# Retry transport (koneksi putus / 5xx), backoff 0.5s, 1s, 2s
+TRANSPORT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+# Circuit breaker: buka setelah N gagal beruntun, tutup lagi (half-open) setelah cooldown
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+# Batas bucket histogram latency (ms)
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+_BINANCE_HOST_MARK = "binance"
+_BOT_TOKEN_RE = re.compile(r"/bot[^/]+/")
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Host sedang diblok circuit breaker (turunan ConnectionError → ikut tertangkap handler lama)."""
+
+
+class WeightTracker:
+    """
+    Catat used-weight 1 menit dari header Binance, dan tahan request baru
+    kalau budget hampir habis sampai window menit berikutnya.
+    Bisa dipakai dari event loop (acquire) maupun thread (wait_if_paused).
+    """
+
+    def __init__(self, limit_1m: int = BINANCE_WEIGHT_LIMIT_1M, safety_ratio: float = WEIGHT_SAFETY_RATIO) -> None:
+        self.limit_1m = limit_1m
+        self.budget = int(limit_1m * safety_ratio)
+        self.used = 0
+        self._window = int(time.time() // 60)
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _roll_window(self) -> None:
+        window = int(time.time() // 60)
+        if window != self._window:
+            self._window = window
+            self.used = 0
+
+    def update_from_headers(self, headers) -> None:
+        raw = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("X-MBX-USED-WEIGHT")
+        if raw is None:
+            return
+        try:
+            used = int(raw)
+        except ValueError:
+            return
+        with self._sync_lock:
+            self._roll_window()
+            # header = angka resmi dari server, tapi jangan turunkan
+            # hitungan lokal untuk request yang masih in-flight
+            self.used = max(self.used, used)
+
+    def pause(self, seconds: float) -> None:
+        with self._sync_lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.time())
+
+    def wait_if_paused(self) -> None:
+        """Versi blocking untuk caller di thread (REST di luar preload)."""
+        wait = self.paused_for()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire(self, cost: int) -> None:
+        """Tunggu sampai ada budget untuk request dengan weight `cost`."""
+        async with self._lock:
+            while True:
+                now = time.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                with self._sync_lock:
+                    self._roll_window()
+                    if self.used + cost <= self.budget:
+                        self.used += cost
+                        return
+                wait = 60 - (now % 60) + 0.2
+                print(f"Weight {self.used}/{self.limit_1m} mendekati limit → tunggu {wait:.1f}s...")
+                await asyncio.sleep(wait)
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> float:
+        """Perkiraan kuantil (batas atas bucket)."""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        acc = 0
+        for i, n in enumerate(self.counts):
+            acc += n
+            if acc >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else float("inf")
+        return float("inf")
+
+
+class _Breaker:
+    def __init__(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+
+
+class HttpTransport:
+    def __init__(self, tracker: Optional[WeightTracker] = None) -> None:
+        self.tracker = tracker or WeightTracker()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._breakers: Dict[str, _Breaker] = {}
+        self._hist: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    retry = Retry(
+                        total=TRANSPORT_RETRIES,
+                        backoff_factor=RETRY_BACKOFF,
+                        status_forcelist=(500, 502, 503, 504),
+                        raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+                    session = requests.Session()
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._sessions[host] = session
+        return session
+
+    @staticmethod
+    def _endpoint(host: str, path: str) -> str:
+        # token bot Telegram jangan sampai masuk statistik
+        return host + _BOT_TOKEN_RE.sub("/bot…/", path)
+
+    def _check_breaker(self, host: str) -> None:
+        br = self._breakers.get(host)
+        if br is not None and br.open_until > time.time():
+            raise CircuitOpenError(f"Circuit {host} terbuka ({br.open_until - time.time():.0f}s lagi)")
+
+    def _record_result(self, host: str, ok: bool) -> None:
+        with self._lock:
+            br = self._breakers.setdefault(host, _Breaker())
+            if ok:
+                br.failures = 0
+                return
+            br.failures += 1
+            if br.failures >= BREAKER_THRESHOLD:
+                br.open_until = time.time() + BREAKER_COOLDOWN
+                # half-open setelah cooldown: 1 gagal lagi → langsung buka lagi
+                br.failures = BREAKER_THRESHOLD - 1
+                br.trips += 1
+                print(f"[HTTP] Circuit {host} dibuka {BREAKER_COOLDOWN:.0f}s (gagal beruntun).")
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sama seperti requests.request, lewat session pool per host.
+        Error jaringan tetap dilempar (requests.RequestException) seperti sebelumnya.
+        """
+        parts = urlsplit(url)
+        host = parts.netloc
+        is_binance = _BINANCE_HOST_MARK in host
+        self._check_breaker(host)
+        if is_binance:
+            self.tracker.wait_if_paused()
+
+        endpoint = self._endpoint(host, parts.path)
+        hist = self._hist.get(endpoint)
+        if hist is None:
+            hist = self._hist.setdefault(endpoint, LatencyHistogram())
+
+        t0 = time.perf_counter()
+        try:
+            r = self._session(host).request(method, url, **kwargs)
+        except requests.RequestException:
+            hist.errors += 1
+            self._record_result(host, False)
+            raise
+        hist.observe((time.perf_counter() - t0) * 1000)
+
+        if is_binance:
+            self.tracker.update_from_headers(r.headers)
+            if r.status_code in (429, 418):
+                try:
+                    retry_after = float(r.headers.get("Retry-After", "60"))
+                except ValueError:
+                    retry_after = 60.0
+                print(f"[HTTP] Binance rate limit ({r.status_code}) → pause {retry_after:.0f}s")
+                self.tracker.pause(retry_after)
+        if r.status_code >= 500:
+            hist.errors += 1
+        self._record_result(host, r.status_code < 500)
+        return r
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def format_stats(self, top: int = 6) -> str:
+        if not self._hist:
+            return ""
+        items = sorted(self._hist.items(), key=lambda kv: kv[1].total, reverse=True)[:top]
+        trips = sum(b.trips for b in self._breakers.values())
+        lines: List[str] = [
+            f"HTTP       : {len(self._sessions)} pool host, weight {self.tracker.used}/{self.tracker.limit_1m}, "
+            f"circuit trip {trips}x"
+        ]
+        for endpoint, h in items:
+            avg = h.sum_ms / h.total if h.total else 0.0
+            lines.append(
+                f"  {endpoint}: {h.total} req, {h.errors} err, "
+                f"avg {avg:.0f}ms, p50≤{h.quantile(0.5):.0f}ms, p95≤{h.quantile(0.95):.0f}ms"
+            )
+        return "\n".join(lines)
+
+
+# Transport global (dipakai binance_preload, pair_universe, telegram)
+http = HttpTransport()
@@ -0,0 +1,184 @@
+# core/signal_filters.py
+# Filter sinyal per subscriber (symbol, side, tier, SL% maksimum) sebagai inverted index:
+# - tiap user yang punya filter dapat satu slot bit
+# - per dimensi: nilai → bitset user yang menerima nilai itu (+ bitset "semua nilai")
+# - SL% maksimum: slot user ber-max_sl diurutkan naik per threshold → user yang lolos
+#   = rentang bit berurutan [bisect, n_sl) → mask suffix cukup 2 shift dari bitset
+#   semua-max_sl yang di-compile sekali saat filter berubah (tanpa bangun mask per query)
+# Mencocokkan satu sinyal = beberapa operasi AND/OR bitset, bukan loop per user.
+# User tanpa filter sama sekali tidak masuk index → menerima semua sinyal.
+
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+FILTER_SIDES = ("long", "short")
+FILTER_TIERS = ("A+", "A", "B")
+
+# Prefs per user: {"symbols": [...], "sides": [...], "tiers": [...], "max_sl": float}
+# (key tidak ada = semua nilai)
+FilterPrefs = Dict[str, object]
+
+
+class SignalFilterIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._prefs: Dict[int, FilterPrefs] = {}
+        self._dirty = True
+
+        # hasil compile
+        self._slot_user: List[int] = []
+        self._all = 0
+        self._any_symbol = 0
+        self._by_symbol: Dict[str, int] = {}
+        self._any_side = 0
+        self._by_side: Dict[str, int] = {}
+        self._any_tier = 0
+        self._by_tier: Dict[str, int] = {}
+        self._sl_thresholds: List[float] = []  # max_sl terurut naik (= slot 0..n_sl-1)
+        self._sl_all = 0  # bitset slot 0..n_sl-1 (semua user ber-max_sl)
+        self._any_sl = 0
+
+    # ---------- update ----------
+
+    def load(self, prefs: Dict[int, FilterPrefs]) -> None:
+        with self._lock:
+            self._prefs = {cid: p for cid, p in prefs.items() if p}
+            self._dirty = True
+
+    def set(self, chat_id: int, prefs: Optional[FilterPrefs]) -> None:
+        with self._lock:
+            if prefs:
+                self._prefs[chat_id] = prefs
+            else:
+                self._prefs.pop(chat_id, None)
+            self._dirty = True  # compile ulang (malas) saat sinyal berikutnya
+
+    def discard(self, chat_ids: Iterable[int]) -> None:
+        """Hapus filter banyak user sekaligus (unsubscribe / VIP habis)."""
+        with self._lock:
+            removed = [cid for cid in chat_ids if self._prefs.pop(cid, None) is not None]
+            if removed:
+                self._dirty = True
+
+    def get(self, chat_id: int) -> FilterPrefs:
+        with self._lock:
+            return dict(self._prefs.get(chat_id, {}))
+
+    # ---------- compile ----------
+
+    def _mask(self, slots) -> int:
+        """Daftar slot → bitset int (dibangun lewat numpy, O(n/8) per bitset)."""
+        bits = np.zeros(len(self._slot_user), dtype=bool)
+        bits[np.asarray(slots, dtype=np.int64)] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def _compile(self) -> None:
+        # slot: dulu user ber-max_sl urut threshold naik, lalu sisanya
+        sl_users = sorted(
+            (cid for cid, p in self._prefs.items() if p.get("max_sl")),
+            key=lambda cid: float(self._prefs[cid]["max_sl"]),
+        )
+        sl_set = set(sl_users)
+        self._slot_user = sl_users + [cid for cid in self._prefs if cid not in sl_set]
+        any_symbol: List[int] = []
+        any_side: List[int] = []
+        any_tier: List[int] = []
+        any_sl: List[int] = []
+        by_symbol: Dict[str, List[int]] = {}
+        by_side: Dict[str, List[int]] = {}
+        by_tier: Dict[str, List[int]] = {}
+
+        for slot, cid in enumerate(self._slot_user):
+            prefs = self._prefs[cid]
+            for key, any_list, by_value in (
+                ("symbols", any_symbol, by_symbol),
+                ("sides", any_side, by_side),
+                ("tiers", any_tier, by_tier),
+            ):
+                values = prefs.get(key)
+                if values:
+                    for v in values:
+                        by_value.setdefault(v, []).append(slot)
+                else:
+                    any_list.append(slot)
+
+            if not prefs.get("max_sl"):
+                any_sl.append(slot)
+
+        self._all = (1 << len(self._slot_user)) - 1
+        self._any_symbol = self._mask(any_symbol)
+        self._by_symbol = {v: self._mask(slots) for v, slots in by_symbol.items()}
+        self._any_side = self._mask(any_side)
+        self._by_side = {v: self._mask(slots) for v, slots in by_side.items()}
+        self._any_tier = self._mask(any_tier)
+        self._by_tier = {v: self._mask(slots) for v, slots in by_tier.items()}
+        n_sl = len(sl_users)
+        self._sl_thresholds = [float(self._prefs[cid]["max_sl"]) for cid in sl_users]
+        self._sl_all = (1 << n_sl) - 1
+        self._any_sl = self._mask(any_sl)
+        self._dirty = False
+
+    def _bits_to_users(self, mask: int) -> Set[int]:
+        if not mask:
+            return set()
+        n = len(self._slot_user)
+        raw = np.frombuffer(mask.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+        slots = np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+        users = self._slot_user
+        return {users[i] for i in slots}
+
+    # ---------- query ----------
+
+    def _match(self, symbol: str, side: str, tier: str, sl_pct: float) -> int:
+        match = self._any_symbol | self._by_symbol.get(symbol.upper(), 0)
+        match &= self._any_side | self._by_side.get(side, 0)
+        match &= self._any_tier | self._by_tier.get(tier, 0)
+        # user dengan max_sl >= sl_pct = slot bisect..n_sl-1 (rentang bit berurutan)
+        i = bisect.bisect_left(self._sl_thresholds, sl_pct)
+        return match & (self._any_sl | ((self._sl_all >> i) << i))
+
+    def rejected(self, symbol: str, side: str, tier: str, sl_pct: float) -> Set[int]:
+        """User ber-filter yang TIDAK cocok dengan sinyal ini (sisanya tetap menerima)."""
+        return self.rejected_all([(symbol, side, tier, sl_pct)])
+
+    def rejected_all(self, signals: Sequence[tuple]) -> Set[int]:
+        """
+        User ber-filter yang tidak cocok dengan SATUPUN sinyal (symbol, side, tier, sl_pct)
+        → untuk digest; OR bitset per sinyal, konversi ke set user sekali di akhir.
+        """
+        with self._lock:
+            if not self._prefs or not signals:
+                return set()
+            if self._dirty:
+                self._compile()
+
+            match = 0
+            for symbol, side, tier, sl_pct in signals:
+                match |= self._match(symbol, side, tier, sl_pct)
+                if match == self._all:
+                    return set()
+            return self._bits_to_users(self._all & ~match)
+
+    def format_stats(self) -> str:
+        with self._lock:
+            return f"Filter     : {len(self._prefs)} user punya filter sinyal"
+
+
+def describe_filter(prefs: FilterPrefs) -> str:
+    symbols = prefs.get("symbols")
+    sides = prefs.get("sides")
+    tiers = prefs.get("tiers")
+    max_sl = prefs.get("max_sl")
+    return (
+        f"Symbol : {', '.join(symbols) if symbols else 'semua'}\n"
+        f"Side   : {', '.join(s.upper() for s in sides) if sides else 'semua'}\n"
+        f"Tier   : {', '.join(tiers) if tiers else 'semua'}\n"
+        f"Max SL : {f'{max_sl:g}%' if max_sl else 'bebas'}"
+    )
+
+
+# Instance global: di-load run_range_bot, di-update command /filter, dibaca broadcast_signal
+signal_filters = SignalFilterIndex()
@@ -1,21 +1,35 @@
 # main.py
-# Entry point: start Telegram command loop + Binance RANGE stream loop.
+# Entry point: satu runtime asyncio untuk Telegram command loop + Binance RANGE stream loop.
 
 import asyncio
-import threading
 
 from core.bot_state import state
+from telegram.telegram_common import exec_restart, flush_replies
 from telegram.telegram_core import telegram_command_loop
 from binance.binance_stream import run_range_bot  # <- pakai engine RANGE
 
 
-if __name__ == "__main__":
-    # Jalankan loop command Telegram di thread terpisah
-    cmd_thread = threading.Thread(target=telegram_command_loop, daemon=True)
-    cmd_thread.start()
+async def main() -> None:
+    # Loop update Telegram jalan sebagai task di event loop yang sama dengan engine;
+    # command diteruskan ke engine lewat antrian (engine_commands), bukan mutasi state dari thread lain.
+    cmd_task = asyncio.create_task(telegram_command_loop(), name="telegram-updates")
+    try:
+        await run_range_bot()
+    finally:
+        cmd_task.cancel()
+        try:
+            await cmd_task
+        except (asyncio.CancelledError, Exception):
+            pass
 
+
+if __name__ == "__main__":
     try:
-        asyncio.run(run_range_bot())
+        asyncio.run(main())
     except KeyboardInterrupt:
         state.running = False
         print("Bot dihentikan oleh user (CTRL+C).")
+    finally:
+        flush_replies()  # balasan command yang masih antre tetap terkirim
+    if state.request_hard_restart:
+        exec_restart()
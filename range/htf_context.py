@@ -3,46 +3,44 @@
 # - trend UP / DOWN / RANGE di 1h
 # - posisi harga di dalam range (DISCOUNT / PREMIUM / MID) 1h & 15m
 # - flag apakah market cenderung RANGING atau TRENDING
-
+# Data HTF dibaca dari buffer lokal (binance/htf_buffer.py), bukan REST per sinyal.
+# Konteks semua symbol dihitung ulang sekaligus (vectorized) hanya saat bar 15m/1h
+# close, disimpan di HTFContextTable → sinyal cukup lookup O(1).
+# Refresh membaca snapshot (copy) buffer yang diambil di event loop, jadi thread
+# refresh tidak membaca ring yang sedang ditulis receive loop.
+
+import threading
+import time
 from typing import Dict, List, Literal, Optional
 
-import requests
+import numpy as np
+
+from binance.htf_buffer import HTF_INTERVALS, htf_buffers
+from config import HTF_CONTEXT_VERIFY
 
-from config import BINANCE_REST_URL
+# interval → symbol → {"high", "low", "close"} (copy, bukan view ring)
+HTFSnapshot = Dict[str, Dict[str, Dict[str, np.ndarray]]]
 
 
-def _fetch_klines(symbol: str, interval: str, limit: int = 150) -> Optional[List[list]]:
+def snapshot_htf(symbols: List[str]) -> HTFSnapshot:
     """
-    Fetch raw klines futures:
-    Return list of Binance kline array, atau None jika gagal.
+    Copy high/low/close HTF semua symbol (dipanggil di event loop, sebelum refresh
+    dikirim ke thread). Symbol yang buffer HTF-nya belum lengkap dilewati.
     """
-    url = f"{BINANCE_REST_URL}/fapi/v1/klines"
-    params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        return data
-    except Exception as e:
-        print(f"[{symbol}] ERROR fetch HTF klines ({interval}):", e)
-        return None
-
-
-def _parse_ohlc(data: List[list]) -> Dict[str, List[float]]:
-    highs: List[float] = []
-    lows: List[float] = []
-    closes: List[float] = []
-    for row in data:
-        try:
-            h = float(row[2])
-            l = float(row[3])
-            c = float(row[4])
-        except (ValueError, TypeError, IndexError):
+    snap: HTFSnapshot = {interval: {} for interval in HTF_INTERVALS}
+    for sym in symbols:
+        sym = sym.upper()
+        if not htf_buffers.has(sym):
             continue
-        highs.append(h)
-        lows.append(l)
-        closes.append(c)
-    return {"high": highs, "low": lows, "close": closes}
+        for interval in HTF_INTERVALS:
+            arr = htf_buffers.get_arrays(sym, interval)
+            snap[interval][sym] = {k: np.array(arr[k]) for k in ("high", "low", "close")}
+    return snap
+
+
+def _snapshot_hlc(snapshot: HTFSnapshot, symbol: str, interval: str) -> Dict[str, List[float]]:
+    arr = snapshot[interval][symbol]
+    return {k: arr[k].tolist() for k in ("high", "low", "close")}
 
 
 def _detect_trend_1h(hlc: Dict[str, List[float]]) -> Literal["UP", "DOWN", "RANGE"]:
@@ -131,27 +129,8 @@ def _discount_premium(
     }
 
 
-def get_htf_context(symbol: str) -> Dict[str, object]:
-    """
-    Ambil konteks 1h & 15m untuk symbol (tanpa indikator klasik).
-
-    Return dict:
-    {
-      "trend_1h": "UP"|"DOWN"|"RANGE",
-      "pos_1h": "DISCOUNT"|"PREMIUM"|"MID",
-      "pos_15m": "DISCOUNT"|"PREMIUM"|"MID",
-      "is_ranging_1h": bool,
-      "mid_band_ok": bool,
-      "htf_ok_long": bool,
-      "htf_ok_short": bool,
-    }
-
-    Catatan:
-    - Range Engine lebih suka kondisi "RANGE" dan posisi harga di MID (bukan terlalu ujung).
-    - Jika fetch gagal → semua dianggap netral (return context default).
-    """
-    # default netral
-    ctx = {
+def _neutral_context() -> Dict[str, object]:
+    return {
         "trend_1h": "RANGE",
         "pos_1h": "MID",
         "pos_15m": "MID",
@@ -161,22 +140,8 @@ def get_htf_context(symbol: str) -> Dict[str, object]:
         "htf_ok_short": True,
     }
 
-    data_1h = _fetch_klines(symbol, "1h", 150)
-    data_15m = _fetch_klines(symbol, "15m", 150)
-
-    if not data_1h or not data_15m:
-        return ctx  # netral
-
-    hlc_1h = _parse_ohlc(data_1h)
-    hlc_15m = _parse_ohlc(data_15m)
-
-    trend_1h = _detect_trend_1h(hlc_1h)
-    pos1 = _discount_premium(hlc_1h)
-    pos15 = _discount_premium(hlc_15m)
-
-    pos_1h = pos1["position"]
-    pos_15m = pos15["position"]
 
+def _combine_context(trend_1h: str, pos_1h: str, pos_15m: str) -> Dict[str, object]:
     is_ranging_1h = trend_1h == "RANGE"
     mid_band_ok = (pos_1h == "MID") or (pos_15m == "MID")
 
@@ -202,3 +167,175 @@ def get_htf_context(symbol: str) -> Dict[str, object]:
         "htf_ok_long": htf_ok_long,
         "htf_ok_short": htf_ok_short,
     }
+
+
+def compute_htf_context(symbol: str, snapshot: Optional[HTFSnapshot] = None) -> Dict[str, object]:
+    """
+    Hitung konteks HTF satu symbol (jalur per symbol, list Python): referensi untuk
+    verifikasi tabel vectorized (HTF_CONTEXT_VERIFY). snapshot None → ambil dari buffer.
+    """
+    symbol = symbol.upper()
+    if snapshot is None:
+        snapshot = snapshot_htf([symbol])
+    if symbol not in snapshot["1h"]:
+        return _neutral_context()
+
+    hlc_1h = _snapshot_hlc(snapshot, symbol, "1h")
+    hlc_15m = _snapshot_hlc(snapshot, symbol, "15m")
+
+    trend_1h = _detect_trend_1h(hlc_1h)
+    pos_1h = _discount_premium(hlc_1h)["position"]
+    pos_15m = _discount_premium(hlc_15m)["position"]
+    return _combine_context(trend_1h, pos_1h, pos_15m)
+
+
+def _trend_1h_batch(highs: np.ndarray, lows: np.ndarray) -> np.ndarray:
+    """Versi matrix (S, n) dari _detect_trend_1h. Return array 'UP'/'DOWN'/'RANGE'."""
+    s, n = highs.shape
+    out = np.full(s, "RANGE", dtype=object)
+    if n < 20:
+        return out
+    step = max(n // 10, 2)
+    last_idx = ((n - 1) // step) * step
+    if last_idx // step + 1 < 3:
+        return out
+    first_h, last_h = highs[:, 0], highs[:, last_idx]
+    first_l, last_l = lows[:, 0], lows[:, last_idx]
+    up = (last_h > first_h * 1.01) & (last_l > first_l * 1.005)
+    down = ~up & (last_h < first_h * 0.99) & (last_l < first_l * 0.995)
+    out[up] = "UP"
+    out[down] = "DOWN"
+    return out
+
+
+def _position_batch(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    closes: np.ndarray,
+    window: int = 60,
+) -> np.ndarray:
+    """Versi matrix (S, n) dari _discount_premium. Return array 'DISCOUNT'/'PREMIUM'/'MID'."""
+    s, n = highs.shape
+    out = np.full(s, "MID", dtype=object)
+    if n < 5:
+        return out
+    start = max(0, n - window)
+    range_high = highs[:, start:].max(axis=1)
+    range_low = lows[:, start:].min(axis=1)
+    price = closes[:, -1]
+    valid = range_high > range_low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pos = (price - range_low) / (range_high - range_low)
+    out[valid & (pos <= 0.35)] = "DISCOUNT"
+    out[valid & (pos >= 0.65)] = "PREMIUM"
+    return out
+
+
+def _batch_by_length(arrays: Dict[str, Dict[str, np.ndarray]], fn) -> Dict[str, str]:
+    """Kelompokkan symbol per panjang history supaya bisa di-stack jadi matrix."""
+    groups: Dict[int, List[str]] = {}
+    for sym, arr in arrays.items():
+        n = arr["close"].size
+        if n > 0:
+            groups.setdefault(n, []).append(sym)
+
+    result: Dict[str, str] = {}
+    for group in groups.values():
+        arrs = [arrays[sym] for sym in group]
+        highs = np.stack([a["high"] for a in arrs])
+        lows = np.stack([a["low"] for a in arrs])
+        closes = np.stack([a["close"] for a in arrs])
+        labels = fn(highs, lows, closes)
+        result.update(zip(group, labels))
+    return result
+
+
+class HTFContextTable:
+    """
+    Tabel konteks HTF per symbol.
+    refresh() menghitung ulang semua symbol sekaligus dari snapshot_htf() (dipanggil saat
+    bar 15m/1h close), lalu tabel baru di-swap atomik → lookup dari worker analisa tidak
+    pernah nunggu. verify → tiap symbol dibandingkan dengan compute_htf_context().
+    """
+
+    def __init__(self) -> None:
+        self._table: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()  # cegah dua refresh jalan bersamaan
+        self.last_refresh = 0.0
+        self.last_duration = 0.0
+        self.refreshes = 0
+        self.verified = 0
+        self.mismatch = 0
+
+    def refresh(self, snapshot: HTFSnapshot, verify: bool = HTF_CONTEXT_VERIFY) -> None:
+        with self._lock:
+            t0 = time.time()
+            syms = [s for s in snapshot["1h"] if s in snapshot["15m"]]
+            trend = _batch_by_length(snapshot["1h"], lambda h, l, c: _trend_1h_batch(h, l))
+            pos_1h = _batch_by_length(snapshot["1h"], _position_batch)
+            pos_15m = _batch_by_length(snapshot["15m"], _position_batch)
+
+            table = {
+                sym: _combine_context(
+                    trend.get(sym, "RANGE"),
+                    pos_1h.get(sym, "MID"),
+                    pos_15m.get(sym, "MID"),
+                )
+                for sym in syms
+            }
+            self._table = table
+            self.last_refresh = time.time()
+            self.last_duration = self.last_refresh - t0
+            self.refreshes += 1
+
+            if verify:
+                mismatched = [sym for sym in syms if compute_htf_context(sym, snapshot) != table[sym]]
+                self.verified += len(syms)
+                self.mismatch += len(mismatched)
+                if mismatched:
+                    print(f"[VERIFY] Konteks HTF tabel beda dengan jalur per symbol: {', '.join(mismatched)}")
+
+    def get(self, symbol: str) -> Optional[Dict[str, object]]:
+        return self._table.get(symbol.upper())
+
+    def format_stats(self) -> str:
+        if not self.last_refresh:
+            return "HTF Table  : belum di-refresh"
+        text = (
+            f"HTF Table  : {len(self._table)} symbol, refresh "
+            f"{time.strftime('%H:%M:%S', time.localtime(self.last_refresh))} "
+            f"({self.last_duration * 1000:.1f} ms), {self.refreshes}x"
+        )
+        if self.verified:
+            text += f", verify {self.verified} cek / {self.mismatch} beda"
+        return text
+
+
+# Instance global: di-refresh engine stream, dibaca get_htf_context
+htf_table = HTFContextTable()
+
+
+def get_htf_context(symbol: str) -> Dict[str, object]:
+    """
+    Ambil konteks 1h & 15m untuk symbol (tanpa indikator klasik).
+
+    Return dict:
+    {
+      "trend_1h": "UP"|"DOWN"|"RANGE",
+      "pos_1h": "DISCOUNT"|"PREMIUM"|"MID",
+      "pos_15m": "DISCOUNT"|"PREMIUM"|"MID",
+      "is_ranging_1h": bool,
+      "mid_band_ok": bool,
+      "htf_ok_long": bool,
+      "htf_ok_short": bool,
+    }
+
+    Catatan:
+    - Range Engine lebih suka kondisi "RANGE" dan posisi harga di MID (bukan terlalu ujung).
+    - Lookup O(1) dari HTFContextTable (dihitung ulang tiap bar 15m/1h close);
+      symbol yang belum ada di tabel → netral (context default).
+    """
+    ctx = htf_table.get(symbol)
+    if ctx is None:
+        return _neutral_context()
+    return dict(ctx)
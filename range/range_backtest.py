@@ -0,0 +1,497 @@
+# range/range_backtest.py
+# Backtest offline strategi RANGE dari file kline lokal (CSV / NPY), tanpa loop per bar:
+# - deteksi range + breakout: sliding_window_view di seluruh history 5m, aturannya
+#   sama persis dengan jalur live (detect_ranges_batch)
+# - konteks HTF: _trend_1h_batch / _position_batch di atas window 1h & 15m
+#   (panjang window = buffer HTF live), disejajarkan ke bar 5m lewat searchsorted
+# - level Entry/SL/TP = _build_levels versi array; skor & tier = score_signal /
+#   tier_from_score versi array (score_signals / tier_orders, dicek sama di tests)
+# - vol_ok selalu True, sama dengan jalur live (build_range_signal belum punya cek
+#   volatilitas) → +10 untuk semua kandidat
+# - hasil trade: scan maju vectorized (fill retest → SL / TP1 / TP2 / TP3 pertama)
+#
+# Model eksekusi (sederhana & konservatif):
+# - entry limit di batas range, berlaku max_entry_age_candles bar setelah bar sinyal
+# - posisi ditutup 1/3 di tiap TP; SL kena → sisa posisi -1R
+# - SL & TP kena di bar yang sama → dianggap SL dulu; TP tidak dihitung di bar fill
+# - belum selesai setelah `horizon` bar → sisa posisi ditutup di close (timeout)
+# - fee, slippage & funding tidak dihitung; gap data tidak di-backfill
+#
+# File data (satu folder): <SYMBOL>_<interval>.npy / .csv atau file bulanan
+# data.binance.vision (<SYMBOL>-<interval>-YYYY-MM.csv). Kolom: open_time, open, high,
+# low, close, volume (urutan kline Binance); NPY boleh structured (RECORD_DTYPE candle_store).
+
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from binance.htf_buffer import HTF_CANDLES, HTF_INTERVALS
+from core.range_settings import range_settings
+from range.htf_context import _position_batch, _trend_1h_batch
+from range.range_batch import detect_ranges_batch
+
+BAR_5M_MS = 5 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+KLINE_COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+# RR TP1/TP2/TP3 (sama dengan default _build_levels)
+RR_LEVELS = (1.5, 2.5, 4.0)
+TIER_ORDER = {"NONE": 0, "B": 1, "A": 2, "A+": 3}
+TIER_NAMES = np.array(list(TIER_ORDER), dtype=object)
+# Batas skor B / A / A+ (sama dengan tier_from_score)
+TIER_SCORES = (80, 100, 120)
+# Jumlah window 5m per blok saat deteksi (membatasi memori temporary stdev)
+DETECT_CHUNK = 50_000
+
+
+# ---------- settings ----------
+
+def apply_settings(overrides: Dict[str, str]) -> None:
+    """Override field RangeSettings dari string (mis. {"range_lookback": "50"})."""
+    names = {f.name for f in fields(range_settings)}
+    for name, value in overrides.items():
+        if name not in names:
+            raise ValueError(f"Field RangeSettings tidak dikenal: {name}")
+        current = getattr(range_settings, name)
+        if isinstance(current, bool):
+            parsed = value.lower() in ("1", "true", "yes", "on")
+        else:
+            parsed = type(current)(value)
+        setattr(range_settings, name, parsed)
+
+
+# ---------- load data ----------
+
+def _kline_files(data_dir: str, symbol: str, interval: str) -> List[str]:
+    pattern = os.path.join(data_dir, f"{symbol}[-_]{interval}[-_.]*")
+    return sorted(p for p in glob.glob(pattern) if p.endswith((".csv", ".npy")))
+
+
+def _read_csv(path: str) -> np.ndarray:
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+    skip = 0 if first[:1].isdigit() else 1  # file baru data.binance.vision punya header
+    return np.loadtxt(path, delimiter=",", usecols=range(6), skiprows=skip, ndmin=2)
+
+
+def _read_npy(path: str) -> np.ndarray:
+    raw = np.load(path)
+    if raw.dtype.names:
+        return np.column_stack([raw[c].astype(np.float64) for c in KLINE_COLUMNS])
+    return np.asarray(raw, dtype=np.float64).reshape(len(raw), -1)[:, :6]
+
+
+def list_symbols(data_dir: str) -> List[str]:
+    """Symbol yang punya file 5m di folder data."""
+    symbols = set()
+    for path in glob.glob(os.path.join(data_dir, "*[-_]5m[-_.]*")):
+        if path.endswith((".csv", ".npy")):
+            symbols.add(re.split(r"[-_]", os.path.basename(path), maxsplit=1)[0].upper())
+    return sorted(symbols)
+
+
+def load_klines(data_dir: str, symbol: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Gabung semua file kline symbol/interval → array kolom (lama → baru, tanpa duplikat).
+    Return None kalau tidak ada file.
+    """
+    parts = []
+    for path in _kline_files(data_dir, symbol, interval):
+        try:
+            data = _read_npy(path) if path.endswith(".npy") else _read_csv(path)
+        except Exception as e:
+            print(f"Gagal baca {path}:", e)
+            continue
+        if data.size:
+            parts.append(data)
+    if not parts:
+        return None
+
+    data = np.concatenate(parts)
+    open_time = data[:, 0].astype(np.int64)
+    # data.binance.vision mulai 2025 memakai mikrodetik
+    open_time = np.where(open_time > 10**14, open_time // 1000, open_time)
+    open_time, idx = np.unique(open_time, return_index=True)
+    data = data[idx]
+    return {
+        "open_time": open_time,
+        "high": np.ascontiguousarray(data[:, 2]),
+        "low": np.ascontiguousarray(data[:, 3]),
+        "close": np.ascontiguousarray(data[:, 4]),
+        "volume": np.ascontiguousarray(data[:, 5]),
+    }
+
+
+# ---------- deteksi ----------
+
+def detect_history(bars: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Jalankan detect_ranges_batch di semua bar sekaligus: window (N+1) candle per bar,
+    candle terakhir window = kandidat breakout. Return array per kandidat:
+    "bar" (index candle breakout), "side" (+1/-1), "range_low", "range_high", "height_pct".
+    Bar awal yang history-nya belum N candle dilewati.
+    """
+    N = range_settings.range_lookback
+    min_n = range_settings.min_range_candles
+    closes = bars["close"]
+    out = {
+        "bar": np.zeros(0, dtype=np.int64),
+        "side": np.zeros(0, dtype=np.int8),
+        "range_low": np.zeros(0),
+        "range_high": np.zeros(0),
+        "height_pct": np.zeros(0),
+    }
+    first = max(N, min_n + 4)  # bar pertama yang lolos syarat history jalur live
+    if N < min_n or closes.size <= first:
+        return out
+
+    hw = sliding_window_view(bars["high"], N + 1)
+    lw = sliding_window_view(bars["low"], N + 1)
+    cw = sliding_window_view(closes, N + 1)
+
+    chunks: Dict[str, List[np.ndarray]] = {key: [] for key in out}
+    for start in range(first - N, hw.shape[0], DETECT_CHUNK):
+        stop = min(start + DETECT_CHUNK, hw.shape[0])
+        res = detect_ranges_batch(hw[start:stop], lw[start:stop], cw[start:stop])
+        hit = np.flatnonzero(res["side"])
+        chunks["bar"].append(hit + start + N)
+        for key in ("side", "range_low", "range_high", "height_pct"):
+            chunks[key].append(res[key][hit])
+    return {key: np.concatenate(parts) for key, parts in chunks.items()}
+
+
+def _htf_labels(bars: Optional[Dict[str, np.ndarray]], fn, default: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Label HTF per candle (fn di atas window HTF_CANDLES). Return (close_time, label)."""
+    if bars is None:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=object)
+    n = bars["close"].size
+    labels = np.full(n, default, dtype=object)
+    if n >= HTF_CANDLES:
+        views = [sliding_window_view(bars[k], HTF_CANDLES) for k in ("high", "low", "close")]
+        labels[HTF_CANDLES - 1:] = fn(*views)
+    return bars["open_time"], labels
+
+
+def _align(
+    labels: Tuple[np.ndarray, np.ndarray],
+    interval: str,
+    bar_close_ms: np.ndarray,
+    default: str,
+) -> np.ndarray:
+    """Label HTF candle terakhir yang sudah close saat bar 5m close."""
+    open_time, values = labels
+    out = np.full(bar_close_ms.size, default, dtype=object)
+    if not open_time.size:
+        return out
+    idx = np.searchsorted(open_time + HTF_INTERVALS[interval], bar_close_ms, side="right") - 1
+    ok = idx >= 0
+    out[ok] = values[idx[ok]]
+    return out
+
+
+def htf_alignment(
+    side: np.ndarray,
+    bar_close_ms: np.ndarray,
+    bars_1h: Optional[Dict[str, np.ndarray]],
+    bars_15m: Optional[Dict[str, np.ndarray]],
+) -> np.ndarray:
+    """htf_ok_long / htf_ok_short per kandidat (aturan sama dengan _combine_context)."""
+    if not range_settings.use_htf_filter:
+        return np.ones(side.size, dtype=bool)
+
+    trend = _align(_htf_labels(bars_1h, lambda h, l, c: _trend_1h_batch(h, l), "RANGE"), "1h", bar_close_ms, "RANGE")
+    pos_1h = _align(_htf_labels(bars_1h, _position_batch, "MID"), "1h", bar_close_ms, "MID")
+    pos_15m = _align(_htf_labels(bars_15m, _position_batch, "MID"), "15m", bar_close_ms, "MID")
+
+    ok_long = ~((trend == "UP") & (pos_1h == "PREMIUM") & (pos_15m == "PREMIUM"))
+    ok_short = ~((trend == "DOWN") & (pos_1h == "DISCOUNT") & (pos_15m == "DISCOUNT"))
+    return np.where(side > 0, ok_long, ok_short)
+
+
+def build_levels(side: np.ndarray, range_low: np.ndarray, range_high: np.ndarray) -> Dict[str, np.ndarray]:
+    """_build_levels versi array (side +1 long / -1 short)."""
+    is_long = side > 0
+    entry = np.where(is_long, range_high, range_low)
+    far = np.where(is_long, range_low, range_high)  # sisi seberang range
+    buffer = np.maximum(far * 0.0015, np.abs(entry) * 0.0005)
+    sl = np.where(is_long, range_low - buffer, range_high + buffer)
+    risk = np.where(is_long, entry - sl, sl - entry)
+
+    # fallback safety (sama dengan _build_levels)
+    bad = risk <= 0
+    risk = np.where(bad, np.abs(entry) * 0.003, risk)
+    sl = np.where(bad, entry - side * risk, sl)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sl_pct = np.where(entry != 0, np.abs(risk / entry) * 100.0, 0.0)
+    levels = {"entry": entry, "sl": sl, "risk": risk, "sl_pct": sl_pct}
+    for i, rr in enumerate(RR_LEVELS, start=1):
+        levels[f"tp{i}"] = entry + side * rr * risk
+    return levels
+
+
+def score_signals(
+    rr_ok: np.ndarray,
+    sl_pct: np.ndarray,
+    htf_alignment: np.ndarray,
+    vol_ok: bool = True,
+) -> np.ndarray:
+    """score_signal versi array; semua kandidat sudah punya range + breakout (25 + 25)."""
+    score = np.full(sl_pct.shape, 25 + 25 + (10 if vol_ok else 0), dtype=np.int64)
+    score += np.where(rr_ok, 15, 0)
+    score += np.where((sl_pct >= 0.25) & (sl_pct <= 0.90), 10, 0)  # SL sweet spot
+    score += np.where(htf_alignment, 20, 0)
+    return np.minimum(score, 150)
+
+
+def tier_orders(scores: np.ndarray) -> np.ndarray:
+    """tier_from_score versi array → nilai TIER_ORDER (0 NONE .. 3 A+)."""
+    return np.searchsorted(np.array(TIER_SCORES), scores, side="right")
+
+
+def _apply_cooldown(close_ms: np.ndarray, send: np.ndarray, cooldown_ms: int) -> np.ndarray:
+    """Sinyal yang benar-benar terkirim: lolos min tier & di luar cooldown symbol (urut waktu)."""
+    if cooldown_ms <= 0:
+        return send.copy()
+    keep = np.zeros(send.size, dtype=bool)
+    last = None
+    for i in np.flatnonzero(send):  # loop per sinyal (jarang), bukan per bar
+        if last is None or close_ms[i] - last >= cooldown_ms:
+            keep[i] = True
+            last = close_ms[i]
+    return keep
+
+
+# ---------- simulasi ----------
+
+def _first_true(hit: np.ndarray) -> np.ndarray:
+    """Index kolom True pertama per baris; jumlah kolom kalau tidak ada."""
+    return np.where(hit.any(axis=1), hit.argmax(axis=1), hit.shape[1])
+
+
+def simulate_trades(
+    bars: Dict[str, np.ndarray],
+    bar_idx: np.ndarray,
+    side: np.ndarray,
+    levels: Dict[str, np.ndarray],
+    horizon: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Scan maju vectorized per sinyal:
+    - fill: harga retest ke entry dalam max_entry_age_candles bar setelah bar sinyal
+    - dari bar fill: index SL & TP1/TP2/TP3 pertama dalam `horizon` bar
+    Return "filled", "tp_hits" (0..3), "sl_hit", "r" (hasil trade dalam R).
+    """
+    age = max(1, range_settings.max_entry_age_candles)
+    closes = bars["close"]
+    n = closes.size
+    pad = np.full(age + horizon, np.nan)  # NaN → tidak pernah kena (akhir data)
+    highs = np.concatenate([bars["high"], pad])
+    lows = np.concatenate([bars["low"], pad])
+
+    is_long = (side > 0)[:, None]
+    entry = levels["entry"][:, None]
+
+    # 1) fill retest
+    hw = sliding_window_view(highs, age)[bar_idx + 1]
+    lw = sliding_window_view(lows, age)[bar_idx + 1]
+    touch = np.where(is_long, lw <= entry, hw >= entry)
+    filled = touch.any(axis=1)
+    fill_idx = bar_idx + 1 + touch.argmax(axis=1)
+
+    # 2) SL / TP pertama sejak bar fill
+    hw = sliding_window_view(highs, horizon)[fill_idx]
+    lw = sliding_window_view(lows, horizon)[fill_idx]
+    sl = levels["sl"][:, None]
+    first_sl = _first_true(np.where(is_long, lw <= sl, hw >= sl))
+
+    reached = []
+    for i in range(1, len(RR_LEVELS) + 1):
+        tp = levels[f"tp{i}"][:, None]
+        hit = np.where(is_long, hw >= tp, lw <= tp)
+        hit[:, 0] = False  # bar fill: urutan high/low terhadap fill tidak diketahui
+        reached.append(_first_true(hit) < first_sl)  # bar yang sama → SL dulu
+    reached = np.array(reached)
+
+    tp_hits = reached.sum(axis=0)
+    sl_hit = first_sl < horizon
+    part = 1.0 / len(RR_LEVELS)
+    r = (reached * np.array(RR_LEVELS)[:, None]).sum(axis=0) * part
+
+    # sisa posisi: SL → -1R, selain itu ditutup di close akhir horizon (timeout)
+    last_idx = np.minimum(fill_idx + horizon - 1, n - 1)
+    mtm = side * (closes[last_idx] - levels["entry"]) / levels["risk"]
+    r += (len(RR_LEVELS) - tp_hits) * part * np.where(sl_hit, -1.0, mtm)
+
+    return {
+        "filled": filled,
+        "tp_hits": np.where(filled, tp_hits, 0),
+        "sl_hit": filled & sl_hit,
+        "r": np.where(filled, r, 0.0),
+    }
+
+
+# ---------- per symbol ----------
+
+def backtest_symbol(
+    data_dir: str,
+    symbol: str,
+    horizon: int,
+    min_tier: str,
+    cooldown_seconds: int,
+) -> Optional[Dict[str, np.ndarray]]:
+    """Backtest satu symbol. Return array per sinyal terkirim (+ "days" history) atau None."""
+    bars = load_klines(data_dir, symbol, "5m")
+    if bars is None or bars["close"].size < 2:
+        return None
+
+    cand = detect_history(bars)
+    close_ms = bars["open_time"][cand["bar"]] + BAR_5M_MS
+    side = cand["side"].astype(np.int64)
+    levels = build_levels(side, cand["range_low"], cand["range_high"])
+
+    aligned = htf_alignment(
+        side,
+        close_ms,
+        load_klines(data_dir, symbol, "1h"),
+        load_klines(data_dir, symbol, "15m"),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rr_ok = np.abs(levels["tp2"] - levels["entry"]) / levels["risk"] >= range_settings.min_rr_tp2
+
+    scores = score_signals(rr_ok, levels["sl_pct"], aligned)
+    orders = tier_orders(scores)
+    tiers = TIER_NAMES[orders]
+
+    send = orders >= TIER_ORDER[min_tier]
+    keep = _apply_cooldown(close_ms, send, cooldown_seconds * 1000)
+
+    levels = {k: v[keep] for k, v in levels.items()}
+    result = simulate_trades(bars, cand["bar"][keep], side[keep], levels, horizon)
+    result.update({
+        "symbol": np.full(int(keep.sum()), symbol, dtype=object),
+        "close_ms": close_ms[keep],
+        "side": side[keep],
+        "tier": tiers[keep],
+        "score": scores[keep],
+        "sl_pct": levels["sl_pct"],
+        "entry": levels["entry"],
+        "sl": levels["sl"],
+    })
+    span = bars["open_time"][-1] + BAR_5M_MS - bars["open_time"][0]
+    result["days"] = np.array([span / DAY_MS])
+    result["span"] = np.array([bars["open_time"][0], bars["open_time"][-1] + BAR_5M_MS])
+    return result
+
+
+def _run_symbol(args: Tuple) -> Tuple[str, Optional[Dict[str, np.ndarray]], float]:
+    data_dir, symbol, horizon, min_tier, cooldown_seconds, overrides = args
+    apply_settings(overrides)  # worker proses (spawn) tidak mewarisi override
+    t0 = time.time()
+    res = backtest_symbol(data_dir, symbol, horizon, min_tier, cooldown_seconds)
+    return symbol, res, time.time() - t0
+
+
+def run_backtest(
+    data_dir: str,
+    symbols: List[str],
+    horizon: int,
+    min_tier: str,
+    cooldown_seconds: int,
+    overrides: Dict[str, str],
+    workers: int = 1,
+) -> Dict[str, np.ndarray]:
+    """Backtest banyak symbol (paralel per symbol kalau workers > 1), gabung hasilnya."""
+    apply_settings(overrides)
+    jobs = [(data_dir, s, horizon, min_tier, cooldown_seconds, overrides) for s in symbols]
+
+    results: List[Dict[str, np.ndarray]] = []
+
+    def collect(i: int, item: Tuple) -> None:
+        symbol, res, took = item
+        if res is None:
+            print(f"[{i}/{len(jobs)}] {symbol}: data 5m tidak ada / kosong, dilewati.")
+            return
+        print(f"[{i}/{len(jobs)}] {symbol}: {res['tier'].size} sinyal, {res['days'][0]:.0f} hari ({took:.2f}s)")
+        results.append(res)
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, item in enumerate(pool.map(_run_symbol, jobs), start=1):
+                collect(i, item)
+    else:
+        for i, job in enumerate(jobs, start=1):
+            collect(i, _run_symbol(job))
+
+    if not results:
+        return {}
+    merged = {k: np.concatenate([r[k] for r in results]) for k in results[0] if k != "span"}
+    spans = np.array([r["span"] for r in results])
+    merged["span_days"] = np.array([(spans[:, 1].max() - spans[:, 0].min()) / DAY_MS])
+    return merged
+
+
+# ---------- laporan ----------
+
+def summarize(trades: Dict[str, np.ndarray], min_tier: str) -> List[Dict[str, object]]:
+    """Statistik per tier (>= min_tier) + total: frekuensi, fill, win rate, expectancy."""
+    span_days = float(trades["span_days"][0]) or 1.0
+    symbol_days = float(trades["days"].sum()) or 1.0
+    tiers = [t for t, o in sorted(TIER_ORDER.items(), key=lambda x: -x[1]) if o >= TIER_ORDER[min_tier]]
+
+    rows = []
+    for label in tiers + ["SEMUA"]:
+        mask = np.ones(trades["tier"].size, dtype=bool) if label == "SEMUA" else trades["tier"] == label
+        count = int(mask.sum())
+        filled = trades["filled"] & mask
+        n_filled = int(filled.sum())
+        hits = trades["tp_hits"][filled]
+        r = trades["r"][filled]
+        rows.append({
+            "tier": label,
+            "signals": count,
+            "per_day": count / span_days,
+            "per_symbol_day": count / symbol_days,
+            "filled": n_filled,
+            "fill_rate": n_filled / count if count else 0.0,
+            "win_rate": float((hits >= 1).mean()) if n_filled else 0.0,
+            "tp2_rate": float((hits >= 2).mean()) if n_filled else 0.0,
+            "tp3_rate": float((hits >= 3).mean()) if n_filled else 0.0,
+            "sl_rate": float(trades["sl_hit"][filled].mean()) if n_filled else 0.0,
+            "expectancy": float(r.mean()) if n_filled else 0.0,
+            "total_r": float(r.sum()),
+        })
+    return rows
+
+
+def format_report(rows: List[Dict[str, object]], symbols: int, span_days: float) -> str:
+    lines = [
+        f"Backtest RANGE — {symbols} symbol, {span_days:.0f} hari",
+        f"Setting: lookback={range_settings.range_lookback}, "
+        f"min_candles={range_settings.min_range_candles}, "
+        f"max_height={range_settings.max_range_height_pct}%, "
+        f"htf_filter={range_settings.use_htf_filter}, "
+        f"entry_age={range_settings.max_entry_age_candles}",
+        "",
+        f"{'Tier':<6}{'Sinyal':>8}{'/hari':>8}{'/sym/hr':>9}{'Fill':>7}"
+        f"{'Win':>7}{'TP2':>7}{'TP3':>7}{'SL':>7}{'Exp(R)':>8}{'Total R':>9}",
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['tier']:<6}{row['signals']:>8}{row['per_day']:>8.2f}{row['per_symbol_day']:>9.3f}"
+            f"{row['fill_rate']:>7.0%}{row['win_rate']:>7.0%}{row['tp2_rate']:>7.0%}"
+            f"{row['tp3_rate']:>7.0%}{row['sl_rate']:>7.0%}{row['expectancy']:>8.3f}{row['total_r']:>9.1f}"
+        )
+    lines += [
+        "",
+        "Win = TP1 kena sebelum SL (dari sinyal yang ter-fill). Exp(R) = rata-rata hasil per trade",
+        "dalam R (1/3 posisi ditutup di tiap TP, sisa -1R saat SL), tanpa fee/slippage.",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+# range/range_batch.py
+# Deteksi RANGE lintas symbol dalam satu pass NumPy (per bar close 5m):
+# matrix (symbols × lookback) → range height, rasio stdev, breakout sekaligus.
+# Logika sama persis dengan _detect_range_zone + _detect_breakout (per symbol).
+# Jalur utama memakai statistik incremental (range/rolling_stats.py); jalur matrix
+# dipakai untuk symbol tanpa state incremental & mode verifikasi.
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.range_settings import range_settings
+from range.range_detector import detect_range_setup
+
+
+def _apply_range_rules(
+    range_low: np.ndarray,
+    range_high: np.ndarray,
+    stdev: np.ndarray,
+    last: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Aturan squeeze + breakout (vectorized) dari statistik range per symbol."""
+    height = range_high - range_low
+    valid = range_high > range_low
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        height_pct = np.where(last != 0, np.abs(height / last) * 100.0, 0.0)
+        valid &= height_pct > 0
+        valid &= height_pct <= range_settings.max_range_height_pct
+
+        valid &= stdev > 0
+        valid &= ~(stdev / height > 0.6)
+
+    # breakout (buffer kecil supaya tidak ke-trigger wick kecil)
+    eps = range_high * 0.0005
+    valid &= last > 0
+    side = np.zeros(len(last), dtype=np.int8)
+    side[valid & (last > range_high + eps)] = 1
+    side[valid & (last < range_low - eps)] = -1
+
+    return {
+        "side": side,
+        "range_low": range_low,
+        "range_high": range_high,
+        "height_pct": height_pct,
+        "last_price": last,
+    }
+
+
+def detect_ranges_batch(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    closes: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    Input matrix (S, N+1): N candle range + 1 candle terakhir (kandidat breakout).
+    Return array per symbol:
+    - "side"       : +1 long, -1 short, 0 tidak ada sinyal
+    - "range_low", "range_high", "height_pct", "last_price"
+    """
+    return _apply_range_rules(
+        lows[:, :-1].min(axis=1),
+        highs[:, :-1].max(axis=1),
+        closes[:, :-1].std(axis=1),
+        closes[:, -1],
+    )
+
+
+def _collect_candidates(symbols: List[str], res: Dict[str, np.ndarray], out: Dict[str, Dict]) -> None:
+    for i in np.flatnonzero(res["side"]):
+        out[symbols[i]] = {
+            "side": "long" if res["side"][i] > 0 else "short",
+            "range_low": float(res["range_low"][i]),
+            "range_high": float(res["range_high"][i]),
+            "height_pct": float(res["height_pct"][i]),
+            "last_price": float(res["last_price"][i]),
+        }
+
+
+def find_range_candidates_from_stats(snapshots: Dict[str, Tuple]) -> Dict[str, Dict]:
+    """
+    Deteksi kandidat dari statistik incremental (RollingRangeState.snapshot()):
+    tanpa scan window sama sekali, cukup aturan vectorized di atas array 1-D.
+    """
+    min_n = range_settings.min_range_candles
+    syms: List[str] = []
+    rows: List[Tuple] = []
+    for sym, snap in snapshots.items():
+        total, size = snap[0], snap[1]
+        if total >= min_n + 5 and size >= min_n:
+            syms.append(sym)
+            rows.append(snap[2:])
+
+    candidates: Dict[str, Dict] = {}
+    if not syms:
+        return candidates
+    m = np.array(rows, dtype=np.float64)
+    res = _apply_range_rules(m[:, 0], m[:, 1], m[:, 2], m[:, 3])
+    _collect_candidates(syms, res, candidates)
+    return candidates
+
+
+def find_range_candidates(arrays: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, Dict]:
+    """
+    Deteksi kandidat breakout untuk banyak symbol sekaligus.
+    `arrays` = {SYMBOL: view dari OHLCBufferManager.get_arrays()}.
+
+    Symbol dengan history >= lookback+1 masuk matrix (satu pass NumPy);
+    sisanya (history pendek, jarang) pakai jalur per symbol.
+    Return {SYMBOL: setup} — format setup sama dengan detect_range_setup().
+    """
+    width = range_settings.range_lookback + 1
+    min_len = range_settings.min_range_candles + 5
+
+    batch_syms: List[str] = []
+    short_syms: List[str] = []
+    for sym, arr in arrays.items():
+        n = arr["close"].size
+        if n >= max(width, min_len):
+            batch_syms.append(sym)
+        elif n >= min_len:
+            short_syms.append(sym)
+
+    candidates: Dict[str, Dict] = {}
+
+    if batch_syms:
+        highs = np.stack([arrays[s]["high"][-width:] for s in batch_syms])
+        lows = np.stack([arrays[s]["low"][-width:] for s in batch_syms])
+        closes = np.stack([arrays[s]["close"][-width:] for s in batch_syms])
+        res = detect_ranges_batch(highs, lows, closes)
+        _collect_candidates(batch_syms, res, candidates)
+
+    for sym in short_syms:
+        setup: Optional[Dict] = detect_range_setup(arrays[sym])
+        if setup:
+            candidates[sym] = setup
+
+    return candidates
+
+
+def compare_candidates(a: Dict[str, Dict], b: Dict[str, Dict], rel_tol: float = 1e-9) -> List[str]:
+    """Daftar symbol yang hasil deteksinya beda antara dua jalur (mode verifikasi)."""
+    mismatched: List[str] = []
+    for sym in sorted(set(a) | set(b)):
+        x, y = a.get(sym), b.get(sym)
+        if x is None or y is None or x["side"] != y["side"]:
+            mismatched.append(sym)
+            continue
+        for key in ("range_low", "range_high", "height_pct"):
+            if abs(x[key] - y[key]) > rel_tol * max(abs(x[key]), abs(y[key]), 1e-12):
+                mismatched.append(sym)
+                break
+    return mismatched
@@ -1,26 +1,15 @@
 # range/range_detector.py
 # Deteksi setup RANGE (sideways + breakout) + bangun Entry/SL/TP.
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 
-from binance.ohlc_buffer import Candle
 from core.range_settings import range_settings
 from range.htf_context import get_htf_context
 from range.range_tiers import evaluate_signal_quality
 
 
-def _candles_to_arrays(candles: List[Candle]) -> Dict[str, np.ndarray]:
-    """Convert list candle ke NumPy array untuk analisa cepat."""
-    o = np.array([c["open"] for c in candles], dtype=float)
-    h = np.array([c["high"] for c in candles], dtype=float)
-    l = np.array([c["low"] for c in candles], dtype=float)
-    c_ = np.array([c["close"] for c in candles], dtype=float)
-    v = np.array([c["volume"] for c in candles], dtype=float)
-    return {"open": o, "high": h, "low": l, "close": c_, "volume": v}
-
-
 def _detect_range_zone(
     highs: np.ndarray,
     lows: np.ndarray,
@@ -181,23 +170,17 @@ def recommend_leverage_range(sl_pct: float) -> Tuple[float, float]:
         return 3.0, 5.0
 
 
-def analyze_symbol_range(symbol: str, candles_5m: List[Candle]) -> Optional[Dict]:
+def detect_range_setup(arr: Dict[str, np.ndarray]) -> Optional[Dict]:
     """
-    Analisa RANGE untuk satu symbol pakai data 5m (NumPy):
-    - deteksi sideways recent
-    - cek breakout candle terakhir
-    - bangun Entry/SL/TP
-    - cek RR & SL%
-    - cek konteks HTF (opsional)
-    - skor & tier → hanya kirim jika >= min_tier
+    Tahap deteksi (tanpa HTF / skoring) untuk satu symbol:
+    range squeeze + breakout candle terakhir.
+    Return {"side", "range_low", "range_high", "height_pct", "last_price"} atau None.
     """
-    if len(candles_5m) < range_settings.min_range_candles + 5:
-        return None
-
-    arr = _candles_to_arrays(candles_5m)
     highs = arr["high"]
     lows = arr["low"]
     closes = arr["close"]
+    if closes.size < range_settings.min_range_candles + 5:
+        return None
 
     last_price = float(closes[-1])
 
@@ -211,6 +194,26 @@ def analyze_symbol_range(symbol: str, candles_5m: List[Candle]) -> Optional[Dict
     if not side:
         return None
 
+    return {
+        "side": side,
+        "range_low": range_low,
+        "range_high": range_high,
+        "height_pct": height_pct,
+        "last_price": last_price,
+    }
+
+
+def build_range_signal(symbol: str, setup: Dict) -> Optional[Dict]:
+    """
+    Tahap lanjut untuk kandidat yang lolos deteksi (range_batch / detect_range_setup):
+    level Entry/SL/TP, RR, konteks HTF, skor & tier, pesan Telegram.
+    """
+    side = setup["side"]
+    range_low = setup["range_low"]
+    range_high = setup["range_high"]
+    height_pct = setup["height_pct"]
+    last_price = setup["last_price"]
+
     levels = _build_levels(side, range_low, range_high, last_price)
 
     entry = levels["entry"]
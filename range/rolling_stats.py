@@ -0,0 +1,129 @@
+# range/rolling_stats.py
+# Statistik range incremental per symbol (O(1) per candle close):
+# - rolling high / low via monotonic deque
+# - stdev close via Welford (sliding window)
+# Window = N candle SEBELUM candle terakhir (sama dengan _detect_range_zone);
+# candle terakhir disimpan terpisah, jadi replace candle terakhir tidak menyentuh window.
+
+import math
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+# Hitung ulang mean/M2 dari nol tiap sekian push (batasi drift floating point)
+RESYNC_EVERY = 500
+
+
+class RollingRangeState:
+    __slots__ = (
+        "window", "total", "_seq", "_max_dq", "_min_dq", "_closes",
+        "_mean", "_m2", "_since_resync", "last",
+    )
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self.total = 0  # jumlah candle (window + last) sejak reset
+        self._seq = -1  # index candle terakhir yang masuk window
+        self._max_dq: Deque[Tuple[int, float]] = deque()
+        self._min_dq: Deque[Tuple[int, float]] = deque()
+        self._closes: Deque[float] = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._since_resync = 0
+        # candle terakhir (kandidat breakout): (open_time, high, low, close)
+        self.last: Optional[Tuple[int, float, float, float]] = None
+
+    def push(self, open_time: int, high: float, low: float, close: float) -> None:
+        """Candle close baru, atau replace candle terakhir (open_time sama)."""
+        last = self.last
+        if last is not None and last[0] == open_time:
+            self.last = (open_time, high, low, close)
+            return
+        if last is not None:
+            self._add_to_window(last[1], last[2], last[3])
+        self.last = (open_time, high, low, close)
+        self.total += 1
+
+    def _add_to_window(self, high: float, low: float, close: float) -> None:
+        self._seq += 1
+        seq = self._seq
+
+        while self._max_dq and self._max_dq[-1][1] <= high:
+            self._max_dq.pop()
+        self._max_dq.append((seq, high))
+        while self._min_dq and self._min_dq[-1][1] >= low:
+            self._min_dq.pop()
+        self._min_dq.append((seq, low))
+
+        oldest = seq - self.window
+        while self._max_dq[0][0] <= oldest:
+            self._max_dq.popleft()
+        while self._min_dq[0][0] <= oldest:
+            self._min_dq.popleft()
+
+        # Welford sliding: keluarkan close tertua, masukkan close baru
+        if len(self._closes) == self.window:
+            old = self._closes.popleft()
+            n = len(self._closes)
+            if n == 0:
+                self._mean = 0.0
+                self._m2 = 0.0
+            else:
+                d = old - self._mean
+                self._mean -= d / n
+                self._m2 -= d * (old - self._mean)
+        self._closes.append(close)
+        n = len(self._closes)
+        d = close - self._mean
+        self._mean += d / n
+        self._m2 += d * (close - self._mean)
+
+        self._since_resync += 1
+        if self._since_resync >= RESYNC_EVERY:
+            self._resync()
+
+    def _resync(self) -> None:
+        n = len(self._closes)
+        self._since_resync = 0
+        if n == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        mean = math.fsum(self._closes) / n
+        self._mean = mean
+        self._m2 = math.fsum((x - mean) ** 2 for x in self._closes)
+
+    @property
+    def size(self) -> int:
+        """Jumlah candle di window (tanpa candle terakhir)."""
+        return len(self._closes)
+
+    @property
+    def range_high(self) -> float:
+        return self._max_dq[0][1] if self._max_dq else 0.0
+
+    @property
+    def range_low(self) -> float:
+        return self._min_dq[0][1] if self._min_dq else 0.0
+
+    @property
+    def stdev(self) -> float:
+        n = len(self._closes)
+        if n == 0:
+            return 0.0
+        var = self._m2 / n
+        # noise floating point di sekitar nol dianggap nol (close flat)
+        if var <= (1e-12 * abs(self._mean)) ** 2:
+            return 0.0
+        return math.sqrt(var)
+
+    def snapshot(self) -> Optional[Tuple[int, int, float, float, float, float]]:
+        """
+        (total, size, range_low, range_high, stdev, last_close) atau None kalau belum ada data.
+        Dipakai deteksi batch untuk banyak symbol sekaligus.
+        """
+        if self.last is None:
+            return None
+        return self.total, self.size, self.range_low, self.range_high, self.stdev, self.last[3]
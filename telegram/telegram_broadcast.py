@@ -1,46 +1,208 @@
 # telegram/telegram_broadcast.py
 # broadcast_signal: kirim teks sinyal ke admin + subscribers
+# (atau sekali ke channel VIP / free kalau mode channel aktif).
+# broadcast_bar_signals: sinyal satu bar diranking → top-K satuan + satu digest
+# (VIP: digest lengkap; free: ringkasan symbol/side tanpa level, tidak memakai kuota).
+# (lewat outbox persistent + TelegramSender async: rate limit global/per chat,
+#  prioritas admin → VIP → free, replay setelah restart)
 
 import time
 
-from config import TELEGRAM_ADMIN_ID
-from core.bot_state import state, is_vip, cleanup_expired_vip
-from telegram.telegram_common import send_telegram
+from config import SIGNAL_TOP_K_FREE, SIGNAL_TOP_K_VIP, TELEGRAM_ADMIN_ID
+from core.bar_signals import FreeSignalGate, rank_key, rank_signals
+from core.bot_state import (
+    state,
+    load_daily_counts,
+    record_daily_deliveries,
+    save_free_rank_rows,
+)
+from core.eligibility import FREE_DAILY_LIMIT, eligibility
+from core.signal_filters import signal_filters
+from telegram.telegram_channels import FREE_CHANNEL_ID, VIP_CHANNEL_ID
+from telegram.telegram_common import run_off_loop
+from telegram.telegram_sender import (
+    PRIORITY_ADMIN,
+    PRIORITY_FREE,
+    PRIORITY_VIP,
+    telegram_sender,
+)
 
+# Ambang sinyal free: kuota harian untuk sinyal terbaik (histori di-load run_range_bot)
+free_gate = FreeSignalGate(FREE_DAILY_LIMIT)
+
+
+def _rejected_by_filters(signals: list) -> set:
+    """User ber-filter yang tidak cocok dengan satupun sinyal di pesan ini."""
+    return signal_filters.rejected_all(
+        [(sig["symbol"], sig["side"], sig["tier"], float(sig["sl_pct"])) for sig in signals]
+    )
+
+
+def broadcast_signal(
+    text: str,
+    signal_id: str | None = None,
+    signals: list | None = None,
+    vip: bool = True,
+    free: bool = True,
+    free_quota: bool = True,
+) -> None:
+    """
+    signal_id = idempotency key sinyal (mis. "BTCUSDT:<bar>"); sinyal dengan
+    key sama yang di-broadcast ulang tidak dikirim dobel.
+    signals = hasil build_range_signal yang dibahas pesan ini (1 sinyal, atau banyak
+    untuk digest) → dicocokkan dengan filter per subscriber; None = kirim ke semua.
+    vip / free = tier penerima (admin ikut tier VIP).
+    free_quota=False → pesan free yang tidak memakai kuota harian (semua free menerima).
+    """
+    if signal_id is None:
+        signal_id = f"sinyal:{time.time():.3f}"
 
-def broadcast_signal(text: str) -> None:
     today = time.strftime("%Y-%m-%d")
     if state.daily_date != today:
-        state.daily_date = today
-        state.daily_counts = {}
-        cleanup_expired_vip()
-        print("Reset daily_counts & cleanup VIP untuk hari baru:", today)
+        load_daily_counts(today)  # hari baru → kuota kosong, row hari lama dibuang
+        print("Reset daily_counts untuk hari baru:", today)
+
+    recipients = []
 
     # admin
-    if TELEGRAM_ADMIN_ID:
-        try:
-            send_telegram(text, chat_id=int(TELEGRAM_ADMIN_ID))
-        except Exception as e:
-            print("Gagal kirim ke admin:", e)
-    else:
-        print("⚠️ TELEGRAM_ADMIN_ID belum di-set. Admin tidak menerima sinyal.")
-
-    # user
-    if not state.subscribers:
+    if vip:
+        if TELEGRAM_ADMIN_ID:
+            recipients.append((int(TELEGRAM_ADMIN_ID), PRIORITY_ADMIN))
+        else:
+            print("⚠️ TELEGRAM_ADMIN_ID belum di-set. Admin tidak menerima sinyal.")
+
+    # Mode channel: satu post per tier menggantikan DM per user (fallback DM kalau channel kosong)
+    vip_ids: list = []
+    free_ids: list = []
+    if (vip and VIP_CHANNEL_ID is None) or (free and FREE_CHANNEL_ID is None):
+        # user: langsung dari partisi index (VIP & free yang kuotanya masih ada)
+        vip_ids, free_ids = eligibility.recipients(include_exhausted=not free_quota)
+        if signals:
+            # user yang filternya tidak cocok dibuang sebelum kuota free dipakai
+            rejected = _rejected_by_filters(signals)
+            if rejected:
+                vip_ids = [cid for cid in vip_ids if cid not in rejected]
+                free_ids = [cid for cid in free_ids if cid not in rejected]
+    if VIP_CHANNEL_ID is not None:
+        vip_ids = [VIP_CHANNEL_ID]
+    if FREE_CHANNEL_ID is not None:
+        # kuota harian berlaku untuk channel free secara keseluruhan
+        under_quota = state.daily_counts.get(FREE_CHANNEL_ID, 0) < FREE_DAILY_LIMIT
+        free_ids = [FREE_CHANNEL_ID] if under_quota or not free_quota else []
+    if not vip:
+        vip_ids = []
+    if not free:
+        free_ids = []
+
+    if not vip_ids and not free_ids and not state.subscribers:
         print("Belum ada subscriber. Hanya admin yang menerima sinyal.")
+
+    recipients.extend((cid, PRIORITY_VIP) for cid in vip_ids)
+    recipients.extend((cid, PRIORITY_FREE) for cid in free_ids)
+
+    if not recipients:
         return
 
-    for cid in list(state.subscribers):
-        if TELEGRAM_ADMIN_ID and str(cid) == str(TELEGRAM_ADMIN_ID):
-            continue
+    # Kuota free: satu transaksi untuk semua penerima sinyal ini
+    # (yang kuotanya habis pindah ke partisi exhausted)
+    if free_quota:
+        record_daily_deliveries(free_ids)
 
-        if is_vip(cid):
-            send_telegram(text, chat_id=cid)
-            continue
+    # Tulis ke outbox dulu (durable), worker sender yang mengirim
+    telegram_sender.broadcast(signal_id, text, recipients)
+
+
+def format_digest(bar_close_ms: int, results: list, levels: bool = True) -> str:
+    """levels=False → versi free: symbol/side/tier saja, Entry/SL/TP khusus VIP."""
+    bar = time.strftime("%H:%M", time.localtime(bar_close_ms / 1000))
+    lines = [f"📋 DIGEST RANGE — {len(results)} sinyal lain (bar {bar})"]
+    for r in results:
+        emoji = "🟢" if r["side"] == "long" else "🔴"
+        if levels:
+            lines.append(
+                f"{emoji} {r['symbol']} {r['side'].upper()} "
+                f"Entry `{r['entry']:.6f}` SL `{r['sl']:.6f}` TP2 `{r['tp2']:.6f}` "
+                f"({r['tier']}, {r['score']})"
+            )
+        else:
+            lines.append(f"{emoji} {r['symbol']} {r['side'].upper()} ({r['tier']})")
+    if not levels:
+        lines.append("Entry/SL/TP lengkap khusus VIP ⭐")
+    return "\n".join(lines)
+
+
+def broadcast_late_signals(open_time: int, results: list, bar_ms: int) -> None:
+    """
+    Sinyal dari candle close telat (straggler) untuk bar yang top-K & digest-nya
+    sudah terkirim: hanya satu digest susulan ke VIP, tanpa pesan satuan & tidak
+    masuk histori ambang free (bar tidak dihitung dua kali).
+    """
+    if not results:
+        return
+    ranked = rank_signals(results)
+    bar_id = open_time // bar_ms
+    symbols = ",".join(sorted(r["symbol"] for r in ranked))
+    broadcast_signal(
+        "⏱ Susulan (candle close telat)\n" + format_digest(open_time + bar_ms, ranked),
+        signal_id=f"digest-late:{bar_id}:{symbols}",
+        signals=ranked,
+        free=False,
+    )
+    print(f"[Bar {bar_id}] {len(ranked)} sinyal susulan → digest VIP.")
+
+
+def broadcast_bar_signals(open_time: int, results: list, bar_ms: int) -> None:
+    """
+    Semua sinyal satu bar: ranking (score, tinggi range, SL%) → top-K VIP dikirim
+    satuan, sisanya satu pesan digest. Free hanya dapat top-K free yang lolos ambang
+    sinyal terbaik 24 jam terakhir (FreeSignalGate); digest ke free berupa ringkasan
+    tanpa level & tidak memakai kuota.
+    """
+    if not results:
+        return
+    ranked = rank_signals(results)
+    now = time.time()
+    keys = [rank_key(r) for r in ranked]
+    free_ok = free_gate.observe(keys, SIGNAL_TOP_K_FREE, now)
+    # hanya row bar ini yang ditulis, di thread reply (di-flush saat shutdown)
+    run_off_loop(save_free_rank_rows, [(now, key) for key in keys], free_gate.window)
+    bar_id = open_time // bar_ms
 
-        count = state.daily_counts.get(cid, 0)
-        if count >= 2:
-            continue
+    digest = []
+    free_digest = []
+    for i, r in enumerate(ranked):
+        to_vip = i < SIGNAL_TOP_K_VIP
+        to_free = i < len(free_ok) and free_ok[i]
+        if to_vip or to_free:
+            broadcast_signal(
+                r["message"],
+                signal_id=f"{r['symbol']}:{bar_id}",
+                signals=[r],
+                vip=to_vip,
+                free=to_free,
+            )
+        if not to_vip:
+            digest.append(r)
+        if not to_free:
+            free_digest.append(r)
 
-        send_telegram(text, chat_id=cid)
-        state.daily_counts[cid] = count + 1
+    bar_close = open_time + bar_ms
+    if digest:
+        broadcast_signal(
+            format_digest(bar_close, digest),
+            signal_id=f"digest:{bar_id}",
+            signals=digest,
+            free=False,
+        )
+    if free_digest:
+        broadcast_signal(
+            format_digest(bar_close, free_digest, levels=False),
+            signal_id=f"digest-free:{bar_id}",
+            signals=free_digest,
+            vip=False,
+            free_quota=False,
+        )
+    print(
+        f"[Bar {bar_id}] {len(ranked)} sinyal: {min(len(ranked), SIGNAL_TOP_K_VIP)} satuan VIP, "
+        f"{sum(free_ok)} free, {len(digest)} di digest."
+    )
@@ -0,0 +1,68 @@
+# telegram/telegram_channels.py
+# Mode channel/grup: satu sinyal = satu post per tier (channel VIP, channel free),
+# bukan sendMessage ke tiap subscriber. Akses channel VIP mengikuti status VIP:
+# - /addvip → link invite sekali pakai (kedaluwarsa bersama VIP) dikirim via DM
+# - /removevip & VIP expired → user dikeluarkan dari channel (ban + unban,
+#   supaya bisa join lagi lewat invite baru saat VIP diperpanjang)
+
+import time
+from typing import Optional
+
+from config import TELEGRAM_FREE_CHANNEL_ID, TELEGRAM_TOKEN, TELEGRAM_VIP_CHANNEL_ID
+from core.http_transport import http
+
+
+def _channel_id(value: str) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        print(f"ID channel Telegram tidak valid: {value}")
+        return None
+
+
+VIP_CHANNEL_ID = _channel_id(TELEGRAM_VIP_CHANNEL_ID)
+FREE_CHANNEL_ID = _channel_id(TELEGRAM_FREE_CHANNEL_ID)
+
+
+def _call(method: str, data: dict) -> Optional[dict]:
+    """Call Bot API (blocking). Return field result, None kalau gagal."""
+    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/{method}"
+    try:
+        r = http.post(url, data=data, timeout=10)
+        body = r.json()
+    except Exception as e:
+        print(f"Error {method}:", e)
+        return None
+    if not body.get("ok"):
+        print(f"Gagal {method}:", body.get("description"))
+        return None
+    return body.get("result")
+
+
+def create_vip_invite(user_id: int, expires: float) -> Optional[str]:
+    """Link invite channel VIP untuk satu user (member_limit 1, expired bersama VIP)."""
+    if VIP_CHANNEL_ID is None:
+        return None
+    # user yang pernah dikeluarkan harus di-unban dulu supaya bisa join
+    _call("unbanChatMember", {"chat_id": VIP_CHANNEL_ID, "user_id": user_id, "only_if_banned": "true"})
+    result = _call(
+        "createChatInviteLink",
+        {
+            "chat_id": VIP_CHANNEL_ID,
+            "name": f"VIP {user_id}",
+            "member_limit": 1,
+            "expire_date": int(min(expires, time.time() + 366 * 86400)),
+        },
+    )
+    return result.get("invite_link") if result else None
+
+
+def remove_from_vip_channel(user_id: int) -> bool:
+    """Keluarkan user dari channel VIP (ban lalu unban = kick)."""
+    if VIP_CHANNEL_ID is None:
+        return False
+    if _call("banChatMember", {"chat_id": VIP_CHANNEL_ID, "user_id": user_id}) is None:
+        return False
+    _call("unbanChatMember", {"chat_id": VIP_CHANNEL_ID, "user_id": user_id, "only_if_banned": "true"})
+    print(f"User {user_id} dikeluarkan dari channel VIP.")
+    return True
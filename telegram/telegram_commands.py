@@ -1,23 +1,34 @@
 # telegram/telegram_commands.py
 
 import time
+from typing import Callable, Dict
 
 from config import TELEGRAM_ADMIN_USERNAME
 from core.bot_state import (
     state,
     is_admin,
     is_vip,
+    add_subscriber,
+    remove_subscriber,
+    remove_vip,
     save_bot_state,
-    save_subscribers,
-    save_vip_users,
+    set_filter,
+    set_vip,
 )
-from telegram.telegram_common import send_telegram, hard_restart
+from core.eligibility import FREE_DAILY_LIMIT
+from core.engine_commands import engine_commands
+from core.engine_stats import format_engine_stats
+from core.signal_filters import FILTER_SIDES, FILTER_TIERS, describe_filter, signal_filters
+from telegram.telegram_channels import VIP_CHANNEL_ID, create_vip_invite, remove_from_vip_channel
+from telegram.telegram_common import send_telegram, hard_restart, run_off_loop
 from telegram.telegram_keyboards import get_user_reply_keyboard, get_admin_reply_keyboard
 
+CommandHandler = Callable[[list, int], None]
+
 
 def handle_user_start(chat_id: int) -> None:
     pkg = "VIP" if is_vip(chat_id) else "FREE"
-    limit = "Unlimited" if is_vip(chat_id) else "2 sinyal per hari"
+    limit = "Unlimited" if is_vip(chat_id) else f"{FREE_DAILY_LIMIT} sinyal per hari"
     active = "AKTIF" if chat_id in state.subscribers else "Tidak aktif"
 
     send_telegram(
@@ -41,292 +52,440 @@ def handle_admin_start(chat_id: int) -> None:
     )
 
 
-def handle_command(cmd: str, args: list, chat_id: int) -> None:
-    cmd = cmd.lower()
+def _cmd_start(args: list, chat_id: int) -> None:
+    if is_admin(chat_id):
+        handle_admin_start(chat_id)
+    else:
+        handle_user_start(chat_id)
 
-    if cmd == "/start":
-        if is_admin(chat_id):
-            handle_admin_start(chat_id)
-        else:
-            handle_user_start(chat_id)
-        return
 
-    if cmd == "/help":
-        if is_admin(chat_id):
-            send_telegram(
-                "📖 Bantuan admin tersedia lewat tombol *❓ Help Admin* pada menu bawah.",
-                chat_id,
-                reply_markup=get_admin_reply_keyboard(),
-            )
-        else:
-            send_telegram(
-                "📖 Bantuan user tersedia lewat tombol *❓ Bantuan* pada menu bawah.",
-                chat_id,
-                reply_markup=get_user_reply_keyboard(),
-            )
-        return
+def _cmd_help(args: list, chat_id: int) -> None:
+    if is_admin(chat_id):
+        send_telegram(
+            "📖 Bantuan admin tersedia lewat tombol *❓ Help Admin* pada menu bawah.",
+            chat_id,
+            reply_markup=get_admin_reply_keyboard(),
+        )
+    else:
+        send_telegram(
+            "📖 Bantuan user tersedia lewat tombol *❓ Bantuan* pada menu bawah.",
+            chat_id,
+            reply_markup=get_user_reply_keyboard(),
+        )
 
-    # USER
-    if not is_admin(chat_id):
-        if cmd == "/activate":
-            if chat_id in state.subscribers:
-                send_telegram("ℹ️ Pencarian sinyal sudah *AKTIF*.", chat_id)
-            else:
-                state.subscribers.add(chat_id)
-                save_subscribers()
-                send_telegram("🔔 Pencarian sinyal *diaktifkan!*", chat_id)
-            return
 
-        if cmd == "/deactivate":
-            if chat_id in state.subscribers:
-                state.subscribers.remove(chat_id)
-                save_subscribers()
-                send_telegram("🔕 Pencarian sinyal *dinonaktifkan.*", chat_id)
-            else:
-                send_telegram("ℹ️ Pencarian sinyal sudah *tidak aktif*.", chat_id)
-            return
+def _user_activate(args: list, chat_id: int) -> None:
+    if add_subscriber(chat_id):
+        send_telegram("🔔 Pencarian sinyal *diaktifkan!*", chat_id)
+    else:
+        send_telegram("ℹ️ Pencarian sinyal sudah *AKTIF*.", chat_id)
 
-        if cmd == "/mystatus":
-            now = time.time()
-            exp = state.vip_users.get(chat_id)
-            if exp and exp > now:
-                days_left = int((exp - now) / 86400)
-                pkg = f"VIP (sisa ~{days_left} hari)"
-                limit = "Unlimited"
-            else:
-                pkg = "FREE"
-                limit = "2 sinyal per hari"
-
-            active = "AKTIF ✅" if chat_id in state.subscribers else "TIDAK AKTIF ❌"
-            send_telegram(
-                "📊 *STATUS KAMU*\n\n"
-                f"Paket  : *{pkg}*\n"
-                f"Limit  : *{limit}*\n"
-                f"Sinyal : *{active}*\n"
-                f"User ID: `{chat_id}`",
-                chat_id,
-            )
-            return
 
-        send_telegram("Perintah tidak dikenali. Gunakan menu bawah atau /start.", chat_id)
-        return
+def _user_deactivate(args: list, chat_id: int) -> None:
+    if remove_subscriber(chat_id):
+        send_telegram("🔕 Pencarian sinyal *dinonaktifkan.*", chat_id)
+    else:
+        send_telegram("ℹ️ Pencarian sinyal sudah *tidak aktif*.", chat_id)
 
-    # ADMIN
-    if cmd == "/startscan":
-        if state.scanning:
-            send_telegram("ℹ️ Scan sudah *AKTIF*.", chat_id)
-        else:
-            state.scanning = True
-            save_bot_state()
-            send_telegram("▶️ Scan market *dimulai*.", chat_id)
-        return
 
-    if cmd == "/pausescan":
-        if not state.scanning:
-            send_telegram("ℹ️ Scan sudah *PAUSE*.", chat_id)
-        else:
-            state.scanning = False
-            save_bot_state()
-            send_telegram("⏸️ Scan market *dijeda* (sementara).", chat_id)
-        return
+def _user_mystatus(args: list, chat_id: int) -> None:
+    now = time.time()
+    exp = state.vip_users.get(chat_id)
+    if exp and exp > now:
+        days_left = int((exp - now) / 86400)
+        pkg = f"VIP (sisa ~{days_left} hari)"
+        limit = "Unlimited"
+    else:
+        pkg = "FREE"
+        limit = f"{FREE_DAILY_LIMIT} sinyal per hari"
 
-    if cmd == "/stopscan":
-        if not state.scanning and not state.last_signal_time:
-            send_telegram("ℹ️ Scan sudah *NON-AKTIF* total.", chat_id)
-        else:
-            state.scanning = False
-            state.last_signal_time.clear()
-            save_bot_state()
-            send_telegram(
-                "⛔ Scan market *dihentikan total.*\n"
-                "Gunakan /startscan untuk mulai lagi dari awal.",
-                chat_id,
-            )
-        return
+    active = "AKTIF ✅" if chat_id in state.subscribers else "TIDAK AKTIF ❌"
+    send_telegram(
+        "📊 *STATUS KAMU*\n\n"
+        f"Paket  : *{pkg}*\n"
+        f"Limit  : *{limit}*\n"
+        f"Sinyal : *{active}*\n"
+        f"User ID: `{chat_id}`",
+        chat_id,
+    )
 
-    if cmd == "/status":
+
+FILTER_USAGE = (
+    "Atur filter:\n"
+    "`/filter symbol BTC ETH` — hanya pair tertentu\n"
+    "`/filter side long` — long / short\n"
+    "`/filter tier A+ A` — tier yang diterima\n"
+    "`/filter maxsl 1.5` — SL maksimal (%)\n"
+    "`/filter symbol all` — hapus satu jenis filter\n"
+    "`/resetfilter` — terima semua sinyal"
+)
+
+
+# Jenis filter di command → key prefs
+FILTER_KINDS = {
+    "symbol": "symbols",
+    "pair": "symbols",
+    "side": "sides",
+    "tier": "tiers",
+    "maxsl": "max_sl",
+}
+
+
+def _parse_filter(key: str, values: list):
+    """Nilai filter dari argumen command; raise ValueError (pesan untuk user) kalau salah."""
+    if key == "symbols":
+        syms = set()
+        for v in values:
+            sym = v.upper().replace("/", "")
+            if not sym.isalnum():
+                raise ValueError(f"Symbol tidak valid: {v}")
+            syms.add(sym if sym.endswith("USDT") else sym + "USDT")
+        return sorted(syms)
+    if key == "sides":
+        sides = sorted({v.lower() for v in values})
+        if any(v not in FILTER_SIDES for v in sides):
+            raise ValueError("Side harus long / short.")
+        return sides
+    if key == "tiers":
+        tiers = sorted({v.upper() for v in values})
+        if any(v not in FILTER_TIERS for v in tiers):
+            raise ValueError("Tier harus A+ / A / B.")
+        return tiers
+    try:
+        val = float(values[0].rstrip("%"))
+    except ValueError:
+        raise ValueError("Format salah. Contoh: `/filter maxsl 1.5`")
+    if val <= 0:
+        raise ValueError("SL maksimal harus > 0.")
+    return val
+
+
+FILTER_NEEDS_SUBSCRIBE = "ℹ️ Filter hanya untuk subscriber aktif. Aktifkan sinyal dulu dengan /activate."
+
+
+def _user_filter(args: list, chat_id: int) -> None:
+    # filter non-subscriber tidak disimpan (dibuang load_filters saat start)
+    if chat_id not in state.subscribers:
+        send_telegram(FILTER_NEEDS_SUBSCRIBE, chat_id)
+        return
+    prefs = signal_filters.get(chat_id)
+    key = FILTER_KINDS.get(args[0].lower()) if args else None
+    if key is None or len(args) < 2:
         send_telegram(
-            "📊 *STATUS BOT IMB*\n\n"
-            f"Scan       : {'AKTIF' if state.scanning else 'STANDBY'}\n"
-            f"Min Tier   : {state.min_tier}\n"
-            f"Cooldown   : {state.cooldown_seconds} detik\n"
-            f"Min Volume : {state.min_volume_usdt:,.0f} USDT\n"
-            f"Max Pairs  : {state.max_pairs} pair\n"
-            f"Subscribers: {len(state.subscribers)} user\n"
-            f"VIP Users  : {len(state.vip_users)} user\n",
+            "🎯 *FILTER SINYAL KAMU*\n\n"
+            f"{describe_filter(prefs)}\n\n"
+            f"{FILTER_USAGE}",
             chat_id,
         )
         return
-
-    if cmd == "/mode":
-        if not args:
-            send_telegram(
-                "Mode sekarang:\n"
-                f"- Min Tier: {state.min_tier}\n"
-                "Gunakan: /mode aplus | a | b",
-                chat_id,
-            )
-            return
-        mode = args[0].lower()
-        if mode == "aplus":
-            state.min_tier = "A+"
-        elif mode == "a":
-            state.min_tier = "A"
-        elif mode == "b":
-            state.min_tier = "B"
-        else:
-            send_telegram("Mode tidak dikenali. Gunakan: aplus | a | b", chat_id)
+    values = args[1:]
+    if [v.lower() for v in values] == ["all"]:
+        prefs.pop(key, None)
+    else:
+        try:
+            prefs[key] = _parse_filter(key, values)
+        except ValueError as e:
+            send_telegram(f"{e}\n\n{FILTER_USAGE}", chat_id)
             return
-        save_bot_state()
-        send_telegram(f"⚙️ Mode tier di-set ke: *{state.min_tier}*.", chat_id)
-        return
+    set_filter(chat_id, prefs)
+    send_telegram("🎯 Filter disimpan.\n\n" + describe_filter(prefs), chat_id)
 
-    if cmd == "/cooldown":
-        if not args:
-            send_telegram(
-                f"Cooldown sekarang: {state.cooldown_seconds} detik.\n"
-                "Contoh: /cooldown 300  (5 menit)",
-                chat_id,
-            )
-            return
-        try:
-            cd = int(args[0])
-            if cd < 0:
-                raise ValueError
-            state.cooldown_seconds = cd
-            save_bot_state()
-            send_telegram(f"⏲️ Cooldown di-set ke {cd} detik.", chat_id)
-        except ValueError:
-            send_telegram("Format salah. Gunakan: /cooldown 300", chat_id)
-        return
 
-    if cmd == "/minvol":
-        if not args:
-            send_telegram(
-                "📈 *SET MINIMUM VOLUME USDT*\n\n"
-                f"Sekarang: `{state.min_volume_usdt:,.0f}` USDT\n\n"
-                "Contoh:\n"
-                "`/minvol 50000000`  (50 juta USDT)\n"
-                "`/minvol 100000000` (100 juta USDT)",
-                chat_id,
-            )
-            return
-        try:
-            val = float(args[0])
-            if val < 0:
-                raise ValueError
-            state.min_volume_usdt = val
-            state.force_pairs_refresh = True
-            save_bot_state()
-            send_telegram(
-                f"📈 Min volume di-set ke `{val:,.0f}` USDT.\n"
-                "Daftar pair akan di-refresh pada scan berikutnya.",
-                chat_id,
-            )
-        except ValueError:
-            send_telegram("Format salah. Contoh: `/minvol 100000000`", chat_id)
+def _user_resetfilter(args: list, chat_id: int) -> None:
+    if chat_id not in state.subscribers:
+        send_telegram(FILTER_NEEDS_SUBSCRIBE, chat_id)
         return
+    set_filter(chat_id, {})
+    send_telegram("🎯 Filter dihapus. Kamu menerima semua sinyal.", chat_id)
 
-    if cmd == "/maxpairs":
-        if not args:
-            send_telegram(
-                "📌 *SET MAXIMUM PAIR YANG DI-SCAN*\n\n"
-                f"Sekarang: `{state.max_pairs}` pair\n\n"
-                "Contoh:\n"
-                "`/maxpairs 20`\n"
-                "`/maxpairs 40`",
-                chat_id,
-            )
-            return
-        try:
-            val = int(args[0])
-            if val < 1:
-                raise ValueError
-            state.max_pairs = val
-            state.force_pairs_refresh = True
-            save_bot_state()
-            send_telegram(
-                f"📌 Max pairs di-set ke *{val}*.\n"
-                "Daftar pair akan di-refresh pada scan berikutnya.",
-                chat_id,
-            )
-        except ValueError:
-            send_telegram("Format salah. Contoh: `/maxpairs 30`", chat_id)
+
+def _admin_startscan(args: list, chat_id: int) -> None:
+    if state.scanning:
+        send_telegram("ℹ️ Scan sudah *AKTIF*.", chat_id)
+    else:
+        state.scanning = True
+        save_bot_state("scanning")
+        send_telegram("▶️ Scan market *dimulai*.", chat_id)
+
+
+def _admin_pausescan(args: list, chat_id: int) -> None:
+    if not state.scanning:
+        send_telegram("ℹ️ Scan sudah *PAUSE*.", chat_id)
+    else:
+        state.scanning = False
+        save_bot_state("scanning")
+        send_telegram("⏸️ Scan market *dijeda* (sementara).", chat_id)
+
+
+def _admin_stopscan(args: list, chat_id: int) -> None:
+    if not state.scanning and not state.last_signal_time:
+        send_telegram("ℹ️ Scan sudah *NON-AKTIF* total.", chat_id)
+    else:
+        state.scanning = False
+        state.last_signal_time.clear()
+        save_bot_state("scanning")
+        send_telegram(
+            "⛔ Scan market *dihentikan total.*\n"
+            "Gunakan /startscan untuk mulai lagi dari awal.",
+            chat_id,
+        )
+
+
+def _admin_status(args: list, chat_id: int) -> None:
+    engine_text = format_engine_stats()
+    send_telegram(
+        "📊 *STATUS BOT IMB*\n\n"
+        f"Scan       : {'AKTIF' if state.scanning else 'STANDBY'}\n"
+        f"Min Tier   : {state.min_tier}\n"
+        f"Cooldown   : {state.cooldown_seconds} detik\n"
+        f"Min Volume : {state.min_volume_usdt:,.0f} USDT\n"
+        f"Max Pairs  : {state.max_pairs} pair\n"
+        f"Subscribers: {len(state.subscribers)} user\n"
+        f"VIP Users  : {len(state.vip_users)} user\n"
+        + (f"\n{engine_text}\n" if engine_text else ""),
+        chat_id,
+    )
+
+
+def _admin_mode(args: list, chat_id: int) -> None:
+    if not args:
+        send_telegram(
+            "Mode sekarang:\n"
+            f"- Min Tier: {state.min_tier}\n"
+            "Gunakan: /mode aplus | a | b",
+            chat_id,
+        )
         return
+    mode = args[0].lower()
+    if mode == "aplus":
+        state.min_tier = "A+"
+    elif mode == "a":
+        state.min_tier = "A"
+    elif mode == "b":
+        state.min_tier = "B"
+    else:
+        send_telegram("Mode tidak dikenali. Gunakan: aplus | a | b", chat_id)
+        return
+    save_bot_state("min_tier")
+    send_telegram(f"⚙️ Mode tier di-set ke: *{state.min_tier}*.", chat_id)
 
-    if cmd == "/addvip":
-        if not args:
-            send_telegram("Gunakan: /addvip <user_id> [hari]", chat_id)
-            return
-        try:
-            target_id = int(args[0])
-            days = int(args[1]) if len(args) > 1 else 30
-        except ValueError:
-            send_telegram("Format salah. Contoh: /addvip 123456789 30", chat_id)
-            return
-        now = time.time()
-        new_exp = now + days * 86400
-        state.vip_users[target_id] = new_exp
-        save_vip_users()
-        send_telegram(f"⭐ VIP aktif untuk `{target_id}` selama {days} hari.", chat_id)
+
+def _admin_cooldown(args: list, chat_id: int) -> None:
+    if not args:
         send_telegram(
-            f"🎉 VIP kamu diaktifkan selama {days} hari.\n"
-            "Sinyal kamu sekarang *unlimited* per hari.",
-            target_id,
+            f"Cooldown sekarang: {state.cooldown_seconds} detik.\n"
+            "Contoh: /cooldown 300  (5 menit)",
+            chat_id,
         )
         return
+    try:
+        cd = int(args[0])
+        if cd < 0:
+            raise ValueError
+        state.cooldown_seconds = cd
+        save_bot_state("cooldown_seconds")
+        send_telegram(f"⏲️ Cooldown di-set ke {cd} detik.", chat_id)
+    except ValueError:
+        send_telegram("Format salah. Gunakan: /cooldown 300", chat_id)
+
+
+def _admin_minvol(args: list, chat_id: int) -> None:
+    if not args:
+        send_telegram(
+            "📈 *SET MINIMUM VOLUME USDT*\n\n"
+            f"Sekarang: `{state.min_volume_usdt:,.0f}` USDT\n\n"
+            "Contoh:\n"
+            "`/minvol 50000000`  (50 juta USDT)\n"
+            "`/minvol 100000000` (100 juta USDT)",
+            chat_id,
+        )
+        return
+    try:
+        val = float(args[0])
+        if val < 0:
+            raise ValueError
+        state.min_volume_usdt = val
+        state.force_pairs_refresh = True
+        engine_commands.interrupt()
+        save_bot_state("min_volume_usdt")
+        send_telegram(
+            f"📈 Min volume di-set ke `{val:,.0f}` USDT.\n"
+            "Daftar pair akan di-refresh pada scan berikutnya.",
+            chat_id,
+        )
+    except ValueError:
+        send_telegram("Format salah. Contoh: `/minvol 100000000`", chat_id)
 
-    if cmd == "/removevip":
-        if not args:
-            send_telegram("Gunakan: /removevip <user_id>", chat_id)
-            return
-        try:
-            target_id = int(args[0])
-        except ValueError:
-            send_telegram("Format salah. Contoh: `/removevip 123456789`", chat_id)
-            return
-        if target_id in state.vip_users:
-            del state.vip_users[target_id]
-            save_vip_users()
-            send_telegram(f"VIP user `{target_id}` dihapus.", chat_id)
-            send_telegram("VIP kamu telah dinonaktifkan. Kembali ke paket FREE.", target_id)
-        else:
-            send_telegram("User tersebut tidak terdaftar sebagai VIP.", chat_id)
+
+def _admin_maxpairs(args: list, chat_id: int) -> None:
+    if not args:
+        send_telegram(
+            "📌 *SET MAXIMUM PAIR YANG DI-SCAN*\n\n"
+            f"Sekarang: `{state.max_pairs}` pair\n\n"
+            "Contoh:\n"
+            "`/maxpairs 20`\n"
+            "`/maxpairs 40`",
+            chat_id,
+        )
         return
+    try:
+        val = int(args[0])
+        if val < 1:
+            raise ValueError
+        state.max_pairs = val
+        state.force_pairs_refresh = True
+        engine_commands.interrupt()
+        save_bot_state("max_pairs")
+        send_telegram(
+            f"📌 Max pairs di-set ke *{val}*.\n"
+            "Daftar pair akan di-refresh pada scan berikutnya.",
+            chat_id,
+        )
+    except ValueError:
+        send_telegram("Format salah. Contoh: `/maxpairs 30`", chat_id)
 
-    if cmd == "/debug":
-        if not args:
-            send_telegram(f"Debug: {'ON' if state.debug else 'OFF'}", chat_id)
-            return
-        val = args[0].lower()
-        if val == "on":
-            state.debug = True
-            send_telegram("Debug *ON*.", chat_id)
-        elif val == "off":
-            state.debug = False
-            send_telegram("Debug *OFF*.", chat_id)
-        else:
-            send_telegram("Gunakan: /debug on | off", chat_id)
+
+def _admin_addvip(args: list, chat_id: int) -> None:
+    if not args:
+        send_telegram("Gunakan: /addvip <user_id> [hari]", chat_id)
+        return
+    try:
+        target_id = int(args[0])
+        days = int(args[1]) if len(args) > 1 else 30
+    except ValueError:
+        send_telegram("Format salah. Contoh: /addvip 123456789 30", chat_id)
         return
+    now = time.time()
+    new_exp = now + days * 86400
+    set_vip(target_id, new_exp)
+    send_telegram(f"⭐ VIP aktif untuk `{target_id}` selama {days} hari.", chat_id)
+    # invite link (mode channel) dibuat lewat Bot API → jalan di thread reply
+    run_off_loop(_notify_vip_activated, target_id, days, new_exp)
+
+
+def _notify_vip_activated(target_id: int, days: int, expires: float) -> None:
+    text = (
+        f"🎉 VIP kamu diaktifkan selama {days} hari.\n"
+        "Sinyal kamu sekarang *unlimited* per hari."
+    )
+    if VIP_CHANNEL_ID is not None:
+        link = create_vip_invite(target_id, expires)
+        if link:
+            text += f"\n\nSinyal VIP dikirim di channel VIP, join lewat link ini:\n{link}"
+        else:
+            text += "\n\nLink channel VIP gagal dibuat, sinyal tetap dikirim via chat ini."
+    send_telegram(text, target_id)
 
-    if cmd == "/softrestart":
-        state.request_soft_restart = True
-        state.force_pairs_refresh = True
-        state.last_signal_time.clear()
-        send_telegram("♻ Soft restart diminta. Bot akan refresh koneksi & engine.", chat_id)
+
+def _admin_removevip(args: list, chat_id: int) -> None:
+    if not args:
+        send_telegram("Gunakan: /removevip <user_id>", chat_id)
         return
+    try:
+        target_id = int(args[0])
+    except ValueError:
+        send_telegram("Format salah. Contoh: `/removevip 123456789`", chat_id)
+        return
+    if remove_vip(target_id):
+        send_telegram(f"VIP user `{target_id}` dihapus.", chat_id)
+        send_telegram("VIP kamu telah dinonaktifkan. Kembali ke paket FREE.", target_id)
+        if VIP_CHANNEL_ID is not None:
+            run_off_loop(remove_from_vip_channel, target_id)
+    else:
+        send_telegram("User tersebut tidak terdaftar sebagai VIP.", chat_id)
+
+
+def _admin_debug(args: list, chat_id: int) -> None:
+    if not args:
+        send_telegram(f"Debug: {'ON' if state.debug else 'OFF'}", chat_id)
+        return
+    val = args[0].lower()
+    if val == "on":
+        state.debug = True
+        send_telegram("Debug *ON*.", chat_id)
+    elif val == "off":
+        state.debug = False
+        send_telegram("Debug *OFF*.", chat_id)
+    else:
+        send_telegram("Gunakan: /debug on | off", chat_id)
+
+
+def _request_soft_restart() -> None:
+    state.request_soft_restart = True
+    state.force_pairs_refresh = True
+    state.last_signal_time.clear()
+    engine_commands.interrupt()  # receive loop langsung bangun, tidak nunggu frame WS
+
+
+def _admin_softrestart(args: list, chat_id: int) -> None:
+    _request_soft_restart()
+    send_telegram("♻ Soft restart diminta. Bot akan refresh koneksi & engine.", chat_id)
+
+
+def _admin_hardrestart(args: list, chat_id: int) -> None:
+    send_telegram("🔄 Hard restart dimulai. Bot akan hidup kembali sebentar lagi...", chat_id)
+    hard_restart()
+
+
+def _admin_stopbot(args: list, chat_id: int) -> None:
+    state.running = False
+    engine_commands.interrupt()
+    send_telegram("⛔ Bot akan berhenti. Jalankan ulang main.py untuk start lagi.", chat_id)
+
+
+# Router command: dict lookup (tanpa rantai if/elif)
+COMMON_COMMANDS: Dict[str, CommandHandler] = {
+    "/start": _cmd_start,
+    "/help": _cmd_help,
+}
+
+USER_COMMANDS: Dict[str, CommandHandler] = {
+    "/activate": _user_activate,
+    "/deactivate": _user_deactivate,
+    "/mystatus": _user_mystatus,
+    "/filter": _user_filter,
+    "/resetfilter": _user_resetfilter,
+}
+
+ADMIN_COMMANDS: Dict[str, CommandHandler] = {
+    "/startscan": _admin_startscan,
+    "/pausescan": _admin_pausescan,
+    "/stopscan": _admin_stopscan,
+    "/status": _admin_status,
+    "/mode": _admin_mode,
+    "/cooldown": _admin_cooldown,
+    "/minvol": _admin_minvol,
+    "/maxpairs": _admin_maxpairs,
+    "/addvip": _admin_addvip,
+    "/removevip": _admin_removevip,
+    "/debug": _admin_debug,
+    "/softrestart": _admin_softrestart,
+    "/hardrestart": _admin_hardrestart,
+    "/stopbot": _admin_stopbot,
+}
+
 
-    if cmd == "/hardrestart":
-        send_telegram("🔄 Hard restart dimulai. Bot akan hidup kembali sebentar lagi...", chat_id)
-        hard_restart()
+def handle_command(cmd: str, args: list, chat_id: int) -> None:
+    cmd = cmd.lower()
+
+    handler = COMMON_COMMANDS.get(cmd)
+    if handler is not None:
+        handler(args, chat_id)
         return
 
-    if cmd == "/stopbot":
-        state.running = False
-        send_telegram("⛔ Bot akan berhenti. Jalankan ulang main.py untuk start lagi.", chat_id)
+    if not is_admin(chat_id):
+        handler = USER_COMMANDS.get(cmd)
+        if handler is None:
+            send_telegram("Perintah tidak dikenali. Gunakan menu bawah atau /start.", chat_id)
+            return
+        handler(args, chat_id)
         return
 
-    send_telegram("Perintah admin tidak dikenali.", chat_id)
+    handler = ADMIN_COMMANDS.get(cmd)
+    if handler is None:
+        send_telegram("Perintah admin tidak dikenali.", chat_id)
+        return
+    handler(args, chat_id)
 
 
 def handle_callback(data_cb: str, from_id: int, chat_id_cq: int) -> None:
@@ -341,9 +500,7 @@ def handle_callback(data_cb: str, from_id: int, chat_id_cq: int) -> None:
             return
 
         if data_cb == "admin_soft_restart":
-            state.request_soft_restart = True
-            state.force_pairs_refresh = True
-            state.last_signal_time.clear()
+            _request_soft_restart()
             send_telegram("♻ Soft restart dimulai. Bot akan refresh koneksi & engine.", chat_id_cq)
             return
 
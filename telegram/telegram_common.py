@@ -1,25 +1,46 @@
 # telegram/telegram_common.py
+import asyncio
 import json
 import os
 import sys
-
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
 from config import TELEGRAM_TOKEN, TELEGRAM_ADMIN_ID
 from core.bot_state import state
+from core.engine_commands import engine_commands
+from core.http_transport import http
 
+# Balasan command dikirim dari event loop engine → HTTP-nya dijalankan di satu thread
+# (urutan pesan terjaga, loop tidak ikut blocking)
+_reply_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tg-reply")
 
-def send_telegram(text: str, chat_id: int | None = None, reply_markup: dict | None = None) -> None:
-    if not TELEGRAM_TOKEN:
-        print("Telegram token belum di-set.")
-        return
 
-    if chat_id is None:
-        if not TELEGRAM_ADMIN_ID:
-            print("Tidak ada TELEGRAM_ADMIN_ID.")
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def run_off_loop(fn, *args) -> None:
+    """Jalankan call Telegram blocking: di thread reply kalau dipanggil dari event loop."""
+    if _on_event_loop():
+        try:
+            _reply_executor.submit(fn, *args)
             return
-        chat_id = int(TELEGRAM_ADMIN_ID)
+        except RuntimeError:
+            pass  # executor sudah ditutup (shutdown) → kirim langsung
+    fn(*args)
 
+
+def flush_replies() -> None:
+    """Tunggu semua balasan yang masih antre terkirim (sebelum proses keluar / exec)."""
+    _reply_executor.shutdown(wait=True)
+
+
+def post_message(chat_id: int, text: str, reply_markup: dict | None = None):
+    """POST sendMessage mentah (return Response) — dipakai send_telegram & sender async."""
     url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
     data = {
         "chat_id": chat_id,
@@ -28,9 +49,26 @@ def send_telegram(text: str, chat_id: int | None = None, reply_markup: dict | No
     }
     if reply_markup is not None:
         data["reply_markup"] = json.dumps(reply_markup)
+    return http.post(url, data=data, timeout=10)
+
 
+def send_telegram(text: str, chat_id: int | None = None, reply_markup: dict | None = None) -> None:
+    if not TELEGRAM_TOKEN:
+        print("Telegram token belum di-set.")
+        return
+
+    if chat_id is None:
+        if not TELEGRAM_ADMIN_ID:
+            print("Tidak ada TELEGRAM_ADMIN_ID.")
+            return
+        chat_id = int(TELEGRAM_ADMIN_ID)
+
+    run_off_loop(_send, chat_id, text, reply_markup)
+
+
+def _send(chat_id: int, text: str, reply_markup: dict | None) -> None:
     try:
-        r = requests.post(url, data=data, timeout=10)
+        r = post_message(chat_id, text, reply_markup)
         if not r.ok:
             print("Gagal kirim Telegram:", r.text)
     except Exception as e:
@@ -38,7 +76,18 @@ def send_telegram(text: str, chat_id: int | None = None, reply_markup: dict | No
 
 
 def hard_restart():
+    """
+    Minta hard restart: engine berhenti lewat jalur shutdown normal (drain TelegramSender,
+    flush candle store, balasan command terkirim), lalu main.py exec ulang proses.
+    """
     print("Hard restart dimulai...")
+    state.request_hard_restart = True
     state.running = False
+    engine_commands.interrupt()  # receive loop langsung bangun & keluar
+
+
+def exec_restart():
+    """Ganti proses dengan instance baru (dipanggil main.py setelah shutdown selesai)."""
+    print("Exec ulang proses bot...")
     sys.stdout.flush()
     os.execl(sys.executable, sys.executable, *sys.argv)
@@ -1,234 +1,402 @@
 # telegram/telegram_core.py
-# Polling loop Telegram: getUpdates, dispatch ke command/callback.
+# Loop update Telegram (task asyncio di event loop engine): long polling getUpdates
+# (timeout + allowed_updates) atau webhook. Update masuk ke antrian engine_commands,
+# lalu dispatch_update meneruskan lewat router dict (command / teks tombol) ke handler.
 
-import time
-import requests
+import asyncio
+import json
+import threading
+from functools import partial
+from typing import Callable, Dict
 
-from config import TELEGRAM_TOKEN, TELEGRAM_ADMIN_USERNAME
+from config import (
+    TELEGRAM_ADMIN_USERNAME,
+    TELEGRAM_MODE,
+    TELEGRAM_TOKEN,
+    TELEGRAM_WEBHOOK_HOST,
+    TELEGRAM_WEBHOOK_PORT,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_URL,
+)
 from core.bot_state import state, is_admin
-from telegram.telegram_common import send_telegram
+from core.engine_commands import engine_commands
+from core.http_transport import http
+from telegram.telegram_common import run_off_loop, send_telegram
 from telegram.telegram_commands import handle_command, handle_callback
-from telegram.telegram_keyboards import get_admin_reply_keyboard
+from telegram.telegram_webhook import WebhookServer
 
+# Long polling: server Telegram menahan request sampai ada update (maks detik ini)
+LONG_POLL_TIMEOUT = 50
+# Hanya update yang dipakai bot
+ALLOWED_UPDATES = ["message", "callback_query"]
+# Retry setWebhook saat start (backoff 2s, 4s, ...) sebelum fallback ke long polling
+SET_WEBHOOK_ATTEMPTS = 4
+SET_WEBHOOK_RETRY_DELAY = 2.0
 
-def telegram_command_loop():
-    if not TELEGRAM_TOKEN:
-        print("Tidak ada TELEGRAM_TOKEN, command loop tidak dijalankan.")
+ButtonHandler = Callable[[int], None]
+
+
+def _api_url(method: str) -> str:
+    return f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/{method}"
+
+
+def _as_command(cmd: str) -> ButtonHandler:
+    return lambda chat_id: handle_command(cmd, [], chat_id)
+
+
+def _btn_upgrade_vip(chat_id: int) -> None:
+    send_telegram(
+        "⭐ *UPGRADE KE VIP*\n\n"
+        "Paket VIP memberikan:\n"
+        "• Sinyal *unlimited* setiap hari\n"
+        "• Akses penuh IMB signal\n\n"
+        "Hubungi admin untuk upgrade:\n"
+        f"`{TELEGRAM_ADMIN_USERNAME}`.",
+        chat_id,
+    )
+
+
+def _btn_user_help(chat_id: int) -> None:
+    send_telegram(
+        "📖 *BANTUAN PENGGUNA*\n\n"
+        "🔔 Aktifkan Sinyal — hidupkan sinyal.\n"
+        "🔕 Nonaktifkan Sinyal — matikan sinyal.\n"
+        "📊 Status Saya — lihat paket & limit.\n"
+        "🎯 Filter Sinyal — pilih pair, side, tier & SL maksimal.\n"
+        "⭐ Upgrade VIP — info upgrade.\n",
+        chat_id,
+    )
+
+
+def _btn_mode_tier(chat_id: int) -> None:
+    send_telegram(
+        "⚙️ *Mode Tier*\n\n"
+        "Gunakan command:\n"
+        "`/mode aplus` — hanya Tier A+\n"
+        "`/mode a`     — Tier A & A+\n"
+        "`/mode b`     — Tier B, A, A+",
+        chat_id,
+    )
+
+
+def _btn_cooldown(chat_id: int) -> None:
+    send_telegram(
+        "⏲️ *Cooldown Sinyal*\n\n"
+        "Atur jarak minimal antar sinyal per pair.\n"
+        "Contoh:\n"
+        "`/cooldown 300`  (5 menit)\n"
+        "`/cooldown 900`  (15 menit)\n"
+        "`/cooldown 1800` (30 menit)",
+        chat_id,
+    )
+
+
+def _btn_min_volume(chat_id: int) -> None:
+    send_telegram(
+        "📈 *MINIMUM VOLUME USDT*\n\n"
+        f"Sekarang: `{state.min_volume_usdt:,.0f}` USDT\n\n"
+        "Atur dengan command:\n"
+        "`/minvol 100000000`  (contoh 100 juta USDT)\n",
+        chat_id,
+    )
+
+
+def _btn_max_pair(chat_id: int) -> None:
+    send_telegram(
+        "📌 *MAXIMUM PAIR YANG DI-SCAN*\n\n"
+        f"Sekarang: `{state.max_pairs}` pair\n\n"
+        "Atur dengan command:\n"
+        "`/maxpairs 30`  (scan 30 pair teratas)\n",
+        chat_id,
+    )
+
+
+def _btn_vip_control(chat_id: int) -> None:
+    send_telegram(
+        "⭐ *VIP CONTROL*\n\n"
+        "Gunakan:\n"
+        "`/addvip <user_id> [hari]` — aktifkan VIP\n"
+        "`/removevip <user_id>` — hapus VIP user\n",
+        chat_id,
+    )
+
+
+def _btn_restart(chat_id: int) -> None:
+    send_telegram(
+        "Pilih metode restart:",
+        chat_id,
+        reply_markup={
+            "inline_keyboard": [
+                [
+                    {
+                        "text": "♻ Soft Restart",
+                        "callback_data": "admin_soft_restart",
+                    },
+                    {
+                        "text": "🔄 Hard Restart",
+                        "callback_data": "admin_hard_restart",
+                    },
+                ],
+                [
+                    {
+                        "text": "❌ Batal",
+                        "callback_data": "admin_restart_cancel",
+                    }
+                ],
+            ]
+        },
+    )
+
+
+def _btn_admin_help(chat_id: int) -> None:
+    send_telegram(
+        "📖 *BANTUAN ADMIN*\n\n"
+        "▶️ Start Scan / ⏸️ Pause Scan / ⛔ Stop Scan — kontrol scanning.\n"
+        "📊 Status Bot — lihat status.\n"
+        "⚙️ Mode Tier — atur kualitas sinyal.\n"
+        "⏲️ Cooldown — atur jarak antar sinyal.\n"
+        "📈 Min Volume — filter volume minimum USDT.\n"
+        "📌 Max Pair — atur jumlah pair yang discan.\n"
+        "⭐ VIP Control — kelola VIP.\n"
+        "🔄 Restart Bot — Soft/Hard restart bot.\n",
+        chat_id,
+    )
+
+
+# Router tombol reply keyboard: teks tombol → handler (dict lookup)
+COMMON_BUTTONS: Dict[str, ButtonHandler] = {
+    "🏠 Home": _as_command("/start"),
+    "🔔 Aktifkan Sinyal": _as_command("/activate"),
+    "🔕 Nonaktifkan Sinyal": _as_command("/deactivate"),
+    "📊 Status Saya": _as_command("/mystatus"),
+}
+
+USER_BUTTONS: Dict[str, ButtonHandler] = {
+    "🎯 Filter Sinyal": _as_command("/filter"),
+    "⭐ Upgrade VIP": _btn_upgrade_vip,
+    "❓ Bantuan": _btn_user_help,
+}
+
+ADMIN_BUTTONS: Dict[str, ButtonHandler] = {
+    "▶️ Start Scan": _as_command("/startscan"),
+    "⏸️ Pause Scan": _as_command("/pausescan"),
+    "⛔ Stop Scan": _as_command("/stopscan"),
+    "📊 Status Bot": _as_command("/status"),
+    "⚙️ Mode Tier": _btn_mode_tier,
+    "⏲️ Cooldown": _btn_cooldown,
+    "📈 Min Volume": _btn_min_volume,
+    "📌 Max Pair": _btn_max_pair,
+    "⭐ VIP Control": _btn_vip_control,
+    "🔄 Restart Bot": _btn_restart,
+    "❓ Help Admin": _btn_admin_help,
+}
+
+
+def _handle_message(msg: dict) -> None:
+    chat = msg.get("chat", {})
+    chat_id = chat.get("id")
+    text = msg.get("text", "")
+
+    if not text:
+        return
+
+    admin = is_admin(chat_id)
+    handler = COMMON_BUTTONS.get(text) or (ADMIN_BUTTONS if admin else USER_BUTTONS).get(text)
+    if handler is not None:
+        handler(chat_id)
+        return
+
+    if not text.startswith("/"):
         return
 
-    print("Telegram command loop start...")
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getUpdates"
+    parts = text.strip().split()
+    cmd_text = parts[0]
+    args_text = parts[1:]
 
-    # sync awal: skip pesan lama
+    print(f"[TELEGRAM CMD] {chat_id} {cmd_text} {args_text}")
+    handle_command(cmd_text, args_text, chat_id)
+
+
+def _answer_callback(callback_id: str) -> None:
     try:
-        r = requests.get(url, timeout=20)
+        http.post(
+            _api_url("answerCallbackQuery"),
+            data={"callback_query_id": callback_id},
+            timeout=10,
+        )
+    except Exception as e:
+        print("Error answerCallbackQuery:", e)
+
+
+def _handle_callback_query(cq: dict) -> None:
+    callback_id = cq.get("id")
+    from_id = cq.get("from", {}).get("id")
+    data_cb = cq.get("data")
+    msg_cq = cq.get("message", {})
+    chat_cq = msg_cq.get("chat", {})
+    chat_id_cq = chat_cq.get("id")
+
+    print(f"[TELEGRAM CB] {from_id} {data_cb}")
+
+    run_off_loop(_answer_callback, callback_id)
+
+    if data_cb:
+        handle_callback(data_cb, from_id, chat_id_cq)
+
+
+def dispatch_update(upd: dict) -> None:
+    """
+    Satu update Telegram → handler. Dipanggil consumer engine_commands di event loop
+    engine (bukan di thread Telegram), jadi handler boleh mengubah state langsung.
+    """
+    msg = upd.get("message")
+    if msg:
+        _handle_message(msg)
+        return
+
+    cq = upd.get("callback_query")
+    if cq:
+        _handle_callback_query(cq)
+
+
+def _in_daemon_thread(fn, *args) -> asyncio.Future:
+    """
+    Jalankan call blocking (long poll ~50 detik) di thread daemon.
+    Beda dengan asyncio.to_thread: proses tidak perlu menunggu request
+    yang sedang ditahan server Telegram saat bot berhenti.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def _set(setter, value) -> None:
+        if not fut.done():
+            setter(value)
+
+    def _run() -> None:
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            setter, value = fut.set_exception, e
+        else:
+            setter, value = fut.set_result, result
+        try:
+            loop.call_soon_threadsafe(_set, setter, value)
+        except RuntimeError:
+            pass  # event loop sudah ditutup
+
+    threading.Thread(target=_run, name="tg-longpoll", daemon=True).start()
+    return fut
+
+
+async def _run_long_polling() -> None:
+    # webhook aktif membuat getUpdates ditolak (409) → pastikan dihapus
+    try:
+        await asyncio.to_thread(http.post, _api_url("deleteWebhook"), timeout=10)
+    except Exception as e:
+        print("Error deleteWebhook:", e)
+
+    url = _api_url("getUpdates")
+
+    # sync awal: skip pesan lama (offset=-1 → hanya update terakhir yang dikirim)
+    try:
+        r = await asyncio.to_thread(http.get, url, params={"offset": -1, "timeout": 0}, timeout=20)
         if r.ok:
-            data = r.json()
-            results = data.get("result", [])
+            results = r.json().get("result", [])
             if results:
                 state.last_update_id = results[-1]["update_id"]
-                print(f"Sync Telegram: skip {len(results)} pesan lama.")
+                print("Sync Telegram: skip pesan lama.")
     except Exception as e:
         print("Error sync awal Telegram:", e)
 
+    allowed = json.dumps(ALLOWED_UPDATES)
     while state.running:
         try:
-            params: dict = {}
+            params: dict = {"timeout": LONG_POLL_TIMEOUT, "allowed_updates": allowed}
             if state.last_update_id is not None:
                 params["offset"] = state.last_update_id + 1
 
-            r = requests.get(url, params=params, timeout=20)
+            # request ditahan server sampai ada update / timeout → idle hampir tanpa CPU & request
+            r = await _in_daemon_thread(
+                partial(http.get, url, params=params, timeout=LONG_POLL_TIMEOUT + 10)
+            )
             if not r.ok:
                 print("Error getUpdates:", r.text)
-                time.sleep(2)
+                await asyncio.sleep(2)
                 continue
 
-            data = r.json()
-            for upd in data.get("result", []):
+            # update tidak diproses di sini: dikirim sebagai pesan ke antrian command engine
+            for upd in r.json().get("result", []):
                 state.last_update_id = upd["update_id"]
+                engine_commands.post(upd)
 
-                msg = upd.get("message")
-                if msg:
-                    chat = msg.get("chat", {})
-                    chat_id = chat.get("id")
-                    text = msg.get("text", "")
-
-                    if not text:
-                        continue
-
-                    if text == "🏠 Home":
-                        handle_command("/start", [], chat_id)
-                        continue
-
-                    if text == "🔔 Aktifkan Sinyal":
-                        handle_command("/activate", [], chat_id)
-                        continue
-                    if text == "🔕 Nonaktifkan Sinyal":
-                        handle_command("/deactivate", [], chat_id)
-                        continue
-                    if text == "📊 Status Saya":
-                        handle_command("/mystatus", [], chat_id)
-                        continue
-                    if text == "⭐ Upgrade VIP" and not is_admin(chat_id):
-                        send_telegram(
-                            "⭐ *UPGRADE KE VIP*\n\n"
-                            "Paket VIP memberikan:\n"
-                            "• Sinyal *unlimited* setiap hari\n"
-                            "• Akses penuh IMB signal\n\n"
-                            "Hubungi admin untuk upgrade:\n"
-                            f"`{TELEGRAM_ADMIN_USERNAME}`.",
-                            chat_id,
-                        )
-                        continue
-                    if text == "❓ Bantuan" and not is_admin(chat_id):
-                        send_telegram(
-                            "📖 *BANTUAN PENGGUNA*\n\n"
-                            "🔔 Aktifkan Sinyal — hidupkan sinyal.\n"
-                            "🔕 Nonaktifkan Sinyal — matikan sinyal.\n"
-                            "📊 Status Saya — lihat paket & limit.\n"
-                            "⭐ Upgrade VIP — info upgrade.\n",
-                            chat_id,
-                        )
-                        continue
-
-                    # Tombol ADMIN
-                    if is_admin(chat_id):
-                        if text == "▶️ Start Scan":
-                            handle_command("/startscan", [], chat_id)
-                            continue
-                        if text == "⏸️ Pause Scan":
-                            handle_command("/pausescan", [], chat_id)
-                            continue
-                        if text == "⛔ Stop Scan":
-                            handle_command("/stopscan", [], chat_id)
-                            continue
-                        if text == "📊 Status Bot":
-                            handle_command("/status", [], chat_id)
-                            continue
-                        if text == "⚙️ Mode Tier":
-                            send_telegram(
-                                "⚙️ *Mode Tier*\n\n"
-                                "Gunakan command:\n"
-                                "`/mode aplus` — hanya Tier A+\n"
-                                "`/mode a`     — Tier A & A+\n"
-                                "`/mode b`     — Tier B, A, A+",
-                                chat_id,
-                            )
-                            continue
-                        if text == "⏲️ Cooldown":
-                            send_telegram(
-                                "⏲️ *Cooldown Sinyal*\n\n"
-                                "Atur jarak minimal antar sinyal per pair.\n"
-                                "Contoh:\n"
-                                "`/cooldown 300`  (5 menit)\n"
-                                "`/cooldown 900`  (15 menit)\n"
-                                "`/cooldown 1800` (30 menit)",
-                                chat_id,
-                            )
-                            continue
-                        if text == "📈 Min Volume":
-                            send_telegram(
-                                "📈 *MINIMUM VOLUME USDT*\n\n"
-                                f"Sekarang: `{state.min_volume_usdt:,.0f}` USDT\n\n"
-                                "Atur dengan command:\n"
-                                "`/minvol 100000000`  (contoh 100 juta USDT)\n",
-                                chat_id,
-                            )
-                            continue
-                        if text == "📌 Max Pair":
-                            send_telegram(
-                                "📌 *MAXIMUM PAIR YANG DI-SCAN*\n\n"
-                                f"Sekarang: `{state.max_pairs}` pair\n\n"
-                                "Atur dengan command:\n"
-                                "`/maxpairs 30`  (scan 30 pair teratas)\n",
-                                chat_id,
-                            )
-                            continue
-                        if text == "⭐ VIP Control":
-                            send_telegram(
-                                "⭐ *VIP CONTROL*\n\n"
-                                "Gunakan:\n"
-                                "`/addvip <user_id> [hari]` — aktifkan VIP\n"
-                                "`/removevip <user_id>` — hapus VIP user\n",
-                                chat_id,
-                            )
-                            continue
-                        if text == "🔄 Restart Bot":
-                            send_telegram(
-                                "Pilih metode restart:",
-                                chat_id,
-                                reply_markup={
-                                    "inline_keyboard": [
-                                        [
-                                            {
-                                                "text": "♻ Soft Restart",
-                                                "callback_data": "admin_soft_restart",
-                                            },
-                                            {
-                                                "text": "🔄 Hard Restart",
-                                                "callback_data": "admin_hard_restart",
-                                            },
-                                        ],
-                                        [
-                                            {
-                                                "text": "❌ Batal",
-                                                "callback_data": "admin_restart_cancel",
-                                            }
-                                        ],
-                                    ]
-                                },
-                            )
-                            continue
-                        if text == "❓ Help Admin":
-                            send_telegram(
-                                "📖 *BANTUAN ADMIN*\n\n"
-                                "▶️ Start Scan / ⏸️ Pause Scan / ⛔ Stop Scan — kontrol scanning.\n"
-                                "📊 Status Bot — lihat status.\n"
-                                "⚙️ Mode Tier — atur kualitas sinyal.\n"
-                                "⏲️ Cooldown — atur jarak antar sinyal.\n"
-                                "📈 Min Volume — filter volume minimum USDT.\n"
-                                "📌 Max Pair — atur jumlah pair yang discan.\n"
-                                "⭐ VIP Control — kelola VIP.\n"
-                                "🔄 Restart Bot — Soft/Hard restart bot.\n",
-                                chat_id,
-                            )
-                            continue
-
-                    if not text.startswith("/"):
-                        continue
-
-                    parts = text.strip().split()
-                    cmd_text = parts[0]
-                    args_text = parts[1:]
-
-                    print(f"[TELEGRAM CMD] {chat_id} {cmd_text} {args_text}")
-                    handle_command(cmd_text, args_text, chat_id)
-                    continue
-
-                cq = upd.get("callback_query")
-                if cq:
-                    callback_id = cq.get("id")
-                    from_id = cq.get("from", {}).get("id")
-                    data_cb = cq.get("data")
-                    msg_cq = cq.get("message", {})
-                    chat_cq = msg_cq.get("chat", {})
-                    chat_id_cq = chat_cq.get("id")
-
-                    print(f"[TELEGRAM CB] {from_id} {data_cb}")
-
-                    try:
-                        answer_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/answerCallbackQuery"
-                        requests.post(
-                            answer_url,
-                            data={"callback_query_id": callback_id},
-                            timeout=10,
-                        )
-                    except Exception as e:
-                        print("Error answerCallbackQuery:", e)
-
-                    if data_cb:
-                        handle_callback(data_cb, from_id, chat_id_cq)
-
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print("Error di telegram_command_loop:", e)
-            time.sleep(2)
+            await asyncio.sleep(2)
+
+
+async def _run_webhook() -> None:
+    if not TELEGRAM_WEBHOOK_URL:
+        print("TELEGRAM_WEBHOOK_URL belum di-set → fallback ke long polling.")
+        await _run_long_polling()
+        return
+    if not TELEGRAM_WEBHOOK_SECRET:
+        # tanpa secret siapa pun yang bisa akses port bisa memalsukan update (termasuk dari admin)
+        print("TELEGRAM_WEBHOOK_SECRET belum di-set → webhook ditolak, fallback ke long polling.")
+        await _run_long_polling()
+        return
+
+    data = {
+        "url": TELEGRAM_WEBHOOK_URL,
+        "allowed_updates": json.dumps(ALLOWED_UPDATES),
+        "drop_pending_updates": "true",  # sama seperti polling: skip pesan lama
+        "secret_token": TELEGRAM_WEBHOOK_SECRET,
+    }
+    # error jaringan / 5xx / 429 → retry dengan backoff; URL ditolak (4xx) atau retry
+    # habis → fallback ke long polling supaya command tetap diterima
+    registered = False
+    for attempt in range(1, SET_WEBHOOK_ATTEMPTS + 1):
+        retry = True
+        try:
+            r = await asyncio.to_thread(http.post, _api_url("setWebhook"), data=data, timeout=10)
+            if r.ok:
+                registered = True
+                break
+            print("Gagal setWebhook:", r.text)
+            retry = r.status_code >= 500 or r.status_code == 429
+        except Exception as e:
+            print("Error setWebhook:", e)
+        if not retry or attempt == SET_WEBHOOK_ATTEMPTS or not state.running:
+            break
+        await asyncio.sleep(SET_WEBHOOK_RETRY_DELAY * 2 ** (attempt - 1))
+    if not registered:
+        if not state.running:
+            return
+        print("setWebhook gagal → fallback ke long polling.")
+        await _run_long_polling()
+        return
+
+    server = WebhookServer(
+        engine_commands.post,
+        TELEGRAM_WEBHOOK_HOST,
+        TELEGRAM_WEBHOOK_PORT,
+        TELEGRAM_WEBHOOK_SECRET,
+    )
+    await server.serve()
+
+
+async def telegram_command_loop() -> None:
+    """
+    Task penerima update Telegram di event loop yang sama dengan engine.
+    Update diteruskan ke engine_commands; run_range_bot yang memproses (dispatch_update).
+    """
+    if not TELEGRAM_TOKEN:
+        print("Tidak ada TELEGRAM_TOKEN, command loop tidak dijalankan.")
+        return
+
+    print(f"Telegram command loop start (mode {TELEGRAM_MODE})...")
+    if TELEGRAM_MODE == "webhook":
+        await _run_webhook()
+    else:
+        await _run_long_polling()
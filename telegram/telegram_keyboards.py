@@ -10,7 +10,10 @@ def get_user_reply_keyboard() -> dict:
             ],
             [
                 {"text": "📊 Status Saya"},
+                {"text": "🎯 Filter Sinyal"},
                 {"text": "⭐ Upgrade VIP"},
+            ],
+            [
                 {"text": "❓ Bantuan"},
             ],
         ],
@@ -0,0 +1,130 @@
+# telegram/telegram_outbox.py
+# Outbox persistent untuk delivery sinyal (SQLite mode WAL):
+# - broadcast_signal menulis satu row per (sinyal, chat) dengan idempotency key
+#   → sinyal yang sama tidak pernah diantrikan dua kali
+# - TelegramSender mengirim lalu menandai row 'sent' (at-least-once: crash di antara
+#   kirim & tandai → dikirim ulang saat replay)
+# - saat start, row yang masih pending di-replay → crash / hard restart di tengah
+#   broadcast tidak membuat subscriber sisanya kehilangan sinyal; sinyal yang sudah
+#   basi (lewat validitas entry) ditandai expired, tidak dikirim sebagai sinyal baru
+
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+OUTBOX_FILE = "outbox.db"
+# Row sent/failed yang lebih tua dari ini dibuang saat start (detik)
+OUTBOX_RETENTION = 7 * 24 * 3600
+
+STATUS_PENDING = 0
+STATUS_SENT = 1
+STATUS_FAILED = 2
+STATUS_EXPIRED = 3
+
+# (id, signal_id, chat_id, priority, text)
+OutboxRow = Tuple[int, str, int, int, str]
+
+
+class TelegramOutbox:
+    def __init__(self, path: str = OUTBOX_FILE) -> None:
+        self.path = path
+        # dipakai dari thread analisa (enqueue) & thread kirim (mark) → satu koneksi + lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idem_key TEXT NOT NULL UNIQUE,
+                    signal_id TEXT NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    priority INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    status INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, priority, id)"
+            )
+
+    def enqueue(self, signal_id: str, text: str, recipients: List[Tuple[int, int]]) -> List[OutboxRow]:
+        """
+        Simpan job (satu per chat). Return row yang benar-benar baru
+        (idempotency key signal_id:chat_id yang sudah ada di-skip).
+        """
+        now = time.time()
+        new_rows: List[OutboxRow] = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for chat_id, priority in recipients:
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO outbox "
+                        "(idem_key, signal_id, chat_id, priority, text, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (f"{signal_id}:{chat_id}", signal_id, chat_id, priority, text, now, now),
+                    )
+                    if cur.rowcount:
+                        new_rows.append((cur.lastrowid, signal_id, chat_id, priority, text))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return new_rows
+
+    def pending(self, older_than: Optional[float] = None) -> List[OutboxRow]:
+        """
+        Job yang belum selesai (untuk replay setelah restart).
+        older_than (detik) → hanya job yang dibuat lebih lama dari itu.
+        """
+        created_before = time.time() - older_than if older_than is not None else float("inf")
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, signal_id, chat_id, priority, text FROM outbox "
+                "WHERE status = ? AND created < ? ORDER BY priority, id",
+                (STATUS_PENDING, created_before),
+            ).fetchall()
+
+    def expire(self, max_age: float, keep_priority: int) -> int:
+        """Tandai expired job pending yang lebih tua dari max_age, kecuali priority <= keep_priority."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE outbox SET status = ?, updated = ? "
+                "WHERE status = ? AND created < ? AND priority > ?",
+                (STATUS_EXPIRED, now, STATUS_PENDING, now - max_age, keep_priority),
+            )
+            return cur.rowcount
+
+    def mark(self, row_id: int, status: int, attempts: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, updated = ? WHERE id = ?",
+                (status, attempts, time.time(), row_id),
+            )
+
+    def purge(self, older_than: float = OUTBOX_RETENTION) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM outbox WHERE status != ? AND updated < ?",
+                (STATUS_PENDING, time.time() - older_than),
+            )
+            return cur.rowcount
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
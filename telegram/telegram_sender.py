@@ -0,0 +1,326 @@
+# telegram/telegram_sender.py
+# Pengirim pesan Telegram async untuk broadcast sinyal:
+# - token bucket global (~30 pesan/detik, limit bot Telegram)
+# - pacing per chat (private ~1/detik, grup ~20/menit)
+# - 429 → hormati parameters.retry_after (semua worker ikut pause)
+# - prioritas: admin → VIP → free
+# - laporan fan-out per sinyal (jumlah terkirim, durasi, throughput)
+# - job disimpan dulu di outbox SQLite (telegram_outbox) → replay setelah crash/restart,
+#   stop() menunggu antrian habis (graceful drain) sebelum proses keluar
+# - replay: sinyal yang lebih tua dari validitas entry tidak dikirim lagi ke VIP/free;
+#   salinan admin tetap dikirim dengan penanda terlambat
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import TELEGRAM_RATE_PER_SEC, TELEGRAM_SENDER_WORKERS
+from core.range_settings import range_settings
+from telegram.telegram_common import post_message
+from telegram.telegram_outbox import STATUS_FAILED, STATUS_SENT, OutboxRow, TelegramOutbox
+
+PRIORITY_ADMIN = 0
+PRIORITY_VIP = 1
+PRIORITY_FREE = 2
+
+# Jeda minimal antar pesan ke chat yang sama (detik)
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+# Berapa kali coba kirim satu pesan (error jaringan / 5xx / 429)
+MAX_SEND_ATTEMPTS = 5
+# Jumlah laporan fan-out terakhir yang disimpan
+REPORT_HISTORY = 10
+# Batas waktu drain antrian saat shutdown (detik); sisanya di-replay saat start berikutnya
+DRAIN_TIMEOUT = 10.0
+# Panjang bar entry (detik) untuk umur maksimal replay sinyal
+ENTRY_BAR_SECONDS = 5 * 60
+
+
+def signal_replay_max_age() -> float:
+    """Umur maksimal job sinyal yang masih di-replay = validitas entry (max_entry_age_candles bar)."""
+    return max(1, range_settings.max_entry_age_candles) * ENTRY_BAR_SECONDS
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = max(0.1, rate)
+        # default tanpa burst: pesan diratakan 1/rate detik (limit Telegram dihitung per detik)
+        self.burst = burst if burst is not None else 1.0
+        self.tokens = self.burst
+        self._ts = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self._ts) * self.rate)
+                self._ts = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FanoutReport:
+    def __init__(self, label: str, total: int) -> None:
+        self.label = label
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.started = time.time()
+        self.finished = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.sent + self.failed >= self.total
+
+    def summary(self) -> str:
+        elapsed = (self.finished or time.time()) - self.started
+        rate = self.sent / elapsed if elapsed > 0 else 0.0
+        return (
+            f"{self.label}: {self.sent}/{self.total} terkirim, {self.failed} gagal, "
+            f"{elapsed:.1f}s ({rate:.1f} msg/s)"
+        )
+
+
+class _Job:
+    __slots__ = ("row_id", "chat_id", "text", "priority", "report", "attempts")
+
+    def __init__(self, row_id: int, chat_id: int, text: str, priority: int, report: FanoutReport) -> None:
+        self.row_id = row_id
+        self.chat_id = chat_id
+        self.text = text
+        self.priority = priority
+        self.report = report
+        self.attempts = 0
+
+
+class TelegramSender:
+    def __init__(
+        self,
+        rate: float = TELEGRAM_RATE_PER_SEC,
+        workers: int = TELEGRAM_SENDER_WORKERS,
+        outbox: Optional[TelegramOutbox] = None,
+    ) -> None:
+        self.bucket = TokenBucket(rate)
+        self.outbox = outbox
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._chat_next: Dict[int, float] = {}
+        self._retrying = 0  # job yang menunggu retry (call_later, belum masuk queue lagi)
+        self.reports: Deque[FanoutReport] = deque(maxlen=REPORT_HISTORY)
+
+        # statistik
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _get_outbox(self) -> TelegramOutbox:
+        if self.outbox is None:
+            self.outbox = TelegramOutbox()
+        return self.outbox
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        outbox = self._get_outbox()
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"tg-sender-{i}") for i in range(self.workers)
+        ]
+
+        # Replay job yang belum terkirim dari run sebelumnya.
+        # Sinyal basi tidak dikirim ke user (entry sudah tidak valid); admin tetap dapat, ditandai terlambat.
+        purged = outbox.purge()
+        max_age = signal_replay_max_age()
+        expired = outbox.expire(max_age, keep_priority=PRIORITY_ADMIN)
+        late = {row[0] for row in outbox.pending(older_than=max_age)}
+        rows = [
+            (row_id, signal_id, chat_id, priority, f"⏳ TERLAMBAT (replay setelah restart)\n{text}")
+            if row_id in late else (row_id, signal_id, chat_id, priority, text)
+            for row_id, signal_id, chat_id, priority, text in outbox.pending()
+        ]
+        if purged:
+            print(f"[TG Sender] Outbox: {purged} job lama dibersihkan.")
+        if expired:
+            print(f"[TG Sender] Outbox: {expired} job sinyal basi (> {max_age / 60:.0f} menit) tidak di-replay.")
+        if rows:
+            print(f"[TG Sender] Replay {len(rows)} job outbox yang belum terkirim...")
+            self._enqueue_rows(rows, replay=True)
+
+    async def stop(self, drain_timeout: float = DRAIN_TIMEOUT) -> None:
+        """Graceful drain: tunggu antrian kosong (maks drain_timeout), sisanya tetap di outbox."""
+        if self._queue is not None and self._tasks and drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self._drain(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                print(
+                    f"[TG Sender] Drain timeout, {self._queue.qsize() + self._retrying} job "
+                    "lanjut saat start berikutnya."
+                )
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+
+    async def _drain(self) -> None:
+        """Tunggu antrian kosong DAN tidak ada job yang sedang menunggu retry."""
+        while True:
+            await self._queue.join()
+            if not self._retrying:
+                return
+            await asyncio.sleep(0.05)
+
+    def broadcast(self, signal_id: str, text: str, recipients: List[Tuple[int, int]]) -> int:
+        """
+        Simpan satu pesan ke banyak chat di outbox lalu antrikan.
+        recipients = [(chat_id, priority), ...]. signal_id = idempotency key sinyal
+        (broadcast ulang dengan signal_id sama tidak mengirim dobel).
+        Aman dipanggil dari thread lain (worker analisa). Return jumlah job baru.
+        """
+        rows = self._get_outbox().enqueue(signal_id, text, recipients)
+        if rows and self._loop is not None and self._tasks:
+            self._loop.call_soon_threadsafe(self._enqueue_rows, rows)
+        # sender belum jalan → job tetap di outbox, di-replay saat start()
+        return len(rows)
+
+    def _enqueue_rows(self, rows: List[OutboxRow], replay: bool = False) -> None:
+        reports: Dict[str, FanoutReport] = {}
+        for row_id, signal_id, chat_id, priority, text in rows:
+            report = reports.get(signal_id)
+            if report is None:
+                label = f"{signal_id} (replay)" if replay else signal_id
+                report = reports[signal_id] = FanoutReport(label, 0)
+            report.total += 1
+            self._put(_Job(row_id, chat_id, text, priority, report))
+
+    def _put(self, job: _Job) -> None:
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+
+    def _chat_interval(self, chat_id: int) -> float:
+        # chat_id negatif = grup / channel
+        return GROUP_CHAT_INTERVAL if chat_id < 0 else PRIVATE_CHAT_INTERVAL
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            except Exception as e:
+                print(f"[TG Sender] error kirim ke {job.chat_id}:", e)
+                self._finish(job, False)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: _Job) -> None:
+        # pacing per chat: slot di-reserve dulu supaya dua worker tidak kirim ke chat yang sama bareng
+        now = time.monotonic()
+        slot = max(now, self._chat_next.get(job.chat_id, 0.0))
+        self._chat_next[job.chat_id] = slot + self._chat_interval(job.chat_id)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        await self.bucket.acquire()
+        job.attempts += 1
+        try:
+            r = await asyncio.to_thread(self._post_and_record, job)
+        except Exception as e:
+            self._retry_or_fail(job, 2.0 ** job.attempts, f"error jaringan: {e}")
+            return
+
+        if r.ok:
+            self._finish(job, True)
+            return
+
+        if r.status_code == 429:
+            self.rate_limited += 1
+            try:
+                retry_after = float(r.json().get("parameters", {}).get("retry_after", 5))
+            except ValueError:
+                retry_after = 5.0
+            print(f"[TG Sender] 429 → pause {retry_after:.1f}s")
+            self.bucket.pause(retry_after)
+            self._retry_or_fail(job, retry_after, "429")
+            return
+
+        if r.status_code >= 500:
+            self._retry_or_fail(job, 2.0 ** job.attempts, f"HTTP {r.status_code}")
+            return
+
+        # 400/403 (chat tidak ada / bot diblok user) → tidak di-retry
+        print(f"[TG Sender] gagal kirim ke {job.chat_id}: {r.text}")
+        self._finish(job, False)
+
+    def _post_and_record(self, job: _Job):
+        """Kirim (di thread) lalu langsung tandai sent di outbox."""
+        r = post_message(job.chat_id, job.text)
+        if r.ok:
+            self.outbox.mark(job.row_id, STATUS_SENT, job.attempts)
+        return r
+
+    def _retry_or_fail(self, job: _Job, delay: float, reason: str) -> None:
+        if job.attempts >= MAX_SEND_ATTEMPTS:
+            print(f"[TG Sender] menyerah kirim ke {job.chat_id} ({reason}).")
+            self._finish(job, False)
+            return
+        self._retrying += 1
+        self._loop.call_later(delay, self._requeue, job)
+
+    def _requeue(self, job: _Job) -> None:
+        self._retrying -= 1
+        self._put(job)
+
+    def _finish(self, job: _Job, ok: bool) -> None:
+        report = job.report
+        if ok:
+            self.sent += 1
+            report.sent += 1
+        else:
+            self.failed += 1
+            report.failed += 1
+            try:
+                self.outbox.mark(job.row_id, STATUS_FAILED, job.attempts)
+            except Exception as e:
+                print("[TG Sender] gagal update outbox:", e)
+        if report.done:
+            report.finished = time.time()
+            self.reports.append(report)
+            print(f"[TG Sender] Fan-out {report.summary()}")
+
+    def format_stats(self) -> str:
+        queued = self._queue.qsize() if self._queue is not None else 0
+        pending = self.outbox.pending_count() if self.outbox is not None else 0
+        lines = [
+            f"Telegram   : antre {queued} (outbox pending {pending}), "
+            f"terkirim {self.sent}, gagal {self.failed}, "
+            f"429 {self.rate_limited}x, limit {self.bucket.rate:.0f}/s"
+        ]
+        if self.reports:
+            lines.append(f"  terakhir → {self.reports[-1].summary()}")
+        return "\n".join(lines)
+
+
+# Instance global: di-start engine, dipakai broadcast_signal
+telegram_sender = TelegramSender()
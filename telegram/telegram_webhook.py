@@ -0,0 +1,93 @@
+# telegram/telegram_webhook.py
+# Server HTTP asyncio minimal untuk mode webhook Telegram:
+# - terima POST update JSON, validasi secret token (wajib), langsung balas 200
+# - jalan di event loop engine; update diteruskan ke on_update (antrian
+#   engine_commands) dan diproses berurutan oleh consumer engine
+
+import asyncio
+import hmac
+import json
+from typing import Callable
+
+from core.bot_state import state
+
+WEBHOOK_PATH = "/telegram"
+# Batas ukuran body request (bytes)
+MAX_BODY = 1024 * 1024
+# Batas waktu baca satu request (detik)
+READ_TIMEOUT = 10.0
+
+_RESP_OK = b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+_RESP_FORBIDDEN = b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+_RESP_BAD = b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+_RESP_NOT_FOUND = b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+
+class WebhookServer:
+    def __init__(self, on_update: Callable[[dict], None], host: str, port: int, secret: str) -> None:
+        if not secret:
+            raise ValueError("Webhook Telegram butuh secret token")
+        self.on_update = on_update
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.received = 0
+        self.rejected = 0
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        length = int(headers.get("content-length", "0"))
+        if length > MAX_BODY:
+            raise ValueError("body terlalu besar")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, headers, body = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+            except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                writer.write(_RESP_BAD)
+                return
+
+            if method != "POST" or path.split("?", 1)[0] != WEBHOOK_PATH:
+                writer.write(_RESP_NOT_FOUND)
+                return
+            token = headers.get("x-telegram-bot-api-secret-token", "")
+            if not hmac.compare_digest(token.encode(), self.secret.encode()):
+                self.rejected += 1
+                writer.write(_RESP_FORBIDDEN)
+                return
+            try:
+                update = json.loads(body)
+            except ValueError:
+                writer.write(_RESP_BAD)
+                return
+
+            self.received += 1
+            self.on_update(update)
+            writer.write(_RESP_OK)
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+            except Exception:
+                pass
+
+    async def serve(self) -> None:
+        """Jalan sampai state.running = False."""
+        server = await asyncio.start_server(self._handle_conn, self.host, self.port)
+        print(f"Webhook Telegram listen di {self.host}:{self.port}{WEBHOOK_PATH}")
+        try:
+            while state.running:
+                await asyncio.sleep(1)
+        finally:
+            server.close()
+            await server.wait_closed()
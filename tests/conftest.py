@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Supaya modul repo (binance/, core/, range/, telegram/) bisa di-import dari tests/.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+# tests/test_analysis_pipeline.py
+
+import asyncio
+import threading
+
+from core.analysis_pipeline import AnalysisPipeline
+from core.bar_barrier import BarCloseBarrier
+
+
+def test_pipeline_runs_jobs_off_loop_and_counts_errors():
+    seen = []
+
+    def handler(job):
+        if job == "boom":
+            raise RuntimeError(job)
+        seen.append((job, threading.current_thread().name))
+
+    async def run():
+        pipe = AnalysisPipeline(handler, workers=2, queue_maxsize=4, name="t")
+        await pipe.start()
+        for job in ("a", "boom", "b"):
+            assert await pipe.submit(job)
+        await pipe.stop(drain=True)
+        return pipe
+
+    pipe = asyncio.run(run())
+    assert sorted(j for j, _ in seen) == ["a", "b"]
+    assert all(name.startswith("t") for _, name in seen)
+    assert pipe.processed == 2 and pipe.failed == 1
+
+
+def test_barrier_flushes_on_expected_or_deadline():
+    flushed = []
+
+    async def on_flush(open_time, symbols):
+        flushed.append((open_time, symbols))
+
+    async def run():
+        barrier = BarCloseBarrier(on_flush, deadline=0.05)
+        barrier.expected = 2
+        barrier.on_close("BTC", 0)
+        barrier.on_close("ETH", 0)  # lengkap → flush langsung
+        barrier.on_close("BTC", 300)  # ETH telat → flush saat deadline
+        await asyncio.sleep(0.1)
+        barrier.on_close("ETH", 300)  # straggler → batch kecil berikutnya
+        await asyncio.sleep(0.1)
+        return barrier
+
+    barrier = asyncio.run(run())
+    assert flushed == [(0, ["BTC", "ETH"]), (300, ["BTC"]), (300, ["ETH"])]
+    assert barrier.stragglers == 1
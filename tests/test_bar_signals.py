@@ -0,0 +1,79 @@
+# tests/test_bar_signals.py
+
+from core.bar_signals import BarSignalBatch, FreeSignalGate, rank_key, rank_signals
+
+
+def _sig(score, height=0.5, sl=0.5):
+    return {"score": score, "range_height_pct": height, "sl_pct": sl}
+
+
+def test_rank_order():
+    ranked = rank_signals([_sig(80), _sig(100, 0.6), _sig(100, 0.4), _sig(100, 0.4, 0.3)])
+    assert [(r["score"], r["range_height_pct"], r["sl_pct"]) for r in ranked] == [
+        (100, 0.4, 0.3), (100, 0.4, 0.5), (100, 0.6, 0.5), (80, 0.5, 0.5),
+    ]
+
+
+def test_batch_completes_once():
+    done = []
+    batch = BarSignalBatch(7, 3, lambda ot, res: done.append((ot, list(res))))
+    batch.add(_sig(90))
+    batch.add(None)
+    assert not done
+    batch.add(_sig(100))
+    assert done == [(7, [_sig(90), _sig(100)])]
+
+
+def test_free_gate_uses_rolling_threshold():
+    gate = FreeSignalGate(limit=2)
+    day = 86400.0
+    # histori kosong → semua lolos (warm-up)
+    assert gate.observe([rank_key(_sig(85))], 1, now=0.0) == [True]
+    gate.observe([rank_key(_sig(s)) for s in (105, 100, 90, 80)], 0, now=10.0)
+
+    # ambang = sinyal ke-2 terbaik 24 jam terakhir (score 100)
+    assert gate.threshold(now=20.0) == rank_key(_sig(100))
+    assert gate.observe([rank_key(_sig(95))], 1, now=20.0) == [False]
+    assert gate.observe([rank_key(_sig(100))], 1, now=30.0) == [True]
+
+    # histori > 24 jam dibuang → ambang ikut turun
+    gate.observe([rank_key(_sig(70)), rank_key(_sig(60))], 0, now=day + 100.0)
+    assert gate.threshold(now=day + 110.0) == rank_key(_sig(60))
+
+
+def test_free_gate_snapshot_roundtrip():
+    gate = FreeSignalGate(limit=1)
+    gate.observe([rank_key(_sig(100)), rank_key(_sig(90))], 0, now=5.0)
+    again = FreeSignalGate(limit=1)
+    again.load(gate.snapshot())
+    assert again.observe([rank_key(_sig(95))], 1, now=6.0) == [False]
+
+
+def test_batch_extend_merges_stragglers_until_complete():
+    done = []
+    batch = BarSignalBatch(0, 2, lambda ot, res: done.append(list(res)))
+    batch.add({"symbol": "A"})
+    assert batch.extend(1)  # straggler masuk sebelum batch selesai → satu pengiriman
+    batch.add(None)
+    assert done == []
+    batch.add({"symbol": "B"})
+    assert done == [[{"symbol": "A"}, {"symbol": "B"}]]
+    assert not batch.extend(1)  # sudah terkirim → caller buat batch susulan
+
+
+def test_free_gate_keeps_only_entries_that_can_set_threshold():
+    import random
+
+    rng = random.Random(1)
+    gate = FreeSignalGate(limit=3, window=1000.0)
+    full = []
+    for step in range(600):
+        now = float(step * 10)
+        keys = [rank_key(_sig(rng.randint(60, 140))) for _ in range(rng.randint(0, 4))]
+        gate.observe(keys, 0, now=now)
+        full.extend((now, k) for k in keys)
+        live = sorted(k for ts, k in full if ts >= now + 5 - 1000.0)
+        expected = live[2] if len(live) >= 3 else None
+        assert gate.threshold(now=now + 5) == expected
+    # ~200 sinyal dalam window, yang disimpan hanya yang masih mungkin jadi ambang
+    assert len(gate.snapshot()) < 40
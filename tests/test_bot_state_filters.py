@@ -0,0 +1,45 @@
+# tests/test_bot_state_filters.py
+
+import pytest
+
+import core.bot_state as bot_state
+import telegram.telegram_commands as commands
+from core.bot_store import BotStore
+from core.signal_filters import signal_filters
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bot_state, "_store", BotStore(str(tmp_path / "bot.db")))
+    monkeypatch.setattr(bot_state.state, "subscribers", set())
+    monkeypatch.setattr(bot_state.state, "vip_users", {})
+    signal_filters.load({})
+    yield bot_state.get_store()
+    signal_filters.load({})
+
+
+def test_vip_change_keeps_filters_unsubscribe_clears(store):
+    bot_state.add_subscriber(1)
+    bot_state.set_vip(1, 10**10)
+    bot_state.set_filter(1, {"sides": ["long"]})
+
+    bot_state.remove_vip(1)
+    assert signal_filters.get(1) == {"sides": ["long"]}
+    assert store.load_filters() == {1: {"sides": ["long"]}}
+
+    bot_state.remove_subscriber(1)
+    assert signal_filters.get(1) == {}
+    assert store.load_filters() == {}
+
+
+def test_filter_refused_for_non_subscriber(store, monkeypatch):
+    replies = []
+    monkeypatch.setattr(commands, "send_telegram", lambda text, chat_id: replies.append(text))
+    commands._user_filter(["side", "long"], 5)
+    assert replies == [commands.FILTER_NEEDS_SUBSCRIBE]
+    assert store.load_filters() == {}
+
+    bot_state.add_subscriber(5)
+    commands._user_filter(["side", "long"], 5)
+    assert store.load_filters() == {5: {"sides": ["long"]}}
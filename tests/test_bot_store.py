@@ -0,0 +1,54 @@
+# tests/test_bot_store.py
+
+import json
+
+from core.bot_store import BotStore
+
+
+def test_migrates_legacy_json_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "subscribers.json").write_text(json.dumps([1, 2]))
+    (tmp_path / "vip_users.json").write_text(json.dumps({"2": 5000.0}))
+    (tmp_path / "bot_state.json").write_text(json.dumps({"min_tier": "A"}))
+
+    store = BotStore(str(tmp_path / "bot.db"))
+    assert store.load_subscribers() == {1, 2}
+    assert store.load_vip_users() == {2: 5000.0}
+    assert store.load_state() == {"min_tier": "A"}
+
+    # database sudah terisi → JSON tidak dibaca ulang
+    store.remove_subscriber(1)
+    again = BotStore(str(tmp_path / "bot.db"))
+    assert again.load_subscribers() == {2}
+
+
+def test_quota_vip_filters_and_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = BotStore(str(tmp_path / "bot.db"))
+
+    store.incr_daily_counts("2026-01-01", [1, 2])
+    store.incr_daily_counts("2026-01-01", [1])
+    store.incr_daily_counts("2026-01-02", [3])
+    assert store.load_daily_counts("2026-01-01") == {1: 2, 2: 1}
+    assert store.purge_daily_counts("2026-01-02") == 2
+    assert store.load_daily_counts("2026-01-01") == {}
+
+    store.set_vip(1, 100.0)
+    store.set_vip(2, 300.0)
+    store.set_vip(1, 200.0)  # perpanjang
+    assert sorted(store.delete_expired_vip(250.0)) == [1]
+    assert store.load_vip_users() == {2: 300.0}
+
+    store.set_filter(1, {"max_sl": 1.0})
+    store.set_filter(2, {"sides": ["long"]})
+    store.delete_filters([1, 99])
+    assert store.load_filters() == {2: {"sides": ["long"]}}
+
+    store.save_state({"scanning": True, "min_tier": "A+"})
+    assert store.load_state() == {"scanning": True, "min_tier": "A+"}
+
+    # histori ambang free: append-only, row keluar window dihapus saat append berikutnya
+    store.add_free_rank([(10.0, (-100.0, 0.5, 0.4)), (20.0, (-90.0, 0.5, 0.4))], older_than=0.0)
+    store.add_free_rank([(30.0, (-95.0, 0.3, 0.2))], older_than=15.0)
+    assert store.load_free_rank(0.0) == [[20.0, [-90.0, 0.5, 0.4]], [30.0, [-95.0, 0.3, 0.2]]]
+    assert store.load_free_rank(25.0) == [[30.0, [-95.0, 0.3, 0.2]]]
@@ -0,0 +1,63 @@
+# tests/test_candle_store.py
+
+import numpy as np
+
+from binance.candle_store import CandleStore, SymbolStore
+from binance.ohlc_buffer import OHLCBufferManager
+
+MS = 300_000
+
+
+def _row(i: int) -> list:
+    ot = i * MS
+    return [ot, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0, ot + MS - 1]
+
+
+def test_write_read_wraparound(tmp_path):
+    store = SymbolStore(str(tmp_path / "X_5m.bin"), depth=5)
+    for i in range(8):
+        r = _row(i)
+        store.write(r[0], r[6], *r[1:6])
+    recs = store.read_last(10)
+    assert store.count == 5
+    assert recs["open_time"].tolist() == [i * MS for i in range(3, 8)]
+
+    # file dibuka ulang → data sama
+    again = SymbolStore(str(tmp_path / "X_5m.bin"), depth=99)
+    assert again.depth == 5
+    assert again.read_last(5)["open_time"].tolist() == recs["open_time"].tolist()
+
+
+def test_healed_rows_inserted_by_open_time(tmp_path):
+    cs = CandleStore(str(tmp_path), depth=20)
+    cs.write_rows("X", [_row(i) for i in (0, 1, 2, 6, 7)])  # candle 3..5 hilang (gap)
+    healed = _row(4)
+    healed[4] = 99.0
+    cs.write_rows("X", [_row(3), healed, _row(5), _row(6)])
+
+    rows = cs.load_rows("X", 20)
+    assert [r[0] for r in rows] == [i * MS for i in range(8)]
+    assert rows[4][4] == 99.0
+
+
+def test_single_late_write_is_inserted(tmp_path):
+    store = SymbolStore(str(tmp_path / "Y_5m.bin"), depth=10)
+    for i in (0, 1, 3):
+        r = _row(i)
+        store.write(r[0], r[6], *r[1:6])
+    r = _row(2)
+    store.write(r[0], r[6], *r[1:6])
+    assert store.read_last(10)["open_time"].tolist() == [0, MS, 2 * MS, 3 * MS]
+
+
+def test_restore_rejects_holes(tmp_path):
+    cs = CandleStore(str(tmp_path), depth=20)
+    cs.write_rows("X", [_row(i) for i in (0, 1, 2, 5, 6)])
+    mgr = OHLCBufferManager(max_candles=10, interval_ms=MS, store=cs)
+    assert not mgr.restore_from_store("X", 6 * MS)
+
+    cs.write_rows("X", [_row(3), _row(4)])
+    assert mgr.restore_from_store("X", 8 * MS)
+    assert mgr.get_arrays("X")["open_time"].tolist() == [i * MS for i in range(7)]
+    assert not mgr.is_ready("X")  # candle sejak data terakhir di disk tetap di-backfill
+    assert np.array_equal(mgr.get_arrays("X")["close"], [1.5 + i for i in range(7)])
@@ -0,0 +1,64 @@
+# tests/test_eligibility.py
+
+from core.eligibility import EligibilityIndex
+
+NOW = 1_000_000.0
+
+
+def _index(limit=2):
+    idx = EligibilityIndex(free_limit=limit)
+    idx.rebuild(
+        subscribers={1, 2, 3, 4, 99},
+        vip_users={1: NOW + 10, 2: NOW + 20, 5: NOW - 1},
+        daily_counts={4: 2},
+        admin_id=99,
+        now=NOW,
+    )
+    return idx
+
+
+def test_partitions_on_rebuild():
+    idx = _index()
+    assert idx.vip == {1, 2}
+    assert idx.free_open == {3}
+    assert idx.free_exhausted == {4}
+
+
+def test_heap_expiry_demotes_in_deadline_order():
+    idx = _index()
+    assert idx.next_expiry() == NOW + 10
+    assert idx.expire_due(NOW + 5) == []
+    assert idx.expire_due(NOW + 10) == [1]
+    assert idx.vip == {2} and 1 in idx.free_open
+    # perpanjang VIP 2 → entry heap lama basi, tidak ikut expired
+    idx.set_vip(2, NOW + 100)
+    assert idx.expire_due(NOW + 50) == []
+    assert idx.next_expiry() == NOW + 100
+    vip, free = idx.recipients(now=NOW + 100)
+    assert vip == [] and sorted(free) == [1, 2, 3]
+
+
+def test_removed_vip_heap_entry_is_stale():
+    idx = _index()
+    idx.remove_vip(1)
+    assert 1 in idx.free_open
+    assert idx.expire_due(NOW + 15) == []
+    assert idx.next_expiry() == NOW + 20
+
+
+def test_quota_exhaust_and_reset():
+    idx = _index()
+    idx.record_delivered([3])
+    assert 3 in idx.free_open
+    idx.record_delivered([3])
+    assert idx.free_open == set() and idx.free_exhausted == {3, 4}
+    _, free = idx.recipients(now=NOW, include_exhausted=True)
+    assert sorted(free) == [3, 4]
+
+    idx.reset_quota()
+    assert idx.free_open == {3, 4} and idx.free_exhausted == set()
+
+    # restart di hari yang sama: kuota terpakai dari database tetap berlaku
+    idx.reset_quota({3: 2, 4: 1, 1: 5})
+    assert idx.free_open == {4} and idx.free_exhausted == {3}
+    assert idx.vip == {1, 2}
@@ -0,0 +1,39 @@
+# tests/test_engine_commands.py
+
+import asyncio
+
+from core.engine_commands import EngineCommands
+
+
+def test_commands_processed_in_order_on_the_loop():
+    handled = []
+
+    def handler(msg):
+        if msg == "bad":
+            raise ValueError(msg)
+        handled.append(msg)
+
+    async def run():
+        cmds = EngineCommands(maxsize=3)
+        for msg in ("a", "bad", "b", "dropped"):
+            cmds.post(msg)
+        task = asyncio.create_task(cmds.serve(handler))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        return cmds
+
+    cmds = asyncio.run(run())
+    assert handled == ["a", "b"]
+    assert (cmds.received, cmds.processed, cmds.failed, cmds.dropped) == (3, 2, 1, 1)
+
+
+def test_interrupt_wakes_registered_loops():
+    woken = []
+    cmds = EngineCommands()
+    waker = lambda: woken.append(1)  # noqa: E731
+    cmds.add_waker(waker)
+    cmds.add_waker(lambda: 1 / 0)  # waker error tidak menghentikan yang lain
+    cmds.interrupt()
+    cmds.remove_waker(waker)
+    cmds.interrupt()
+    assert woken == [1]
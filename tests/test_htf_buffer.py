@@ -0,0 +1,38 @@
+# tests/test_htf_buffer.py
+
+from binance.htf_buffer import HTFBufferManager
+
+MS_5M = 5 * 60 * 1000
+
+
+def _candle(i):
+    ot = i * MS_5M
+    return {"open_time": ot, "close_time": ot + MS_5M - 1, "open": 100.0 + i,
+            "high": 101.0 + i, "low": 99.0 - i, "close": 100.5 + i, "volume": 1.0}
+
+
+def test_resample_5m_into_15m_and_1h():
+    htf = HTFBufferManager(max_candles=10)
+    for i in range(13):  # 1 jam penuh + candle pertama jam berikutnya
+        htf.on_5m_close("BTCUSDT", _candle(i))
+
+    h1 = htf.get_arrays("BTCUSDT", "1h")
+    assert h1["open_time"].tolist() == [0, 12 * MS_5M]
+    assert h1["open"][0] == 100.0 and h1["close"][0] == 111.5
+    assert h1["high"][0] == 112.0 and h1["low"][0] == 88.0
+    assert h1["volume"][0] == 12.0
+
+    m15 = htf.get_arrays("BTCUSDT", "15m")
+    assert m15["open_time"].tolist() == [k * 3 * MS_5M for k in range(5)]
+    assert m15["close"].tolist()[:4] == [102.5, 105.5, 108.5, 111.5]
+
+
+def test_backfill_only_widens_running_bucket():
+    htf = HTFBufferManager(max_candles=10)
+    for i in range(12, 15):
+        htf.on_5m_close("ETHUSDT", _candle(i))
+    # candle susulan di bucket 1h yang sedang berjalan: high/low melebar, close tetap
+    htf.on_5m_backfill("ETHUSDT", [[13 * MS_5M, "0", "500", "1", "0", "0"]])
+    h1 = htf.get_arrays("ETHUSDT", "1h")
+    assert h1["high"][-1] == 500.0 and h1["low"][-1] == 1.0
+    assert h1["close"][-1] == 114.5
@@ -0,0 +1,32 @@
+# tests/test_htf_context.py
+
+import numpy as np
+
+from range.htf_context import HTFContextTable, compute_htf_context
+
+
+def _series(rng, n, drift):
+    close = 100 * np.exp(np.cumsum(rng.normal(drift, 0.01, n)))
+    return {"high": close * 1.004, "low": close * 0.996, "close": close}
+
+
+def test_table_matches_per_symbol_path():
+    rng = np.random.default_rng(3)
+    snapshot = {"1h": {}, "15m": {}}
+    for i, drift in enumerate((0.004, -0.004, 0.0, 0.002, -0.001) * 4):
+        sym = f"S{i}USDT"
+        n = (150, 150, 90, 40, 12)[i % 5]  # panjang history beda → grup matrix beda
+        snapshot["1h"][sym] = _series(rng, n, drift)
+        snapshot["15m"][sym] = _series(rng, n, drift)
+
+    table = HTFContextTable()
+    table.refresh(snapshot, verify=True)
+    assert table.verified == 20
+    assert table.mismatch == 0
+    trends = {table.get(sym)["trend_1h"] for sym in snapshot["1h"]}
+    assert {"UP", "DOWN"} <= trends
+
+
+def test_unknown_symbol_is_neutral():
+    ctx = compute_htf_context("NOPEUSDT", {"1h": {}, "15m": {}})
+    assert ctx["htf_ok_long"] and ctx["htf_ok_short"] and ctx["trend_1h"] == "RANGE"
@@ -0,0 +1,54 @@
+# tests/test_http_transport.py
+
+import asyncio
+
+import pytest
+
+from core.http_transport import (
+    BREAKER_THRESHOLD,
+    CircuitOpenError,
+    HttpTransport,
+    LatencyHistogram,
+    WeightTracker,
+)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    t = HttpTransport(WeightTracker(limit_1m=100))
+    host = "fapi.binance.com"
+    for _ in range(BREAKER_THRESHOLD - 1):
+        t._record_result(host, False)
+    t._check_breaker(host)  # belum terbuka
+    t._record_result(host, True)  # sukses → hitungan reset
+    for _ in range(BREAKER_THRESHOLD - 1):
+        t._record_result(host, False)
+    t._check_breaker(host)
+    t._record_result(host, False)
+    with pytest.raises(CircuitOpenError):
+        t._check_breaker(host)
+    t._check_breaker("api.telegram.org")  # host lain tidak ikut diblok
+
+
+def test_weight_budget_and_headers():
+    tracker = WeightTracker(limit_1m=100, safety_ratio=0.8)
+    assert tracker.budget == 80
+    asyncio.run(tracker.acquire(50))
+    assert tracker.used == 50
+    # header server lebih kecil dari hitungan lokal (request in-flight) → tidak turun
+    tracker.update_from_headers({"X-MBX-USED-WEIGHT-1M": "20"})
+    assert tracker.used == 50
+    tracker.update_from_headers({"X-MBX-USED-WEIGHT-1M": "70"})
+    assert tracker.used == 70
+    tracker.pause(5)
+    assert 4 < tracker.paused_for() <= 5
+
+
+def test_latency_histogram_and_token_masking():
+    h = LatencyHistogram()
+    for ms in (10, 20, 30, 200, 3000):
+        h.observe(ms)
+    assert h.quantile(0.5) == 50
+    assert h.quantile(0.8) == 250
+    assert h.quantile(1.0) == 5000
+    ep = HttpTransport._endpoint("api.telegram.org", "/bot123:SECRET/sendMessage")
+    assert "SECRET" not in ep and ep.endswith("/sendMessage")
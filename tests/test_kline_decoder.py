@@ -0,0 +1,43 @@
+# tests/test_kline_decoder.py
+
+import json
+
+from binance.kline_decoder import KlineFrameDecoder
+
+
+def _frame(symbol, open_time, closed, close="1.0"):
+    return json.dumps(
+        {
+            "stream": f"{symbol.lower()}@kline_5m",
+            "data": {"k": {"s": symbol, "t": open_time, "c": close, "x": closed}},
+        },
+        separators=(",", ":"),
+    )
+
+
+def test_intrabar_skipped_without_parse():
+    dec = KlineFrameDecoder()
+    assert dec.feed(_frame("BTCUSDT", 0, False, "1.0")) is None
+    assert dec.feed(_frame("BTCUSDT", 0, False, "2.0")) is None
+    assert dec.decoded == 0
+    assert dec.skipped == 2
+
+
+def test_duplicate_closed_frame_dropped():
+    dec = KlineFrameDecoder()
+    first = dec.feed(_frame("BTCUSDT", 300_000, True))
+    assert first is not None and first["t"] == 300_000
+    # koneksi kedua saat rotasi mengirim close yang sama / lebih lama
+    assert dec.feed(_frame("BTCUSDT", 300_000, True)) is None
+    assert dec.feed(_frame("BTCUSDT", 0, True)) is None
+    assert dec.duplicates == 2
+    # symbol lain & candle berikutnya tetap lolos
+    assert dec.feed(_frame("ETHUSDT", 300_000, True)) is not None
+    assert dec.feed(_frame("BTCUSDT", 600_000, True)) is not None
+
+
+def test_forget_resets_dedupe():
+    dec = KlineFrameDecoder()
+    dec.feed(_frame("BTCUSDT", 300_000, True))
+    dec.forget("BTCUSDT")
+    assert dec.feed(_frame("BTCUSDT", 300_000, True)) is not None
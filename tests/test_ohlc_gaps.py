@@ -0,0 +1,47 @@
+# tests/test_ohlc_gaps.py
+
+from binance.ohlc_buffer import OHLCBufferManager
+
+MS = 300_000
+
+
+def _kline(i, close=1.0, closed=True):
+    return {"t": i * MS, "T": (i + 1) * MS - 1, "o": "1", "h": "2", "l": "0.5",
+            "c": str(close), "v": "10", "x": closed}
+
+
+def _row(i, close=1.0):
+    return [i * MS, "1", "2", "0.5", str(close), "10", (i + 1) * MS - 1]
+
+
+def test_gap_detected_and_healed_in_order():
+    buf = OHLCBufferManager(max_candles=50, interval_ms=MS)
+    for i in (0, 1, 2):
+        buf.update_from_kline("BTCUSDT", _kline(i))
+    assert buf.is_ready("BTCUSDT")
+
+    buf.update_from_kline("BTCUSDT", _kline(6))  # candle 3..5 hilang
+    assert not buf.is_ready("BTCUSDT")
+    gaps = buf.take_gaps()
+    assert gaps == {"BTCUSDT": (3 * MS, 5 * MS)}
+    assert not buf.is_ready("BTCUSDT") and buf.pending_gap_count() == 1
+
+    # REST menang untuk open_time yang sama (candle 6 versi final)
+    buf.heal_gap("BTCUSDT", [_row(3), _row(4), _row(5), _row(6, close=9.0)])
+    assert buf.is_ready("BTCUSDT") and buf.healed_gaps == 1
+    arr = buf.get_arrays("BTCUSDT")
+    assert arr["open_time"].tolist() == [i * MS for i in range(7)]
+    assert arr["close"][-1] == 9.0
+
+
+def test_heal_failed_requeues_gap():
+    buf = OHLCBufferManager(max_candles=50, interval_ms=MS)
+    buf.update_from_kline("ETHUSDT", _kline(0))
+    buf.update_from_kline("ETHUSDT", _kline(3))
+    gap = buf.take_gaps()["ETHUSDT"]
+    buf.heal_failed("ETHUSDT", gap)
+    assert buf.has_new_gaps() and not buf.is_ready("ETHUSDT")
+
+    # symbol keluar universe → gap ikut dibuang
+    buf.forget("ETHUSDT")
+    assert not buf.has_new_gaps()
@@ -0,0 +1,53 @@
+# tests/test_ohlc_ring.py
+
+import numpy as np
+
+from binance.ohlc_buffer import STABLE_MARGIN, SymbolRing
+
+MS = 300_000
+
+
+def _append(ring, i, closed=True):
+    ring.append(i * MS, (i + 1) * MS - 1, i, i + 0.5, i - 0.5, float(i), 1.0, closed)
+
+
+def test_window_is_contiguous_across_wraparound():
+    ring = SymbolRing(capacity=10)
+    total = 3 * ring.length + 7  # beberapa kali memutar
+    for i in range(total):
+        _append(ring, i)
+        sl = ring.window()
+        closes = ring.prices[3, sl]
+        expected = np.arange(max(0, i + 1 - ring.capacity), i + 1, dtype=float)
+        assert np.array_equal(closes, expected)
+        assert np.shares_memory(closes, ring.prices)  # view, bukan copy
+    assert ring.count == ring.capacity
+    assert ring.last_open_time() == (total - 1) * MS
+
+    sl = ring.window(3)
+    assert ring.open_time[sl].tolist() == [(total - 3 + k) * MS for k in range(3)]
+
+
+def test_shared_view_stable_within_margin():
+    ring = SymbolRing(capacity=10)
+    for i in range(25):
+        _append(ring, i)
+    view = ring.prices[3, ring.window()]
+    before = view.copy()
+    for i in range(25, 25 + STABLE_MARGIN):
+        _append(ring, i)
+    assert np.array_equal(view, before)
+
+
+def test_replace_last_and_upto_open_time():
+    ring = SymbolRing(capacity=5)
+    for i in range(12):
+        _append(ring, i)
+    ring.append(12 * MS, 13 * MS - 1, 12, 13, 11, 12.0, 1.0, False)  # candle berjalan
+    ring.replace_last(12 * MS, 13 * MS - 1, 12, 14, 11, 13.5, 2.0, False)
+    sl = ring.window()
+    assert ring.prices[3, sl][-1] == 13.5 and not ring.closed[sl][-1]
+
+    # abaikan candle berjalan → hanya candle close (count tetap dibatasi capacity)
+    sl = ring.window(upto_open_time=11 * MS)
+    assert ring.open_time[sl].tolist() == [k * MS for k in range(8, 12)]
@@ -0,0 +1,37 @@
+# tests/test_pair_universe.py
+
+import time
+
+from binance.pair_universe import PairUniverse
+
+
+def _universe(volumes):
+    pu = PairUniverse()
+    now = time.time()
+    # cache exchangeInfo & ticker masih segar → select() tidak memanggil REST
+    pu._eligible = set(volumes) - {"DEADUSDT"}
+    pu._info_ts = now
+    pu._apply_tickers([{"s": s, "q": str(v)} for s, v in volumes.items()])
+    return pu
+
+
+def test_pure_ranking_by_volume():
+    pu = _universe({"BTCUSDT": 900, "ETHUSDT": 500, "SOLUSDT": 300, "XRPUSDT": 50, "DEADUSDT": 10_000})
+    assert pu.select(max_pairs=3, min_volume_usdt=100) == ["btcusdt", "ethusdt", "solusdt"]
+    assert pu.select(max_pairs=0, min_volume_usdt=100) == ["btcusdt", "ethusdt", "solusdt"]
+
+
+def test_hysteresis_keeps_incumbents_near_the_cutoff():
+    pu = _universe({"BTCUSDT": 900, "ETHUSDT": 500, "SOLUSDT": 95, "ADAUSDT": 104})
+    current = ["btcusdt", "ethusdt", "solusdt"]
+    # SOL di bawah min_volume tapi masih dalam toleransi 10% → tetap
+    assert pu.select(3, 100, current) == ["btcusdt", "ethusdt", "solusdt"]
+    # ADA hanya sedikit di atas SOL (< 10%) → tidak menggeser
+    assert pu.select(3, 90, current) == ["btcusdt", "ethusdt", "solusdt"]
+
+    # ADA jauh lebih besar dari pair terlemah → menggantikan SOL
+    pu._apply_tickers([{"s": "ADAUSDT", "q": "200"}])
+    assert pu.select(3, 90, current) == ["btcusdt", "ethusdt", "adausdt"]
+    # turun jauh di bawah batas → incumbent dibuang
+    pu._apply_tickers([{"s": "SOLUSDT", "q": "50"}])
+    assert "solusdt" not in pu.select(4, 100, current)
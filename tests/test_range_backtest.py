@@ -0,0 +1,86 @@
+# tests/test_range_backtest.py
+
+import itertools
+
+import numpy as np
+import pytest
+
+from core.range_settings import range_settings
+from range.range_backtest import TIER_ORDER, score_signals, simulate_trades, tier_orders
+from range.range_tiers import score_signal, tier_from_score
+
+
+def test_score_signals_matches_live_scoring():
+    grid = list(itertools.product([False, True], [0.1, 0.25, 0.5, 0.9, 1.2], [False, True]))
+    rr_ok, sl_pct, htf = (np.array(col) for col in zip(*grid))
+    scores = score_signals(rr_ok, sl_pct, htf)
+    expected = [
+        score_signal({"has_range": True, "breakout_ok": True, "rr_ok": rr, "vol_ok": True,
+                      "sl_pct": sl, "htf_alignment": h})
+        for rr, sl, h in grid
+    ]
+    assert scores.tolist() == expected
+    assert tier_orders(scores).tolist() == [TIER_ORDER[tier_from_score(s)] for s in expected]
+    assert tier_orders(np.array([79, 80, 99, 100, 119, 120])).tolist() == [0, 1, 1, 2, 2, 3]
+
+
+@pytest.fixture
+def entry_age():
+    old = range_settings.max_entry_age_candles
+    range_settings.max_entry_age_candles = 2
+    yield
+    range_settings.max_entry_age_candles = old
+
+
+def _levels(entry, sl, side):
+    risk = abs(entry - sl)
+    lv = {"entry": np.array([entry]), "sl": np.array([sl]), "risk": np.array([risk])}
+    for i, rr in enumerate((1.5, 2.5, 4.0), start=1):
+        lv[f"tp{i}"] = np.array([entry + side * rr * risk])
+    return lv
+
+
+def _bars(highs, lows, closes):
+    return {"high": np.array(highs, float), "low": np.array(lows, float), "close": np.array(closes, float)}
+
+
+def test_long_tp1_tp2_then_sl(entry_age):
+    # bar 0 sinyal, bar 1 retest entry 100, TP1 101.5 & TP2 102.5, lalu SL 99
+    bars = _bars(
+        highs=[100.5, 100.2, 101.6, 102.6, 100.0],
+        lows=[99.8, 99.9, 100.1, 101.0, 98.5],
+        closes=[100.4, 100.1, 101.2, 102.0, 98.8],
+    )
+    res = simulate_trades(bars, np.array([0]), np.array([1]), _levels(100.0, 99.0, 1), horizon=10)
+    assert res["filled"].tolist() == [True]
+    assert res["tp_hits"].tolist() == [2]
+    assert res["sl_hit"].tolist() == [True]
+    assert res["r"][0] == pytest.approx((1.5 + 2.5) / 3 - 1 / 3)
+
+
+def test_short_not_filled_and_timeout(entry_age):
+    bars = _bars(
+        highs=[100.0, 100.5, 101.0, 100.8, 100.9],
+        lows=[99.0, 99.5, 99.6, 99.7, 99.8],
+        closes=[99.5, 100.0, 100.5, 100.5, 100.5],
+    )
+    # short entry 102 tidak pernah di-retest dalam 2 bar → tidak terisi
+    res = simulate_trades(bars, np.array([0]), np.array([-1]), _levels(102.0, 103.0, -1), horizon=3)
+    assert res["filled"].tolist() == [False] and res["r"].tolist() == [0.0]
+
+    # long entry 100 terisi bar 1, tidak kena TP/SL → ditutup di close akhir horizon
+    res = simulate_trades(bars, np.array([0]), np.array([1]), _levels(100.0, 98.0, 1), horizon=3)
+    assert res["filled"].tolist() == [True]
+    assert res["tp_hits"].tolist() == [0] and res["sl_hit"].tolist() == [False]
+    assert res["r"][0] == pytest.approx((100.5 - 100.0) / 2.0)
+
+
+def test_sl_and_tp_same_bar_counts_sl(entry_age):
+    bars = _bars(
+        highs=[100.5, 100.2, 101.6],
+        lows=[99.8, 99.9, 98.9],
+        closes=[100.4, 100.1, 100.0],
+    )
+    res = simulate_trades(bars, np.array([0]), np.array([1]), _levels(100.0, 99.0, 1), horizon=5)
+    assert res["tp_hits"].tolist() == [0]
+    assert res["r"][0] == pytest.approx(-1.0)
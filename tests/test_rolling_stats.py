@@ -0,0 +1,61 @@
+# tests/test_rolling_stats.py
+
+import numpy as np
+
+from core.range_settings import range_settings
+from range.range_batch import find_range_candidates, find_range_candidates_from_stats
+from range.rolling_stats import RESYNC_EVERY, RollingRangeState
+
+
+def _walk(rng, n):
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    high = close * (1 + rng.uniform(0, 0.002, n))
+    low = close * (1 - rng.uniform(0, 0.002, n))
+    return high, low, close
+
+
+def test_matches_window_scan_with_replacements():
+    rng = np.random.default_rng(11)
+    window = 40
+    n = RESYNC_EVERY + 300  # lewat satu resync
+    high, low, close = _walk(rng, n)
+    st = RollingRangeState(window)
+    for i in range(n):
+        # update intrabar dulu (open_time sama) lalu nilai final
+        st.push(i, high[i] * 1.01, low[i] * 0.99, close[i] * 1.005)
+        st.push(i, high[i], low[i], close[i])
+        lo = max(0, i - window)
+        if i == 0:
+            assert st.size == 0
+            continue
+        assert st.size == i - lo
+        assert st.range_high == high[lo:i].max()
+        assert st.range_low == low[lo:i].min()
+        np.testing.assert_allclose(st.stdev, close[lo:i].std(), rtol=1e-9, atol=1e-12)
+        assert st.last == (i, high[i], low[i], close[i])
+
+
+def test_candidates_same_as_matrix_path():
+    rng = np.random.default_rng(5)
+    width = range_settings.range_lookback + 1
+    arrays, snaps = {}, {}
+    for k in range(30):
+        # squeeze sempit lalu candle terakhir breakout (naik / turun / tidak)
+        close = 100 + rng.normal(0, 0.05, width + 10)
+        close[-1] = 100 + (0.6, -0.6, 0.0)[k % 3]
+        high = close + 0.02
+        low = close - 0.02
+        sym = f"S{k}USDT"
+        arrays[sym] = {"high": high, "low": low, "close": close}
+        st = RollingRangeState(range_settings.range_lookback)
+        for i in range(close.size):
+            st.push(i, high[i], low[i], close[i])
+        snaps[sym] = st.snapshot()
+
+    from_matrix = find_range_candidates(arrays)
+    from_stats = find_range_candidates_from_stats(snaps)
+    assert from_matrix.keys() == from_stats.keys()
+    assert {c["side"] for c in from_matrix.values()} == {"long", "short"}
+    for sym, setup in from_matrix.items():
+        for key in ("range_low", "range_high", "height_pct", "last_price"):
+            assert abs(setup[key] - from_stats[sym][key]) < 1e-9
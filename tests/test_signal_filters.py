@@ -0,0 +1,74 @@
+# tests/test_signal_filters.py
+
+import random
+
+from core.signal_filters import SignalFilterIndex
+
+
+def _accepts(prefs, symbol, side, tier, sl_pct):
+    """Referensi: cek filter satu user secara langsung."""
+    if prefs.get("symbols") and symbol not in prefs["symbols"]:
+        return False
+    if prefs.get("sides") and side not in prefs["sides"]:
+        return False
+    if prefs.get("tiers") and tier not in prefs["tiers"]:
+        return False
+    if prefs.get("max_sl") and sl_pct > prefs["max_sl"]:
+        return False
+    return True
+
+
+def test_rejected_basic():
+    idx = SignalFilterIndex()
+    idx.load({
+        1: {"symbols": ["BTCUSDT"]},
+        2: {"sides": ["short"]},
+        3: {"max_sl": 0.5},
+        4: {"max_sl": 1.0, "tiers": ["A+"]},
+    })
+    assert idx.rejected("btcusdt", "long", "A+", 0.8) == {2, 3}
+    assert idx.rejected("ETHUSDT", "short", "B", 0.3) == {1, 4}
+    # sl_pct tepat di threshold tetap lolos
+    assert idx.rejected("BTCUSDT", "short", "A+", 0.5) == set()
+
+
+def test_rejected_matches_reference():
+    rng = random.Random(7)
+    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+    prefs = {}
+    for cid in range(200):
+        p = {}
+        if rng.random() < 0.5:
+            p["symbols"] = rng.sample(symbols, rng.randint(1, 2))
+        if rng.random() < 0.3:
+            p["sides"] = [rng.choice(["long", "short"])]
+        if rng.random() < 0.3:
+            p["tiers"] = rng.sample(["A+", "A", "B"], rng.randint(1, 2))
+        if rng.random() < 0.6:
+            p["max_sl"] = round(rng.uniform(0.2, 1.5), 2)
+        if p:
+            prefs[cid] = p
+    idx = SignalFilterIndex()
+    idx.load(prefs)
+
+    for _ in range(100):
+        sig = (rng.choice(symbols), rng.choice(["long", "short"]), rng.choice(["A+", "A", "B"]),
+               round(rng.uniform(0.1, 1.6), 2))
+        expected = {cid for cid, p in prefs.items() if not _accepts(p, *sig)}
+        assert idx.rejected(*sig) == expected
+
+    # digest: ditolak hanya kalau tidak cocok dengan satupun sinyal
+    sigs = [("BTCUSDT", "long", "A", 0.4), ("ETHUSDT", "short", "B", 1.2)]
+    expected = {cid for cid, p in prefs.items() if not any(_accepts(p, *s) for s in sigs)}
+    assert idx.rejected_all(sigs) == expected
+
+
+def test_set_and_discard_recompile():
+    idx = SignalFilterIndex()
+    idx.load({1: {"max_sl": 0.5}, 2: {"max_sl": 0.7}})
+    assert idx.rejected("BTCUSDT", "long", "A", 0.6) == {1}
+    idx.set(3, {"max_sl": 0.55})
+    assert idx.rejected("BTCUSDT", "long", "A", 0.6) == {1, 3}
+    idx.discard([1, 3, 99])
+    assert idx.rejected("BTCUSDT", "long", "A", 0.6) == set()
+    assert idx.rejected("BTCUSDT", "long", "A", 0.8) == {2}
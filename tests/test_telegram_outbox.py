@@ -0,0 +1,24 @@
+# tests/test_telegram_outbox.py
+
+import time
+
+from telegram.telegram_outbox import TelegramOutbox
+from telegram.telegram_sender import PRIORITY_ADMIN, PRIORITY_FREE, PRIORITY_VIP
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    box = TelegramOutbox(str(tmp_path / "outbox.db"))
+    assert len(box.enqueue("BTC:1", "x", [(1, PRIORITY_VIP), (2, PRIORITY_FREE)])) == 2
+    assert box.enqueue("BTC:1", "x", [(1, PRIORITY_VIP)]) == []
+    assert box.pending_count() == 2
+
+
+def test_stale_signals_expire_except_admin(tmp_path):
+    box = TelegramOutbox(str(tmp_path / "outbox.db"))
+    box.enqueue("BTC:1", "lama", [(9, PRIORITY_ADMIN), (1, PRIORITY_VIP), (2, PRIORITY_FREE)])
+    box._conn.execute("UPDATE outbox SET created = ?", (time.time() - 3600,))
+    box.enqueue("ETH:2", "baru", [(1, PRIORITY_VIP)])
+
+    assert box.expire(1800, keep_priority=PRIORITY_ADMIN) == 2
+    assert [(r[1], r[2]) for r in box.pending()] == [("BTC:1", 9), ("ETH:2", 1)]
+    assert [r[2] for r in box.pending(older_than=1800)] == [9]
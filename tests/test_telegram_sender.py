@@ -0,0 +1,69 @@
+# tests/test_telegram_sender.py
+
+import asyncio
+import time
+
+import telegram.telegram_sender as sender_mod
+from telegram.telegram_outbox import TelegramOutbox
+from telegram.telegram_sender import (
+    PRIORITY_ADMIN,
+    PRIORITY_FREE,
+    PRIORITY_VIP,
+    TelegramSender,
+    TokenBucket,
+)
+
+
+class _Resp:
+    def __init__(self, status, retry_after=None):
+        self.status_code = status
+        self.ok = status == 200
+        self.text = ""
+        self._retry_after = retry_after
+
+    def json(self):
+        return {"parameters": {"retry_after": self._retry_after}}
+
+
+def test_token_bucket_spreads_sends():
+    async def run():
+        bucket = TokenBucket(rate=50)
+        t0 = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - t0
+
+    # tanpa burst: 1 token awal, 5 berikutnya diratakan 1/rate detik
+    assert asyncio.run(run()) >= 5 / 50 * 0.9
+
+
+def test_chat_interval_private_vs_group():
+    sender = TelegramSender(rate=1000, workers=1)
+    assert sender._chat_interval(-100123) > sender._chat_interval(123)
+
+
+def test_replay_in_priority_order_and_retry_is_drained(tmp_path, monkeypatch):
+    sent = []
+    throttled = {"left": 1}
+
+    def fake_post(chat_id, text):
+        if chat_id == 30 and throttled["left"]:
+            throttled["left"] -= 1
+            return _Resp(429, retry_after=0.01)
+        sent.append(chat_id)
+        return _Resp(200)
+
+    monkeypatch.setattr(sender_mod, "post_message", fake_post)
+
+    async def run():
+        sender = TelegramSender(rate=1000, workers=1, outbox=TelegramOutbox(str(tmp_path / "o.db")))
+        # sender belum jalan → job tersimpan di outbox lalu di-replay urut prioritas saat start
+        sender.broadcast("BTC:1", "sinyal", [(30, PRIORITY_FREE), (20, PRIORITY_VIP), (10, PRIORITY_ADMIN)])
+        await sender.start()
+        await sender.stop(drain_timeout=5)
+        return sender
+
+    sender = asyncio.run(run())
+    assert sent == [10, 20, 30]
+    assert sender.sent == 3 and sender.failed == 0 and sender.rate_limited == 1
+    assert sender.outbox.pending_count() == 0
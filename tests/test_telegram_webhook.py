@@ -0,0 +1,85 @@
+# tests/test_telegram_webhook.py
+
+import asyncio
+import json
+
+import pytest
+
+from telegram.telegram_webhook import WEBHOOK_PATH, WebhookServer
+
+
+async def _post(port: int, body: bytes, secret: str = None) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"POST {WEBHOOK_PATH} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n"
+    if secret is not None:
+        head += f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    status = await reader.readline()
+    writer.close()
+    return status
+
+
+def test_secret_required():
+    with pytest.raises(ValueError):
+        WebhookServer(lambda u: None, "127.0.0.1", 0, "")
+
+
+def test_only_matching_secret_accepted():
+    updates = []
+    hook = WebhookServer(updates.append, "127.0.0.1", 0, "s3cret")
+    body = json.dumps({"update_id": 1}).encode()
+
+    async def run():
+        server = await asyncio.start_server(hook._handle_conn, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [
+                await _post(port, body),
+                await _post(port, body, "wrong"),
+                await _post(port, body, "s3cret"),
+            ]
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    missing, wrong, ok = asyncio.run(run())
+    assert b"403" in missing and b"403" in wrong and b"200" in ok
+    assert updates == [{"update_id": 1}]
+    assert hook.rejected == 2
+
+
+class _Resp:
+    def __init__(self, status):
+        self.status_code = status
+        self.ok = status == 200
+        self.text = str(status)
+
+
+@pytest.mark.parametrize("outcome, calls", [("error", 3), (503, 3), (400, 1)])
+def test_set_webhook_failure_falls_back_to_polling(monkeypatch, outcome, calls):
+    import telegram.telegram_core as core
+
+    posts = []
+    polled = []
+
+    def fake_post(url, **kwargs):
+        posts.append(url)
+        if outcome == "error":
+            raise ConnectionError("boot")
+        return _Resp(outcome)
+
+    async def fake_polling():
+        polled.append(True)
+
+    monkeypatch.setattr(core, "TELEGRAM_WEBHOOK_URL", "https://example.org/hook")
+    monkeypatch.setattr(core, "TELEGRAM_WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setattr(core, "SET_WEBHOOK_ATTEMPTS", 3)
+    monkeypatch.setattr(core, "SET_WEBHOOK_RETRY_DELAY", 0.0)
+    monkeypatch.setattr(core.http, "post", fake_post)
+    monkeypatch.setattr(core, "_run_long_polling", fake_polling)
+
+    asyncio.run(core._run_webhook())
+    # 4xx (URL ditolak) tidak di-retry; error jaringan / 5xx di-retry sampai habis
+    assert len(posts) == calls
+    assert polled == [True]